@@ -0,0 +1,10 @@
+"""
+Headless benchmarks for the capture, overlay, resize, encode and conversion paths.
+
+    python -m benchmarks --quick
+    python -m benchmarks --save-baseline
+    python -m benchmarks --cases screen_recorder --resolutions 4k
+
+Captures come from synthetic screens (see benchmarks.sources) instead of the real
+display, so runs are repeatable and need no X server.
+"""
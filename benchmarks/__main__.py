@@ -0,0 +1,160 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import CASES
+from benchmarks.sources import PATTERNS, RESOLUTIONS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Metrics compared against the baseline and whether bigger is better
+COMPARED = {"fps": True, "p95_ms": False, "peak_rss_mb": False}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _run_case(name, pattern, resolution, duration, results):
+    """Child process entry point, so peak RSS belongs to this case alone"""
+    function = CASES[name][0]
+    with tempfile.TemporaryDirectory(prefix="tlbench_") as workdir:
+        raw = function(pattern, resolution, duration, workdir)
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    latencies = [value * 1000.0 for value in raw["latencies"]]
+    results.put({
+        "fps": raw["frames"] / raw["seconds"] if raw["seconds"] else 0.0,
+        "frames": raw["frames"],
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss,
+        "bytes_written": raw.get("bytes_written", 0),
+    })
+
+
+def run_case(name, pattern, resolution, duration):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_case,
+                                      args=(name, pattern, resolution, duration, results))
+    process.start()
+    try:
+        result = results.get(timeout=duration * 10 + 120)
+    except Exception:
+        result = None
+    process.join()
+    if result is None or process.exitcode:
+        print(f"[ERROR] Benchmark {name} failed (exit code {process.exitcode})")
+    return result
+
+
+def compare(key, result, baseline, threshold):
+    """Return the regression messages of one case against its baseline entry"""
+    regressions = []
+    for metric, higher_is_better in COMPARED.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -threshold) or \
+                (not higher_is_better and change > threshold):
+            regressions.append(f"{key}: {metric} {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def _format(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark the recording and conversion paths")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES),
+                        help="Cases to run (default: all)")
+    parser.add_argument("--patterns", nargs="+", choices=PATTERNS,
+                        help="Screen patterns (default: the ones each case is meant for)")
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS),
+                        default=list(RESOLUTIONS), help="Screen resolutions (default: all)")
+    parser.add_argument("--duration", type=float, default=3.0,
+                        help="Seconds each case runs (default: 3)")
+    parser.add_argument("--quick", action="store_true",
+                        help="1080p only, one pattern per case, 1 second each")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative change that counts as a regression (default: 0.2)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.resolutions = ["1080p"]
+        args.duration = min(args.duration, 1.0)
+
+    runs = []
+    for name in args.cases:
+        patterns = args.patterns or CASES[name][1]
+        if args.quick and not args.patterns:
+            patterns = patterns[:1]
+        for resolution in args.resolutions:
+            for pattern in patterns:
+                runs.append((name, pattern, resolution))
+
+    results = {}
+    print(f"{'case':<44}{'fps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'RSS MB':>10}{'written':>12}")
+    for name, pattern, resolution in runs:
+        key = f"{name}/{pattern}/{resolution}"
+        result = run_case(name, pattern, resolution, args.duration)
+        if result is None:
+            continue
+        results[key] = result
+        print(f"{key:<44}{result['fps']:>10.1f}{_format(result['p50_ms'], '.2f'):>10}"
+              f"{_format(result['p95_ms'], '.2f'):>10}{_format(result['p99_ms'], '.2f'):>10}"
+              f"{result['peak_rss_mb']:>10.0f}{result['bytes_written']:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = len(results) != len(runs)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for key, result in results.items():
+            if key in baseline:
+                regressions.extend(compare(key, result, baseline[key], args.threshold))
+        if regressions:
+            failed = True
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
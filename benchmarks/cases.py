@@ -0,0 +1,227 @@
+"""
+Benchmark cases. Each case runs for about `duration` seconds and returns a dict with
+the number of frames processed, the elapsed time, per-frame latencies and the bytes it
+wrote to disk. Cases are run in their own process by the runner so peak RSS is per case.
+"""
+import glob
+import os
+import threading
+import time
+
+from benchmarks.sources import RESOLUTIONS, SyntheticSource, install_fake_mss
+
+
+class _FixedCursor:
+    """Cursor provider parked in the middle of the screen so the overlay path always runs"""
+
+    name = "fixed"
+
+    def __init__(self, x, y):
+        self.pos = (x, y)
+
+    def position(self):
+        return self.pos
+
+    def idle_seconds(self):
+        return None
+
+
+def _bytes_written(directory):
+    return sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, "*"))
+               if os.path.isfile(path))
+
+
+def _setup_screen(pattern, resolution):
+    from core.cursor import set_cursor_provider
+
+    size = RESOLUTIONS[resolution]
+    screen = SyntheticSource(pattern, size)
+    install_fake_mss(screen)
+    set_cursor_provider(_FixedCursor(size[0] // 2, size[1] // 2))
+    return screen
+
+
+def _latency_index_writer():
+    """FrameIndexWriter that also records capture-to-written latency of every frame"""
+    from core.frame_index import FrameIndexWriter
+
+    latencies = []
+
+    class LatencyIndexWriter(FrameIndexWriter):
+        def append(self, timestamp):
+            latencies.append(time.time() - timestamp)
+            super().append(timestamp)
+
+    return LatencyIndexWriter, latencies
+
+
+def _timed_loop(duration, step):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        step()
+        latencies.append(time.perf_counter() - started)
+    return {"frames": len(latencies), "seconds": sum(latencies), "latencies": latencies}
+
+
+def overlay(pattern, resolution, duration, workdir):
+    """CursorSprite.blend into a full frame"""
+    from core.frame_ops import CursorSprite
+
+    screen = SyntheticSource(pattern, RESOLUTIONS[resolution])
+    frame = screen.next_frame().copy()
+    cursor = CursorSprite()
+    x, y = screen.width // 2, screen.height // 2
+    return _timed_loop(duration, lambda: cursor.blend(frame, x, y))
+
+
+def resize(pattern, resolution, duration, workdir):
+    """FrameConverter: BGRA capture to a 1080p BGR output frame"""
+    from core.frame_ops import FrameConverter
+
+    screen = SyntheticSource(pattern, RESOLUTIONS[resolution])
+    converter = FrameConverter((1920, 1080))
+    return _timed_loop(duration, lambda: converter.convert(screen.next_frame()))
+
+
+def preview(pattern, resolution, duration, workdir):
+    """PreviewWorker capture and scaling, plus PreviewCanvas.show_image when Tk can open"""
+    screen = _setup_screen(pattern, resolution)
+    import mss
+    from ui.preview_worker import PreviewWorker
+
+    worker = PreviewWorker((780, 450))
+    geometry = {'left': 0, 'top': 0, 'width': screen.width, 'height': screen.height}
+    canvas = root = None
+    if os.environ.get("DISPLAY"):
+        import tkinter as tk
+        from ui.preview import PreviewCanvas
+        root = tk.Tk()
+        root.withdraw()
+        canvas = PreviewCanvas(root)
+
+    with mss.mss() as sct:
+        def step():
+            image = worker._capture(sct, geometry)
+            if canvas is not None:
+                canvas.show_image(image)
+                root.update_idletasks()
+
+        result = _timed_loop(duration, step)
+    if root is not None:
+        root.destroy()
+    return result
+
+
+def screen_recorder(pattern, resolution, duration, workdir, pipelined=False):
+    """ScreenRecorder.record_loop running flat out into a cv2 writer"""
+    _setup_screen(pattern, resolution)
+    import core.recorder
+    from core.recorder import ScreenRecorder
+
+    writer_class, latencies = _latency_index_writer()
+    core.recorder.FrameIndexWriter = writer_class
+    recorder = ScreenRecorder(os.path.join(workdir, "raw.mp4"), fps=1000,
+                              capture_region={'left': 0, 'top': 0,
+                                              'width': RESOLUTIONS[resolution][0],
+                                              'height': RESOLUTIONS[resolution][1]},
+                              pipelined=pipelined, encode_workers=2 if pipelined else 1)
+    started = time.perf_counter()
+    recorder.start()
+    time.sleep(duration)
+    recorder.stop()
+    elapsed = time.perf_counter() - started
+    return {"frames": recorder.get_stats()['written'], "seconds": elapsed,
+            "latencies": latencies, "bytes_written": _bytes_written(workdir)}
+
+
+def screen_recorder_pipelined(pattern, resolution, duration, workdir):
+    """ScreenRecorder with the capture queue and two encode workers"""
+    return screen_recorder(pattern, resolution, duration, workdir, pipelined=True)
+
+
+def timelapse_recorder(pattern, resolution, duration, workdir):
+    """TimeLapseScreenRecorder.record with change detection, capturing as fast as it can"""
+    _setup_screen(pattern, resolution)
+    import core.timelapse
+    from core.timelapse import TimeLapseScreenRecorder
+
+    writer_class, latencies = _latency_index_writer()
+    core.timelapse.FrameIndexWriter = writer_class
+    recorder = TimeLapseScreenRecorder(interval_seconds=0.001, change_detection=True)
+    thread = threading.Thread(target=recorder.record,
+                              args=(os.path.join(workdir, "timelapse.mp4"),))
+    started = time.perf_counter()
+    thread.start()
+    time.sleep(duration)
+    recorder.stop()
+    thread.join()
+    elapsed = time.perf_counter() - started
+    # Unchanged frames are held, not written, so count every capture as a processed frame
+    return {"frames": recorder.stats['captured'], "seconds": elapsed, "latencies": latencies,
+            "bytes_written": _bytes_written(workdir)}
+
+
+def _input_video(pattern, resolution, workdir, frames=300, fps=30):
+    import cv2
+
+    path = os.path.join(workdir, f"input_{pattern}_{resolution}.mp4")
+    screen = SyntheticSource(pattern, RESOLUTIONS[resolution])
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps,
+                          RESOLUTIONS[resolution])
+    for _ in range(frames):
+        out.write(cv2.cvtColor(screen.next_frame(), cv2.COLOR_BGRA2BGR))
+    out.release()
+    return path, frames
+
+
+def _convert(pattern, resolution, duration, workdir, **converter_args):
+    from core.timelapse import TimeLapseConverter
+
+    input_file, total = _input_video(pattern, resolution, workdir)
+    latencies = []
+    frames = 0
+    elapsed = 0.0
+    runs = 0
+    # Repeat short conversions until the time budget is used up
+    while elapsed < duration or not runs:
+        last = [time.perf_counter()]
+
+        def progress(done, expected):
+            now = time.perf_counter()
+            latencies.append(now - last[0])
+            last[0] = now
+
+        output_file = os.path.join(workdir, f"converted_{runs}.mp4")
+        converter = TimeLapseConverter(speed_factor=10, **converter_args)
+        started = time.perf_counter()
+        converter.convert(input_file, output_file, progress_callback=progress, use_index=False)
+        elapsed += time.perf_counter() - started
+        frames += total
+        runs += 1
+    return {"frames": frames, "seconds": elapsed, "latencies": latencies,
+            "bytes_written": _bytes_written(workdir) - os.path.getsize(input_file)}
+
+
+def convert_drop(pattern, resolution, duration, workdir):
+    """TimeLapseConverter.convert keeping 1 frame in 10 (input frames per second)"""
+    return _convert(pattern, resolution, duration, workdir)
+
+
+def convert_blend(pattern, resolution, duration, workdir):
+    """TimeLapseConverter.convert averaging every 10 frames (input frames per second)"""
+    return _convert(pattern, resolution, duration, workdir, frame_mode="average")
+
+
+# name -> (function, patterns it is run with)
+CASES = {
+    "overlay": (overlay, ("static",)),
+    "resize": (resize, ("noisy",)),
+    "preview": (preview, ("static", "noisy")),
+    "screen_recorder": (screen_recorder, ("static", "noisy", "scrolling", "idle")),
+    "screen_recorder_pipelined": (screen_recorder_pipelined, ("noisy", "scrolling")),
+    "timelapse_recorder": (timelapse_recorder, ("static", "noisy", "scrolling", "idle")),
+    "convert_drop": (convert_drop, ("scrolling",)),
+    "convert_blend": (convert_blend, ("scrolling",)),
+}
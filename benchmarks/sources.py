@@ -0,0 +1,58 @@
+"""
+Screen sizes for the benchmarks, and a stand-in for the mss module that serves them,
+so capture paths can be measured headless and repeatably.
+"""
+import sys
+import types
+
+import numpy as np
+
+from core.frame_sources import SYNTHETIC_PATTERNS, SyntheticSource
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+PATTERNS = SYNTHETIC_PATTERNS
+
+
+class _Shot:
+    def __init__(self, raw, width, height):
+        self.raw = raw
+        self.width = width
+        self.height = height
+
+
+class _FakeMss:
+    screen = None
+
+    def __init__(self, *args, **kwargs):
+        screen = self.screen
+        whole = {'left': 0, 'top': 0, 'width': screen.width, 'height': screen.height}
+        self.monitors = [whole, dict(whole)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def grab(self, region):
+        frame = self.screen.next_frame()
+        top, left = region['top'], region['left']
+        frame = frame[top:top + region['height'], left:left + region['width']]
+        # mss hands out a fresh writable buffer per grab; copying matches that cost
+        return _Shot(bytearray(np.ascontiguousarray(frame).data),
+                     region['width'], region['height'])
+
+
+def install_fake_mss(screen):
+    """Make `import mss` return a module whose mss() grabs from screen"""
+    module = types.ModuleType("mss")
+    module.mss = type("mss", (_FakeMss,), {"screen": screen})
+    sys.modules["mss"] = module
+    return module
@@ -0,0 +1,390 @@
+"""
+Headless command line interface for recording and converting timelapses.
+Never imports tkinter; heavy modules are loaded on first use by the commands themselves.
+
+    python cli.py record -o out.mp4 --interval 2 --duration 3600
+    python cli.py convert input.mp4 output.mp4 --speed 30 --workers 8
+    python cli.py batch "recordings/*.mp4" --output-dir timelapses --speed 30
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+
+def add_encoder_arguments(parser):
+    parser.add_argument("--encoder", choices=("cv2", "ffmpeg"), default="cv2",
+                        help="Encoder backend (default: cv2)")
+    parser.add_argument("--codec", default="libx264", help="ffmpeg video codec")
+    parser.add_argument("--preset", default="veryfast", help="ffmpeg encoder preset")
+    parser.add_argument("--crf", type=int, default=23, help="ffmpeg constant rate factor")
+    parser.add_argument("--threads", type=int, default=0, help="ffmpeg encoder threads")
+
+
+def add_segment_arguments(parser):
+    parser.add_argument("--segment-minutes", type=float, default=None,
+                        help="Write rolling segments of this many minutes")
+    parser.add_argument("--segment-mb", type=float, default=None,
+                        help="Write rolling segments of at most this many megabytes")
+    parser.add_argument("--no-concat", action="store_true",
+                        help="Keep the segments instead of joining them when recording stops")
+
+
+def encoder_spec(args):
+    if args.encoder == "ffmpeg":
+        return {"backend": "ffmpeg", "codec": args.codec, "preset": args.preset,
+                "crf": args.crf, "threads": args.threads}
+    return None
+
+
+def recording_encoder_spec(args):
+    spec = encoder_spec(args)
+    if args.segment_minutes or args.segment_mb:
+        return {"backend": "segmented", "encoder": spec,
+                "segment_seconds": args.segment_minutes * 60 if args.segment_minutes else None,
+                "segment_megabytes": args.segment_mb, "concat": not args.no_concat,
+                "keep_segments": args.no_concat}
+    return spec
+
+
+def rendition_specs(args):
+    """Renditions from the --rendition arguments; a crf part overrides the ffmpeg crf"""
+    from core.renditions import parse_rendition
+    renditions = []
+    for spec in args.rendition:
+        rendition, crf = parse_rendition(spec)
+        if crf is not None:
+            encoder = encoder_spec(args)
+            if encoder is None:
+                raise ValueError(f"Rendition {rendition.name}: a crf needs --encoder ffmpeg")
+            rendition.encoder = dict(encoder, crf=crf)
+        renditions.append(rendition)
+    return renditions
+
+
+def add_convert_arguments(parser):
+    parser.add_argument("--speed", type=int, default=10, help="Keep 1 frame out of every N")
+    parser.add_argument("--strategy", choices=("auto", "read", "grab", "seek"), default="auto",
+                        help="How dropped frames are skipped (default: auto)")
+    parser.add_argument("--frame-mode", choices=("drop", "average", "motion_blur"),
+                        default="drop",
+                        help="Keep one frame per group, or blend each group into one (default: drop)")
+    parser.add_argument("--blend-samples", type=int, default=None,
+                        help="Blend at most this many frames per group (default: all)")
+    parser.add_argument("--select", choices=("uniform", "content"), default="uniform",
+                        help="Keep every Nth frame, or favour frames where the screen "
+                             "changes and collapse idle stretches (default: uniform)")
+    parser.add_argument("--target-duration", type=float, default=None,
+                        help="Output length in seconds instead of --speed (implies --select content)")
+    parser.add_argument("--change-metric", choices=("mad", "histogram"), default="mad",
+                        help="Content selection: how frame changes are scored (default: mad)")
+    parser.add_argument("--idle-weight", type=float, default=0.05,
+                        help="Content selection: share of the output idle stretches keep "
+                             "relative to average activity (default: 0.05)")
+    add_encoder_arguments(parser)
+
+
+def print_progress(done, expected):
+    if expected:
+        print(f"\r{done}/{expected} frames ({done * 100 // expected}%)", end="", flush=True)
+    else:
+        print(f"\r{done} frames", end="", flush=True)
+
+
+def wait_for_stop(duration, thread=None):
+    """
+    Block until duration seconds pass (None = forever), thread ends (a drained source
+    ran out of frames) or Ctrl+C is pressed
+    """
+    deadline = time.monotonic() + duration if duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            if thread is not None and not thread.is_alive():
+                break
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_record(args):
+    source = None
+    if args.source:
+        if args.all_displays or args.process or args.mode == "replay":
+            print("Error: --source works with the timelapse and raw modes only", file=sys.stderr)
+            return 1
+        from core.frame_sources import open_source
+        try:
+            source = open_source(args.source, args.monitor)
+        except (ValueError, IOError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.drain and (source is None or source.live):
+        print("Error: --drain needs a --source that is not a live screen", file=sys.stderr)
+        return 1
+    if args.rendition and (args.all_displays or args.process or args.mode == "replay"):
+        print("Error: --rendition works with the timelapse and raw modes only", file=sys.stderr)
+        return 1
+    try:
+        renditions = rendition_specs(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.all_displays:
+        from core.multi_display import MultiDisplaySession
+        timelapse = args.mode == "timelapse"
+        session = MultiDisplaySession(
+            args.output, interval_seconds=args.interval if timelapse else 1.0 / args.fps,
+            output_fps=args.fps, composite=args.composite, encoder=encoder_spec(args))
+        session.start()
+        print(f"Recording {len(session.displays)} displays ({session.capture_mode} capture) "
+              f"to {', '.join(session.output_files())}... Press Ctrl+C to stop.")
+        wait_for_stop(args.duration)
+        session.stop()
+        print(f"Recording stopped. {session.get_stats()}")
+        return 0
+    if args.mode == "timelapse":
+        from core.timelapse import TimeLapseScreenRecorder
+        recorder = TimeLapseScreenRecorder(
+            interval_seconds=args.interval, output_fps=args.fps, monitor=args.monitor,
+            change_detection=args.change_detection, encoder=recording_encoder_spec(args),
+            metrics=bool(args.metrics), metrics_file=args.metrics, adaptive=args.adaptive,
+            min_interval=args.min_interval, max_interval=args.max_interval,
+            source=source, drain=args.drain, renditions=renditions,
+            topology=display_topology() if source is None else None)
+        errors = []
+
+        def run():
+            try:
+                recorder.record(args.output)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        print(f"Recording timelapse to {args.output}... Press Ctrl+C to stop.")
+        wait_for_stop(args.duration, thread)
+        recorder.stop()
+        thread.join()
+        if errors:
+            print(f"Error: {errors[0]}", file=sys.stderr)
+            return 1
+        print(f"Recording stopped. {recorder.stats}")
+    elif source is not None:
+        from core.recorder import ScreenRecorder
+        recorder = ScreenRecorder(
+            output_file=args.output, fps=args.fps, pipelined=True,
+            encoder=recording_encoder_spec(args), metrics=bool(args.metrics),
+            metrics_file=args.metrics, source=source, drain=args.drain,
+            renditions=renditions)
+        recorder.start()
+        print(f"Recording {args.source} to {args.output}... Press Ctrl+C to stop.")
+        wait_for_stop(args.duration, recorder.thread)
+        recorder.stop()
+        print(f"Recording stopped. {recorder.get_stats()}")
+    else:
+        import mss
+        from core.recorder import ScreenRecorder
+        with mss.mss() as sct:
+            if args.monitor >= len(sct.monitors):
+                print(f"Error: monitor {args.monitor} is out of range. "
+                      f"Available monitors: {len(sct.monitors) - 1}", file=sys.stderr)
+                return 1
+            monitor = sct.monitors[args.monitor]
+        region = {key: monitor[key] for key in ('left', 'top', 'width', 'height')}
+        if args.mode == "replay":
+            from core.replay_buffer import ReplayRecorder
+            recorder = ReplayRecorder(
+                max_seconds=args.replay_seconds, fps=args.fps, capture_region=region,
+                pipelined=True, overflow_policy="drop_oldest", encoder=encoder_spec(args))
+            recorder.start()
+            print(f"Buffering the last {args.replay_seconds:g} seconds... "
+                  f"Press Ctrl+C to save them to {args.output}.")
+            wait_for_stop(args.duration)
+            recorder.stop()
+            try:
+                frames = recorder.dump(args.output)
+            except (RuntimeError, IOError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+            print(f"Saved {frames} frames to {args.output}.")
+            return 0
+        if args.process:
+            from core.process_recorder import ProcessScreenRecorder
+            recorder = ProcessScreenRecorder(
+                output_file=args.output, fps=args.fps, capture_region=region,
+                encoder=recording_encoder_spec(args))
+        else:
+            recorder = ScreenRecorder(
+                output_file=args.output, fps=args.fps, capture_region=region, pipelined=True,
+                overflow_policy="drop_oldest", encoder=recording_encoder_spec(args),
+                metrics=bool(args.metrics), metrics_file=args.metrics, renditions=renditions,
+                topology=display_topology())
+        recorder.start()
+        print(f"Recording to {args.output}... Press Ctrl+C to stop.")
+        wait_for_stop(args.duration, recorder.encode_process if args.process else None)
+        try:
+            recorder.stop()
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Recording stopped. {recorder.get_stats()}")
+    return 0
+
+
+def display_topology():
+    """The shared monitor layout, watched so live recordings follow display changes"""
+    from core.display_topology import get_topology
+    return get_topology().start()
+
+
+def selection_mode(args):
+    return "content" if args.target_duration else args.select
+
+
+def make_converter(args):
+    from core.timelapse import TimeLapseConverter
+    return TimeLapseConverter(speed_factor=args.speed, decode_strategy=args.strategy,
+                              encoder=encoder_spec(args), frame_mode=args.frame_mode,
+                              blend_samples=args.blend_samples, selection=selection_mode(args),
+                              target_duration=args.target_duration,
+                              change_metric=args.change_metric, idle_weight=args.idle_weight)
+
+
+def cmd_convert(args):
+    started = time.monotonic()
+    try:
+        converter = make_converter(args)
+        converter.convert(args.input, args.output, workers=args.workers,
+                          progress_callback=None if args.quiet else print_progress,
+                          start_time=args.start, end_time=args.end, use_index=not args.no_index)
+    except (ValueError, RuntimeError, IOError) as e:
+        if not args.quiet:
+            print()
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print()
+    print(f"Converted {args.input} -> {args.output} "
+          f"({converter.last_strategy}, {time.monotonic() - started:.1f}s)")
+    return 0
+
+
+def cmd_batch(args):
+    from core.batch import BatchConverter, expand_inputs
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("No input files found", file=sys.stderr)
+        return 1
+    batch = BatchConverter(args.output_dir, speed_factor=args.speed,
+                           decode_strategy=args.strategy, encoder=encoder_spec(args),
+                           concurrency=args.concurrency, manifest_file=args.manifest,
+                           suffix=args.suffix, frame_mode=args.frame_mode,
+                           blend_samples=args.blend_samples, selection=selection_mode(args),
+                           target_duration=args.target_duration,
+                           change_metric=args.change_metric, idle_weight=args.idle_weight)
+
+    def report(input_file, state, info):
+        if state == "done":
+            print(f"{input_file} -> {batch.output_path(input_file)} ({info:.1f}s)")
+        else:
+            print(f"Error converting {input_file}: {info}", file=sys.stderr)
+
+    try:
+        summary = batch.run(inputs, progress_callback=report)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        return 130
+    print(f"Converted {summary['converted']}, skipped {summary['skipped']} up to date, "
+          f"{summary['failed']} failed")
+    return 1 if summary['failed'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Timelapse recorder (headless)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Record the screen")
+    record.add_argument("-o", "--output", required=True, help="Output video file")
+    record.add_argument("--mode", choices=("timelapse", "raw", "replay"), default="timelapse",
+                        help="timelapse: one frame per interval, raw: continuous at --fps, "
+                             "replay: keep only the last --replay-seconds in memory")
+    record.add_argument("--monitor", type=int, default=1, help="mss monitor index (1 = primary)")
+    record.add_argument("--interval", type=float, default=2,
+                        help="Seconds between timelapse captures (default: 2)")
+    record.add_argument("--fps", type=float, default=30,
+                        help="Output fps for timelapse, capture fps for raw (default: 30)")
+    record.add_argument("--duration", type=float, default=None,
+                        help="Stop after this many seconds (default: until Ctrl+C)")
+    record.add_argument("--change-detection", action="store_true",
+                        help="Do not encode timelapse frames that did not change")
+    record.add_argument("--replay-seconds", type=float, default=300,
+                        help="Replay mode: seconds kept in memory (default: 300)")
+    record.add_argument("--all-displays", action="store_true",
+                        help="Record every display at once, one file per display")
+    record.add_argument("--composite", action="store_true",
+                        help="With --all-displays, also write a composite of all displays")
+    record.add_argument("--process", action="store_true",
+                        help="Raw mode: capture and encode in separate processes")
+    record.add_argument("--adaptive", action="store_true",
+                        help="Capture more often while the screen or user is active")
+    record.add_argument("--min-interval", type=float, default=0.5,
+                        help="Shortest adaptive interval in seconds (default: 0.5)")
+    record.add_argument("--max-interval", type=float, default=10,
+                        help="Longest adaptive interval in seconds (default: 10)")
+    record.add_argument("--source", default=None,
+                        help="Record from a frame source instead of the monitor: a directory "
+                             "or glob of images, a video file, display:<X display> or "
+                             "synthetic:<pattern>")
+    record.add_argument("--drain", action="store_true",
+                        help="Read a file or synthetic --source as fast as possible "
+                             "instead of pacing it by --interval/--fps")
+    record.add_argument("--rendition", action="append", default=[],
+                        help="Also write <output>_<name> from the same frames: "
+                             "name:size[:every[:crf]] where size is WIDTHxHEIGHT, a height "
+                             "like 360p or a scale like 0.25 (repeatable, e.g. proxy:640x360:3)")
+    record.add_argument("--metrics", default=None,
+                        help="Write stage timings to this file (.json or .prom)")
+    add_encoder_arguments(record)
+    add_segment_arguments(record)
+    record.set_defaults(func=cmd_record)
+
+    convert = subparsers.add_parser("convert", help="Convert a recording into a timelapse")
+    convert.add_argument("input", help="Input video file")
+    convert.add_argument("output", help="Output video file")
+    convert.add_argument("-q", "--quiet", action="store_true", help="Do not print progress")
+    convert.add_argument("--workers", type=int, default=1,
+                         help="Worker processes splitting the input into segments; needs ffmpeg "
+                              "to join them (default: 1)")
+    convert.add_argument("--start", type=float, default=None,
+                         help="Start of the range to convert, in seconds from the first frame")
+    convert.add_argument("--end", type=float, default=None,
+                         help="End of the range to convert, in seconds from the first frame")
+    convert.add_argument("--no-index", action="store_true",
+                         help="Ignore the sidecar frame index and decode from the start; "
+                              "with --start/--end the input is scanned for frame times instead")
+    add_convert_arguments(convert)
+    convert.set_defaults(func=cmd_convert)
+
+    batch = subparsers.add_parser("batch", help="Convert many recordings")
+    batch.add_argument("inputs", nargs="+", help="Input files, directories or glob patterns")
+    batch.add_argument("--output-dir", required=True, help="Directory for the timelapses")
+    batch.add_argument("--suffix", default="_timelapse",
+                       help="Appended to each output file name (default: _timelapse)")
+    batch.add_argument("--concurrency", type=int, default=None,
+                       help="Files converted at once (default: CPU count)")
+    batch.add_argument("--manifest", default=None,
+                       help="Job manifest path (default: <output-dir>/batch_manifest.json)")
+    add_convert_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
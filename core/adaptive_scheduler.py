@@ -0,0 +1,64 @@
+class AdaptiveScheduler:
+    """
+    Picks the next capture interval between min_interval and max_interval from how much
+    is happening: the fraction of screen tiles that changed since the last capture and
+    whether the user has touched the keyboard or mouse.
+    Activity shortens the interval at once; calm lets it grow by growth per capture,
+    so a short pause does not immediately drop detail.
+    - min_interval: Interval while the screen is busy (seconds)
+    - max_interval: Interval after a long idle stretch (seconds)
+    - full_activity: Fraction of changed tiles that counts as fully busy
+    - input_activity: Activity level assumed while the user is giving input
+    - growth: Factor the interval grows by per capture while calm
+    """
+
+    def __init__(self, min_interval=0.5, max_interval=10.0, full_activity=0.25,
+                 input_activity=0.5, growth=1.5):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError(
+                f"Invalid interval range: {min_interval}-{max_interval} seconds")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_activity = full_activity
+        self.input_activity = input_activity
+        self.growth = growth
+        self.interval = min_interval
+        self.activity = 0.0
+        self._last_cursor = None
+
+    def reset(self, interval=None):
+        self.interval = self._clamp(interval or self.min_interval)
+        self.activity = 0.0
+        self._last_cursor = None
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def measure(self, changed_fraction=None, cursor_pos=None, idle_seconds=None):
+        """
+        Combine the signals of the capture that just happened into an activity level 0-1.
+        Missing signals (None) are ignored.
+        """
+        activity = 0.0
+        if changed_fraction is not None and self.full_activity > 0:
+            activity = min(1.0, changed_fraction / self.full_activity)
+        had_input = False
+        if idle_seconds is not None:
+            had_input = idle_seconds < self.interval
+        if cursor_pos is not None:
+            had_input = had_input or (self._last_cursor is not None
+                                      and tuple(cursor_pos) != self._last_cursor)
+            self._last_cursor = tuple(cursor_pos)
+        if had_input:
+            activity = max(activity, self.input_activity)
+        return activity
+
+    def update(self, changed_fraction=None, cursor_pos=None, idle_seconds=None):
+        """Feed the signals of the last capture and return the interval until the next one"""
+        self.activity = self.measure(changed_fraction, cursor_pos, idle_seconds)
+        target = self.max_interval - (self.max_interval - self.min_interval) * self.activity
+        if target < self.interval:
+            self.interval = self._clamp(target)
+        else:
+            self.interval = self._clamp(min(target, self.interval * self.growth))
+        return self.interval
@@ -0,0 +1,257 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+MANIFEST_NAME = "batch_manifest.json"
+SAMPLE_BYTES = 1024 * 1024
+
+
+def file_checksum(path):
+    """
+    Cheap content checksum for large recordings: SHA-1 over the file size and the first
+    and last megabyte. Enough to notice a re-recorded or truncated file without reading
+    hours of video.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        if size > SAMPLE_BYTES:
+            f.seek(max(SAMPLE_BYTES, size - SAMPLE_BYTES))
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def expand_inputs(patterns, extensions=(".mp4",)):
+    """Expand files, directories and glob patterns into a sorted list of video files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                if name.lower().endswith(extensions):
+                    files.add(os.path.join(pattern, name))
+        else:
+            files.update(glob.glob(pattern))
+    return sorted(os.path.abspath(f) for f in files if os.path.isfile(f))
+
+
+def _convert_file(input_file, output_file, speed_factor, decode_strategy, encoder,
+                  frame_mode, blend_samples, selection):
+    # Runs in a worker process
+    from core.timelapse import TimeLapseConverter
+
+    converter = TimeLapseConverter(speed_factor, decode_strategy=decode_strategy,
+                                   encoder=encoder, frame_mode=frame_mode,
+                                   blend_samples=blend_samples, **selection)
+    root, ext = os.path.splitext(output_file)
+    partial_file = f"{root}.partial{ext}"
+    started = time.monotonic()
+    try:
+        converter.convert(input_file, partial_file)
+        # Only a finished conversion ever appears under the real name
+        os.replace(partial_file, output_file)
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+    return time.monotonic() - started, converter.last_strategy
+
+
+class BatchConverter:
+    """
+    Converts many recordings with a process pool and keeps a resumable JSON manifest.
+    Each input gets an entry with its state ("pending", "done" or "failed"), checksum,
+    conversion settings and output path. A rerun skips inputs that are done with the
+    same checksum and settings and whose output still exists.
+    - output_dir: Where the timelapses are written
+    - concurrency: Number of files converted at once (default: CPU count)
+    - manifest_file: Manifest path (default: batch_manifest.json in output_dir)
+    - suffix: Appended to each output file name
+    - frame_mode, blend_samples: See TimeLapseConverter
+    - selection, target_duration, change_metric, idle_weight: See TimeLapseConverter
+    """
+
+    def __init__(self, output_dir, speed_factor=10, decode_strategy="auto", encoder=None,
+                 concurrency=None, manifest_file=None, suffix="_timelapse", retry_failed=True,
+                 frame_mode="drop", blend_samples=None, selection="uniform",
+                 target_duration=None, change_metric="mad", idle_weight=0.05):
+        from core.encoders import create_encoder
+
+        self.output_dir = output_dir
+        self.speed_factor = speed_factor
+        self.decode_strategy = decode_strategy
+        self.encoder = create_encoder(encoder)
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.manifest_file = manifest_file or os.path.join(output_dir, MANIFEST_NAME)
+        self.suffix = suffix
+        self.retry_failed = retry_failed
+        self.frame_mode = frame_mode
+        self.blend_samples = blend_samples
+        self.selection = {"selection": selection, "target_duration": target_duration,
+                          "change_metric": change_metric, "idle_weight": idle_weight}
+        self.manifest = {"version": 1, "files": {}}
+        # Input -> output file, see assign_outputs
+        self.outputs = {}
+
+    @property
+    def settings(self):
+        """Everything that affects the output; a change forces reconversion"""
+        settings = {
+            "speed_factor": self.speed_factor,
+            "frame_mode": self.frame_mode,
+            "blend_samples": self.blend_samples,
+            "encoder": self.encoder.settings(),
+        }
+        # Left out for uniform selection so manifests from before it existed still match
+        if self.selection["selection"] != "uniform":
+            settings.update(self.selection)
+        return settings
+
+    def _output_names(self, input_file):
+        """The plain output path of input_file and one tagged with a hash of its path"""
+        name = os.path.splitext(os.path.basename(input_file))[0]
+        tag = hashlib.sha1(input_file.encode()).hexdigest()[:8]
+        return (os.path.join(self.output_dir, f"{name}{self.suffix}.mp4"),
+                os.path.join(self.output_dir, f"{name}_{tag}{self.suffix}.mp4"))
+
+    def output_path(self, input_file):
+        input_file = os.path.abspath(input_file)
+        return self.outputs.get(input_file) or self._output_names(input_file)[0]
+
+    def assign_outputs(self, inputs):
+        """
+        Give every input its own output file. Inputs with the same file name (a/rec.mp4
+        and b/rec.mp4) would otherwise overwrite each other, so a name that is already
+        taken gets a short hash of the input path. Outputs recorded in the manifest keep
+        their names, so adding an input never renames another one's output.
+        """
+        inputs = [os.path.abspath(f) for f in inputs]
+        entries = self.manifest["files"]
+        taken = {entry.get("output") for input_file, entry in entries.items()
+                 if input_file not in inputs}
+        self.outputs = {}
+        for input_file in inputs:
+            recorded = entries.get(input_file, {}).get("output")
+            if recorded in self._output_names(input_file) and recorded not in taken:
+                self.outputs[input_file] = recorded
+                taken.add(recorded)
+        for input_file in inputs:
+            if input_file in self.outputs:
+                continue
+            plain, tagged = self._output_names(input_file)
+            output = tagged if plain in taken else plain
+            self.outputs[input_file] = output
+            taken.add(output)
+        return self.outputs
+
+    def load_manifest(self):
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r') as f:
+                    self.manifest = json.load(f)
+        except Exception as e:
+            print(f"Error loading manifest: {e}")
+        self.manifest.setdefault("files", {})
+        return self.manifest
+
+    def save_manifest(self):
+        # Write to a temporary file first so an interrupted save never corrupts the manifest
+        temp_file = self.manifest_file + ".tmp"
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(temp_file, self.manifest_file)
+        except Exception as e:
+            print(f"Error saving manifest: {e}")
+
+    def is_up_to_date(self, entry, checksum, output_file):
+        return (entry is not None
+                and entry.get("state") == "done"
+                and entry.get("checksum") == checksum
+                and entry.get("settings") == self.settings
+                and os.path.exists(output_file))
+
+    def _update(self, input_file, **fields):
+        entry = self.manifest["files"].setdefault(input_file, {})
+        entry.update(fields, updated=time.time())
+        self.save_manifest()
+
+    def plan(self, inputs, errors=None):
+        """
+        Return the (input, output, checksum) jobs that still need converting.
+        - errors: If given, (input, message) of every input that cannot be read is appended
+        """
+        self.assign_outputs(inputs)
+        jobs = []
+        for input_file in inputs:
+            input_file = os.path.abspath(input_file)
+            output_file = self.output_path(input_file)
+            entry = self.manifest["files"].get(input_file)
+            try:
+                checksum = file_checksum(input_file)
+            except OSError as e:
+                print(f"Error reading {input_file}: {e}")
+                if errors is not None:
+                    errors.append((input_file, str(e)))
+                continue
+            if self.is_up_to_date(entry, checksum, output_file):
+                continue
+            if entry and entry.get("state") == "failed" and not self.retry_failed \
+                    and entry.get("checksum") == checksum:
+                continue
+            jobs.append((input_file, output_file, checksum))
+        return jobs
+
+    def run(self, inputs, progress_callback=None):
+        """
+        Convert every input that is not up to date. Returns a summary dict with the
+        number of files converted, skipped and failed.
+        - progress_callback: Called as progress_callback(input_file, state, info)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.load_manifest()
+        errors = []
+        jobs = self.plan(inputs, errors)
+        summary = {"converted": 0, "skipped": len(inputs) - len(jobs) - len(errors),
+                   "failed": len(errors)}
+        for input_file, error in errors:
+            if progress_callback:
+                progress_callback(input_file, "failed", error)
+
+        for input_file, output_file, checksum in jobs:
+            self.manifest["files"][input_file] = {
+                "state": "pending", "checksum": checksum, "settings": self.settings,
+                "output": output_file, "updated": time.time(),
+            }
+        self.save_manifest()
+        if not jobs:
+            return summary
+
+        with ProcessPoolExecutor(max_workers=min(self.concurrency, len(jobs))) as pool:
+            futures = {pool.submit(_convert_file, input_file, output_file, self.speed_factor,
+                                   self.decode_strategy, self.encoder, self.frame_mode,
+                                   self.blend_samples, self.selection): input_file
+                       for input_file, output_file, _ in jobs}
+            try:
+                for future in as_completed(futures):
+                    input_file = futures[future]
+                    try:
+                        elapsed, strategy = future.result()
+                    except Exception as e:
+                        summary["failed"] += 1
+                        self._update(input_file, state="failed", error=str(e))
+                        if progress_callback:
+                            progress_callback(input_file, "failed", str(e))
+                        continue
+                    summary["converted"] += 1
+                    self._update(input_file, state="done", error=None,
+                                 seconds=round(elapsed, 3), strategy=strategy)
+                    if progress_callback:
+                        progress_callback(input_file, "done", elapsed)
+            except KeyboardInterrupt:
+                # Finished files are already in the manifest; the rest stay pending
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return summary
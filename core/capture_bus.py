@@ -0,0 +1,227 @@
+import threading
+import time
+
+from core.cursor import get_cursor_pos
+from core.frame_ops import CursorSprite, grab_bgra
+from core.frame_queue import FrameQueue
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+def _region_key(geometry):
+    return (geometry['left'], geometry['top'], geometry['width'], geometry['height'])
+
+
+class Frame:
+    """
+    One grab published on the bus. data is a BGRA array shared by every subscriber
+    and must be treated as read-only.
+    """
+
+    __slots__ = ('timestamp', 'monotonic', 'data', 'cursor_pos', 'geometry',
+                 '_resized', '_lock')
+
+    def __init__(self, data, geometry, cursor_pos=None, timestamp=None, monotonic=None):
+        self.data = data
+        self.geometry = geometry
+        self.cursor_pos = cursor_pos
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic = time.monotonic() if monotonic is None else monotonic
+        self._resized = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.data.shape[1], self.data.shape[0]
+
+    def resized(self, size):
+        """Return the frame data at size, computing each size once for all subscribers"""
+        if size is None or tuple(size) == self.size:
+            return self.data
+        size = tuple(size)
+        with self._lock:
+            data = self._resized.get(size)
+            if data is None:
+                interpolation = cv2.INTER_AREA if size[0] <= self.size[0] else cv2.INTER_LINEAR
+                data = self._resized[size] = cv2.resize(
+                    self.data, size, interpolation=interpolation)
+        return data
+
+
+class Subscription:
+    """
+    A consumer's view of one display on the bus.
+    - fps: Frames per second this consumer wants (None = every grab)
+    - size: (width, height) the frames are delivered at (None = native)
+    """
+
+    def __init__(self, bus, geometry, fps=None, size=None, queue_size=2,
+                 overflow_policy="drop_oldest"):
+        self.bus = bus
+        self.geometry = dict(geometry)
+        self.fps = fps
+        self.size = tuple(size) if size else None
+        self.queue = FrameQueue(queue_size, overflow_policy)
+        self._next_due = 0.0
+        self._last_accepted = None
+
+    @property
+    def closed(self):
+        return self.queue.closed
+
+    def set_fps(self, fps):
+        """Change the rate; the next frame is due one new interval after the last one"""
+        if fps == self.fps:
+            return
+        self.fps = fps
+        if fps and self._last_accepted is not None:
+            self._next_due = self._last_accepted + 1.0 / fps
+        else:
+            self._next_due = 0.0
+        # Let the grabber reschedule for the new rate; it does not grab early because of it
+        self.bus._wake(self)
+
+    def _offer(self, frame, tolerance):
+        """Decimate the grabber's rate down to this subscriber's fps"""
+        if self.fps:
+            # Accept grabs up to half a grab interval early to absorb timing jitter
+            if frame.monotonic < self._next_due - tolerance:
+                return
+            # Keep cadence, but do not try to catch up after a stall
+            self._next_due = max(self._next_due + 1.0 / self.fps, frame.monotonic)
+        self._last_accepted = frame.monotonic
+        self.queue.put(frame)
+
+    def get(self, timeout=None):
+        """
+        Wait for the next frame. Returns (frame, data) with data at the requested size,
+        or None on timeout or once unsubscribed.
+        """
+        frame = self.queue.get(timeout)
+        if frame is None:
+            return None
+        return frame, frame.resized(self.size)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class _DisplayGrabber:
+    """Grabs one region at the highest rate any of its subscribers asks for"""
+
+    def __init__(self, bus, geometry):
+        self.bus = bus
+        self.geometry = dict(geometry)
+        self.subscribers = []
+        self._wake = threading.Event()
+        self._running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def interval(self):
+        with self.bus._lock:
+            rates = [sub.fps or self.bus.max_fps for sub in self.subscribers]
+        return 1.0 / min(max(rates, default=1), self.bus.max_fps)
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        import mss  # Each grabber thread needs its own mss instance
+        with mss.mss() as sct:
+            next_grab = time.monotonic()
+            while self._running:
+                try:
+                    frame = self.bus._grab(sct, self.geometry)
+                    with self.bus._lock:
+                        subscribers = list(self.subscribers)
+                    tolerance = self.interval() / 2
+                    for sub in subscribers:
+                        sub._offer(frame, tolerance)
+                except Exception as e:
+                    print(f"Error capturing display for bus: {e}")
+                grabbed_at = next_grab
+                next_grab += self.interval()
+                while self._running:
+                    now = time.monotonic()
+                    if next_grab <= now:
+                        next_grab = now
+                        break
+                    if not self._wake.wait(next_grab - now):
+                        break
+                    self._wake.clear()
+                    # Subscribers or rates changed: reschedule from the last grab
+                    # rather than grabbing right away
+                    next_grab = grabbed_at + self.interval()
+
+
+class CaptureBus:
+    """
+    Shares one grabber per display between every consumer (preview, recorders, ...).
+    Each display is grabbed at the fastest rate requested for it; subscribers receive
+    frames decimated to their own fps and scaled to their own size.
+    - max_fps: Upper bound for any grabber, also the rate for subscribers with fps=None
+    - draw_cursor: Blend the cursor into every grab once, before it is shared
+    """
+
+    def __init__(self, max_fps=30, draw_cursor=True):
+        self.max_fps = max_fps
+        self.draw_cursor = draw_cursor
+        self.cursor = CursorSprite() if draw_cursor else None
+        self._grabbers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, geometry, fps=None, size=None, queue_size=2,
+                  overflow_policy="drop_oldest"):
+        sub = Subscription(self, geometry, fps, size, queue_size, overflow_policy)
+        key = _region_key(geometry)
+        with self._lock:
+            grabber = self._grabbers.get(key)
+            start = grabber is None
+            if start:
+                grabber = self._grabbers[key] = _DisplayGrabber(self, geometry)
+            grabber.subscribers.append(sub)
+        if start:
+            grabber.thread.start()
+        else:
+            grabber._wake.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        key = _region_key(sub.geometry)
+        with self._lock:
+            grabber = self._grabbers.get(key)
+            if grabber and sub in grabber.subscribers:
+                grabber.subscribers.remove(sub)
+                if not grabber.subscribers:
+                    # Last consumer gone: stop grabbing this display
+                    grabber.stop()
+                    del self._grabbers[key]
+        sub.queue.close()
+
+    def close(self):
+        with self._lock:
+            grabbers = list(self._grabbers.values())
+        for grabber in grabbers:
+            for sub in list(grabber.subscribers):
+                self.unsubscribe(sub)
+
+    def _wake(self, sub):
+        with self._lock:
+            grabber = self._grabbers.get(_region_key(sub.geometry))
+        if grabber:
+            grabber._wake.set()
+
+    def _grab(self, sct, geometry):
+        data = grab_bgra(sct, geometry)
+        cursor_pos = None
+        if self.draw_cursor:
+            cursor_pos = get_cursor_pos()
+            if cursor_pos is not None:
+                cursor_x = cursor_pos[0] - geometry['left']
+                cursor_y = cursor_pos[1] - geometry['top']
+                if (0 <= cursor_x < geometry['width'] and
+                        0 <= cursor_y < geometry['height']):
+                    self.cursor.blend(data, cursor_x, cursor_y)
+        return Frame(data, geometry, cursor_pos)
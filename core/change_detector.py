@@ -0,0 +1,89 @@
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class ChangeDetector:
+    """
+    Decides whether a captured frame differs from the last accepted one.
+    Each grab is area-averaged into a small grayscale fingerprint which is split into
+    tiles of cell_size x cell_size fingerprint pixels. A tile scores the largest change of
+    any of its pixels, so a small change such as a blinking caret is judged against the
+    screen area of one fingerprint pixel (about 15x15 at 1080p), not the whole tile.
+    - grid: (columns, rows) of tiles
+    - threshold: Difference (0-255) of one fingerprint pixel above which its tile is dirty;
+      a full-contrast change covering about threshold / 255 of that area (1.5% for the
+      default of 4) is enough
+    - min_dirty_tiles: How many dirty tiles make the frame count as changed
+    - cell_size: Fingerprint pixels per tile side
+    """
+
+    def __init__(self, grid=(16, 9), threshold=4.0, min_dirty_tiles=1, cell_size=8):
+        self.columns, self.rows = grid
+        self.threshold = threshold
+        self.min_dirty_tiles = max(1, int(min_dirty_tiles))
+        self.cell_size = cell_size
+        self.fingerprint_size = (self.columns * cell_size, self.rows * cell_size)
+        self.tile_scores = np.zeros((self.rows, self.columns), dtype=np.float32)
+        self.dirty_tiles = np.ones((self.rows, self.columns), dtype=bool)
+        self.frame_size = None
+        self._small = None
+        self._gray = None
+        self._reference = None
+        self._diff = None
+
+    def reset(self):
+        """Forget the reference frame so the next frame counts as changed"""
+        self._reference = None
+
+    def fingerprint(self, bgra):
+        """Downsample a BGRA or BGR frame into the grayscale fingerprint buffer"""
+        height, width = bgra.shape[:2]
+        self.frame_size = (width, height)
+        fp_w, fp_h = self.fingerprint_size
+        # The area filter reads every pixel; subsampling first would miss thin changes
+        # such as a caret or an underline
+        if self._small is None or self._small.shape[2] != bgra.shape[2]:
+            self._small = np.empty((fp_h, fp_w, bgra.shape[2]), dtype=np.uint8)
+            self._gray = np.empty((fp_h, fp_w), dtype=np.uint8)
+            self._diff = np.empty((fp_h, fp_w), dtype=np.uint8)
+        cv2.resize(bgra, self.fingerprint_size, dst=self._small,
+                   interpolation=cv2.INTER_AREA)
+        code = cv2.COLOR_BGRA2GRAY if bgra.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        cv2.cvtColor(self._small, code, dst=self._gray)
+        return self._gray
+
+    def update(self, bgra):
+        """Compare a frame with the reference. Returns True if it changed."""
+        gray = self.fingerprint(bgra)
+        if self._reference is None:
+            self.tile_scores.fill(255)
+            self.dirty_tiles.fill(True)
+            self._reference = gray.copy()
+            return True
+
+        cv2.absdiff(gray, self._reference, dst=self._diff)
+        cells = self._diff.reshape(self.rows, self.cell_size,
+                                   self.columns, self.cell_size)
+        self.tile_scores[:] = cells.max(axis=(1, 3))
+        np.greater(self.tile_scores, self.threshold, out=self.dirty_tiles)
+        changed = int(self.dirty_tiles.sum()) >= self.min_dirty_tiles
+        if changed:
+            # Only accepted frames become the reference so slow drift still adds up
+            np.copyto(self._reference, gray)
+        return changed
+
+    def dirty_rects(self):
+        """Return the dirty tiles of the last update as (left, top, width, height) in frame pixels"""
+        if self.frame_size is None:
+            return []
+        width, height = self.frame_size
+        rects = []
+        for row, column in zip(*np.nonzero(self.dirty_tiles)):
+            left = column * width // self.columns
+            top = row * height // self.rows
+            right = (column + 1) * width // self.columns
+            bottom = (row + 1) * height // self.rows
+            rects.append((int(left), int(top), int(right - left), int(bottom - top)))
+        return rects
@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from core.encoders import create_encoder
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+def _concat_with_ffmpeg(segment_files, output_file):
+    """Join segments by stream copy. Returns True on success."""
+    fd, list_file = tempfile.mkstemp(suffix=".txt", prefix="concat_",
+                                     dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            for segment in segment_files:
+                path = os.path.abspath(segment).replace("'", "'\\''")
+                f.write(f"file '{path}'\n")
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", list_file, "-c", "copy", output_file],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            print(f"[WARNING] ffmpeg concat failed: {result.stderr.decode(errors='replace').strip()}")
+            return False
+        return True
+    finally:
+        os.remove(list_file)
+
+
+def _concat_by_reencoding(segment_files, output_file, encoder):
+    """Join segments by decoding them with OpenCV and re-encoding them with encoder"""
+    out = None
+    try:
+        for segment in segment_files:
+            cap = cv2.VideoCapture(segment)
+            try:
+                if out is None:
+                    fps = cap.get(cv2.CAP_PROP_FPS)
+                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    out = create_encoder(encoder).open(output_file, fps, (width, height))
+                    if not out.isOpened():
+                        raise IOError(f"Could not open output file for writing: {output_file}")
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    out.write(frame)
+            finally:
+                cap.release()
+    finally:
+        if out is not None:
+            out.release()
+
+
+def concat_segments(segment_files, output_file, encoder=None):
+    """
+    Concatenate video segments with identical encoding settings into output_file.
+    Uses an ffmpeg stream copy when ffmpeg is installed, which keeps every encoded
+    frame untouched. Otherwise the segments are decoded and re-encoded with encoder,
+    which should be the one they were written with (see core.encoders.create_encoder).
+    Returns True if the concatenation was lossless.
+    """
+    segment_files = [f for f in segment_files if os.path.exists(f)]
+    if not segment_files:
+        raise RuntimeError("No segments to concatenate")
+    if len(segment_files) == 1:
+        shutil.copyfile(segment_files[0], output_file)
+        return True
+    if ffmpeg_available() and _concat_with_ffmpeg(segment_files, output_file):
+        return True
+    _concat_by_reencoding(segment_files, output_file, encoder)
+    return False
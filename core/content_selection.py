@@ -0,0 +1,82 @@
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+CHANGE_METRICS = ("mad", "histogram")
+# Frames are scored at this size; enough to see windows, text and motion
+SCORE_SIZE = (96, 54)
+HISTOGRAM_BINS = 32
+
+
+class FrameScorer:
+    """
+    Streaming change score of consecutive frames, computed on small grayscale copies
+    so a multi-hour input scores much faster than it plays.
+    - metric: "mad" (mean absolute pixel difference, 0-255) or "histogram"
+      (Bhattacharyya distance of grayscale histograms scaled to 0-255; ignores motion
+      that keeps the same tones, such as scrolling)
+    The first frame scores 0.
+    """
+
+    def __init__(self, metric="mad", size=SCORE_SIZE):
+        if metric not in CHANGE_METRICS:
+            raise ValueError(f"Unknown change metric: {metric}. Expected one of {CHANGE_METRICS}")
+        self.metric = metric
+        self.size = tuple(size)
+        self._small = None
+        self._gray = None
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def _reduce(self, frame):
+        if self._small is None or self._small.shape[2] != frame.shape[2]:
+            self._small = np.empty((self.size[1], self.size[0], frame.shape[2]), dtype=np.uint8)
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        gray = cv2.cvtColor(self._small, code)
+        if self.metric == "histogram":
+            hist = cv2.calcHist([gray], [0], None, [HISTOGRAM_BINS], [0, 256])
+            return cv2.normalize(hist, hist)
+        return gray
+
+    def score(self, frame):
+        current = self._reduce(frame)
+        previous = self._previous
+        self._previous = current
+        if previous is None:
+            return 0.0
+        if self.metric == "histogram":
+            return 255.0 * cv2.compareHist(previous, current, cv2.HISTCMP_BHATTACHARYYA)
+        return float(cv2.absdiff(previous, current).mean())
+
+
+def select_by_activity(indices, scores, count, idle_weight=0.05):
+    """
+    Pick count of the scored frame indices, spread by activity instead of evenly:
+    frames are placed at even steps of cumulative change, so busy stretches get many
+    frames and idle ones few. Every frame also carries idle_weight times the mean score,
+    so idle periods are collapsed rather than cut out entirely, and no frame weighs more
+    than one output frame, so a single scene change cannot eat the budget.
+    Returns a sorted array of frame indices (all of them if there are not more than count).
+    """
+    indices = np.asarray(indices)
+    if count <= 0 or not len(indices):
+        return indices[:0]
+    if len(indices) <= count:
+        return indices
+    scores = np.asarray(scores, dtype=np.float64)
+    weights = scores + max(float(scores.mean()), 1e-6) * idle_weight
+    # Cap every weight at one output step; the cap changes the total, so repeat a few times
+    for _ in range(8):
+        cap = weights.sum() / count
+        if weights.max() <= cap:
+            break
+        weights = np.minimum(weights, cap)
+    cumulative = np.cumsum(weights)
+    step = cumulative[-1] / count
+    targets = (np.arange(count) + 0.5) * step
+    picked = np.searchsorted(cumulative, targets)
+    return indices[np.unique(np.minimum(picked, len(indices) - 1))]
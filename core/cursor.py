@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+
+
+class CursorProvider:
+    """Reports the global mouse position in virtual-screen pixels, or None if unknown"""
+
+    name = None
+
+    def position(self):
+        raise NotImplementedError
+
+    def idle_seconds(self):
+        """Seconds since the last keyboard or mouse input, or None if the platform cannot tell"""
+        return None
+
+
+class NullCursorProvider(CursorProvider):
+    """Used on headless machines; the cursor is simply not drawn"""
+
+    name = "none"
+
+    def position(self):
+        return None
+
+
+class Win32CursorProvider(CursorProvider):
+    name = "win32"
+
+    def __init__(self):
+        import win32api
+        import win32gui
+        self._win32api = win32api
+        self._win32gui = win32gui
+
+    def position(self):
+        return self._win32gui.GetCursorPos()
+
+    def idle_seconds(self):
+        # Both are millisecond tick counts that wrap around after ~49.7 days
+        elapsed = (self._win32api.GetTickCount() - self._win32api.GetLastInputInfo()) & 0xFFFFFFFF
+        return elapsed / 1000.0
+
+
+class X11CursorProvider(CursorProvider):
+    """Queries the pointer through python-xlib; one X connection per thread"""
+
+    name = "x11"
+
+    def __init__(self, display_name=None):
+        from Xlib import display
+        self._display_module = display
+        self._display_name = display_name
+        self._local = threading.local()
+        # Fail now rather than on the first frame if the X server is unreachable
+        self._root()
+
+    def _root(self):
+        root = getattr(self._local, 'root', None)
+        if root is None:
+            connection = self._display_module.Display(self._display_name)
+            root = self._local.root = connection.screen().root
+        return root
+
+    def position(self):
+        pointer = self._root().query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def idle_seconds(self):
+        # Needs the MIT-SCREEN-SAVER extension, which most X servers have
+        try:
+            return self._root().screensaver_query_info().idle / 1000.0
+        except Exception:
+            return None
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def _detect_provider():
+    if sys.platform == "win32":
+        try:
+            return Win32CursorProvider()
+        except ImportError:
+            pass
+    elif os.environ.get("DISPLAY"):
+        try:
+            return X11CursorProvider()
+        except Exception:
+            pass
+    return NullCursorProvider()
+
+
+def get_cursor_provider():
+    """Return the process-wide cursor provider, picking one for this platform on first use"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _detect_provider()
+    return _provider
+
+
+def set_cursor_provider(provider):
+    global _provider
+    _provider = provider
+
+
+def get_input_idle():
+    """Seconds since the last user input, or None if it cannot be read"""
+    try:
+        return get_cursor_provider().idle_seconds()
+    except Exception as e:
+        print(f"Error reading input idle time: {e}")
+        return None
+
+
+def get_cursor_pos():
+    """Current cursor position, or None if it cannot be read right now"""
+    try:
+        return get_cursor_provider().position()
+    except Exception as e:
+        print(f"Error reading cursor position: {e}")
+        return None
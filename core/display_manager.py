@@ -1,41 +1,39 @@
-from screeninfo import get_monitors
 import tkinter as tk
 
+from core.display_topology import get_topology
+
 
 class DisplayManager:
-    def __init__(self, root=None):
+    """
+    Display list for the UI, backed by the shared DisplayTopology. The topology watcher
+    keeps the list current; refresh() picks up a change and rebinds the current display.
+    """
+
+    def __init__(self, root=None, topology=None):
         self.root = root or tk.Tk()
+        self.topology = topology or get_topology()
         self.available_displays = []
         self.current_display = None
+        self.version = None
         self.detect_displays()
+        self.topology.start()
 
     def detect_displays(self):
-        try:
-            monitors = get_monitors()
-            self.available_displays = []
-            for i, monitor in enumerate(monitors):
-                display_info = {
-                    'id': i,
-                    'name': f"Display {i+1}",
-                    'width': monitor.width,
-                    'height': monitor.height,
-                    'x': monitor.x,
-                    'y': monitor.y,
-                    'is_primary': monitor.is_primary,
-                    'geometry': {
-                        'top': monitor.y,
-                        'left': monitor.x,
-                        'width': monitor.width,
-                        'height': monitor.height
-                    }
-                }
-                self.available_displays.append(display_info)
-            # Set current display to primary or first
-            self.current_display = next(
-                (d for d in self.available_displays if d['is_primary']),
-                self.available_displays[0] if self.available_displays else None
-            )
-        except Exception:
+        self.topology.refresh()
+        self.refresh()
+
+    def refresh(self):
+        """Take over the topology's current layout. Returns True if it changed."""
+        if self.version == self.topology.version and self.available_displays:
+            return False
+        self.version = self.topology.version
+        displays = self.topology.displays
+        if displays:
+            self.available_displays = displays
+            # Stay on the same monitor when it is still there, otherwise use the primary
+            self.current_display = self.topology.rebind(self.current_display) or \
+                self.topology.primary()
+        else:
             # Fallback to single display mode
             self.available_displays = [{
                 'id': 0,
@@ -53,6 +51,7 @@ class DisplayManager:
                 }
             }]
             self.current_display = self.available_displays[0]
+        return True
 
     def get_available_displays(self):
         return self.available_displays
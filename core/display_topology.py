@@ -0,0 +1,227 @@
+import threading
+
+from core.lazy import lazy_import
+
+mss = lazy_import('mss')
+
+# Seconds between checks of the monitor layout
+POLL_INTERVAL = 2.0
+
+
+def probe_monitors():
+    """
+    (left, top, width, height, is_primary) of every monitor, in screeninfo's order.
+    Falls back to mss, which does not know the primary monitor, so its first one is used.
+    """
+    try:
+        from screeninfo import get_monitors
+        return tuple((m.x, m.y, m.width, m.height, bool(m.is_primary)) for m in get_monitors())
+    except ImportError:
+        with mss.mss() as sct:
+            return tuple((m['left'], m['top'], m['width'], m['height'], i == 0)
+                         for i, m in enumerate(sct.monitors[1:]))
+
+
+def _display(index, monitor):
+    left, top, width, height, is_primary = monitor
+    return {
+        'id': index,
+        'name': f"Display {index + 1}",
+        'width': width,
+        'height': height,
+        'x': left,
+        'y': top,
+        'is_primary': is_primary,
+        'geometry': {'top': top, 'left': left, 'width': width, 'height': height},
+    }
+
+
+def map_region(region, old_display, new_display):
+    """
+    Move a capture region from a display to its replacement: a region covering the whole
+    old display covers the whole new one, any other region keeps its offset within the
+    display and is clipped to the new size.
+    """
+    old = old_display['geometry']
+    new = new_display['geometry']
+    if all(region[key] == old[key] for key in ('left', 'top', 'width', 'height')):
+        return dict(new)
+    x = min(region['left'] - old['left'], new['width'] - 1)
+    y = min(region['top'] - old['top'], new['height'] - 1)
+    return {'left': new['left'] + x, 'top': new['top'] + y,
+            'width': min(region['width'], new['width'] - x),
+            'height': min(region['height'], new['height'] - y)}
+
+
+class DisplayTopology:
+    """
+    Cached monitor layout with a background watcher. Display entries are built once per
+    layout change and shared, so lookups never probe the system or build dicts; treat
+    them as read-only. A change bumps version and calls every subscriber with the
+    topology, on the watcher thread.
+    - probe: Returns a tuple of (left, top, width, height, is_primary) per monitor
+    - poll_interval: Seconds between probes while watching
+    """
+
+    def __init__(self, probe=probe_monitors, poll_interval=POLL_INTERVAL):
+        self.probe = probe
+        self.poll_interval = poll_interval
+        self.displays = []
+        self.version = 0
+        self._layout = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._probe_failed = False
+        self.refresh()
+
+    def refresh(self):
+        """Probe the monitors now. Returns True if the layout changed."""
+        try:
+            layout = tuple(self.probe())
+        except Exception as e:
+            # Reported once, not on every poll while the probe keeps failing
+            if not self._probe_failed:
+                print(f"Error detecting displays: {e}")
+            self._probe_failed = True
+            return False
+        self._probe_failed = False
+        with self._lock:
+            if layout == self._layout:
+                return False
+            self._layout = layout
+            self.displays = [_display(i, monitor) for i, monitor in enumerate(layout)]
+            self.version += 1
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in display change handler: {e}")
+        return True
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start(self):
+        """Start the background watcher (once); returns the topology"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="display-watcher",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def get(self, display_id):
+        displays = self.displays
+        return displays[display_id] if 0 <= display_id < len(displays) else None
+
+    def primary(self):
+        displays = self.displays
+        return next((d for d in displays if d['is_primary']), displays[0] if displays else None)
+
+    def display_for(self, region):
+        """The display that overlaps region the most, or None"""
+        best, best_area = None, 0
+        for display in self.displays:
+            g = display['geometry']
+            width = min(g['left'] + g['width'], region['left'] + region['width']) - \
+                max(g['left'], region['left'])
+            height = min(g['top'] + g['height'], region['top'] + region['height']) - \
+                max(g['top'], region['top'])
+            if width > 0 and height > 0 and width * height > best_area:
+                best, best_area = display, width * height
+        return best
+
+    def rebind(self, display):
+        """
+        Find display in the current layout: the same geometry, else the display at the
+        same position (a resolution change). Returns None when it is gone. A display is
+        never matched by size alone, since that would substitute an identical monitor.
+        """
+        if display is None:
+            return None
+        old = display['geometry']
+        displays = self.displays
+        for same in (('left', 'top', 'width', 'height'), ('left', 'top')):
+            for candidate in displays:
+                if all(candidate['geometry'][key] == old[key] for key in same):
+                    return candidate
+        return None
+
+
+class TopologyBinding:
+    """
+    Keeps a capture region attached to its display while the layout changes. The watcher
+    thread only flags a change; the recorder calls check() from its own loop, so geometry
+    is never swapped under a grab in progress.
+    region is the current capture region, or None while its display is disconnected.
+    """
+
+    def __init__(self, topology, region):
+        self.topology = topology
+        self.region = dict(region)
+        self.display = topology.display_for(region)
+        # Last known region, mapped onto the display when it comes back
+        self._region = self.region
+        self._changed = threading.Event()
+        topology.subscribe(self._on_change)
+
+    def _on_change(self, topology):
+        self._changed.set()
+
+    def check(self):
+        """Apply a pending layout change. Returns True if region changed."""
+        if not self._changed.is_set() or self.display is None:
+            return False
+        self._changed.clear()
+        display = self.topology.rebind(self.display)
+        if display is None:
+            if self.region is None:
+                return False
+            print(f"[WARNING] {self.display['name']} was disconnected; "
+                  f"capture pauses until it returns")
+            self.region = None
+            return True
+        region = map_region(self._region, self.display, display)
+        self.display = display
+        if region == self.region:
+            return False
+        print(f"[INFO] {display['name']} is now {region['width']}x{region['height']} "
+              f"at {region['left']},{region['top']}")
+        self.region = self._region = region
+        return True
+
+    def close(self):
+        self.topology.unsubscribe(self._on_change)
+
+
+_topology = None
+_topology_lock = threading.Lock()
+
+
+def get_topology():
+    """Return the process-wide topology, probing the monitors on first use"""
+    global _topology
+    if _topology is None:
+        with _topology_lock:
+            if _topology is None:
+                _topology = DisplayTopology()
+    return _topology
@@ -0,0 +1,176 @@
+import shutil
+import subprocess
+
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class VideoEncoder:
+    """
+    Encoder settings that can open writers. A writer has the cv2.VideoWriter interface:
+    write(frame), release() and isOpened(). Frames are BGR uint8 arrays of the opened size.
+    """
+
+    name = None
+    # Frames between keyframes when the backend guarantees it, otherwise None
+    keyframe_interval = None
+
+    def open(self, output_file, fps, size):
+        raise NotImplementedError
+
+    def settings(self):
+        """JSON-serializable settings that identify the encoded output"""
+        return {"backend": self.name}
+
+
+class Cv2Encoder(VideoEncoder):
+    """Writes through cv2.VideoWriter with the given FourCC"""
+
+    name = "cv2"
+
+    def __init__(self, fourcc="mp4v"):
+        self.fourcc = fourcc
+
+    def settings(self):
+        return {"backend": self.name, "fourcc": self.fourcc}
+
+    def open(self, output_file, fps, size):
+        return cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*self.fourcc),
+                               fps, tuple(size))
+
+
+class FfmpegWriter:
+    """Streams raw BGR frames into an ffmpeg process over its stdin"""
+
+    def __init__(self, command, size):
+        self.size = tuple(size)
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        if frame.shape[1] != self.size[0] or frame.shape[0] != self.size[1]:
+            raise ValueError(
+                f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match writer size "
+                f"{self.size[0]}x{self.size[1]}")
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError) as e:
+            raise IOError(f"ffmpeg stopped accepting frames: {self._error_output()}") from e
+
+    def _error_output(self):
+        try:
+            return self.process.stderr.read().decode(errors='replace').strip()
+        except Exception:
+            return ""
+
+    def release(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        if self.process.wait() != 0:
+            print(f"[ERROR] ffmpeg exited with code {self.process.returncode}: "
+                  f"{self._error_output()}")
+        self.process.stderr.close()
+        self.process = None
+
+
+class FfmpegEncoder(VideoEncoder):
+    """
+    Encodes with an ffmpeg subprocess.
+    - codec: Any ffmpeg video encoder, e.g. "libx264" or "libx265"
+    - preset: Speed/size tradeoff ("ultrafast" ... "veryslow")
+    - crf: Constant rate factor, lower is better quality and bigger files
+    - threads: Encoder threads (0 = let ffmpeg decide)
+    - pix_fmt: Output pixel format
+    - gop: Fixed keyframe interval in frames (None = encoder default)
+    - extra_args: Additional output arguments passed to ffmpeg as-is
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, codec="libx264", preset="veryfast", crf=23, threads=0,
+                 pix_fmt="yuv420p", gop=None, extra_args=None, ffmpeg_path="ffmpeg"):
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads
+        self.pix_fmt = pix_fmt
+        self.gop = gop
+        self.extra_args = list(extra_args or [])
+        self.ffmpeg_path = ffmpeg_path
+
+    def command(self, output_file, fps, size):
+        width, height = size
+        command = [
+            self.ffmpeg_path, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "-",
+            "-c:v", self.codec, "-threads", str(self.threads), "-pix_fmt", self.pix_fmt,
+        ]
+        if self.preset:
+            command += ["-preset", self.preset]
+        if self.crf is not None:
+            command += ["-crf", str(self.crf)]
+        if self.gop:
+            # Fixed GOP without scene-cut keyframes so the sidecar index can predict them
+            command += ["-g", str(self.gop), "-keyint_min", str(self.gop), "-sc_threshold", "0"]
+        if (width % 2 or height % 2) and self.pix_fmt.startswith("yuv420"):
+            # 4:2:0 chroma needs even dimensions
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        return command + self.extra_args + [output_file]
+
+    @property
+    def keyframe_interval(self):
+        return self.gop
+
+    def settings(self):
+        return {"backend": self.name, "codec": self.codec, "preset": self.preset,
+                "crf": self.crf, "threads": self.threads, "pix_fmt": self.pix_fmt,
+                "gop": self.gop, "extra_args": list(self.extra_args),
+                "ffmpeg_path": self.ffmpeg_path}
+
+    def open(self, output_file, fps, size):
+        if shutil.which(self.ffmpeg_path) is None:
+            raise IOError(f"ffmpeg executable not found: {self.ffmpeg_path}")
+        return FfmpegWriter(self.command(output_file, fps, size), size)
+
+
+ENCODERS = {
+    Cv2Encoder.name: Cv2Encoder,
+    FfmpegEncoder.name: FfmpegEncoder,
+}
+
+
+def create_encoder(spec=None):
+    """
+    Build an encoder from a spec:
+    - None: the default cv2 "mp4v" encoder
+    - a VideoEncoder instance: used as-is
+    - a backend name: "cv2" or "ffmpeg"
+    - a dict: {"backend": "ffmpeg", "preset": "slow", "crf": 28, ...}
+    - {"backend": "segmented", "encoder": <spec>, "segment_seconds": 600, ...} for
+      rolling segments, see core.segmented_output
+    """
+    if spec is None:
+        return Cv2Encoder()
+    if isinstance(spec, VideoEncoder):
+        return spec
+    if isinstance(spec, str):
+        spec = {"backend": spec}
+    settings = dict(spec)
+    backend = settings.pop("backend", Cv2Encoder.name)
+    if backend == "segmented":
+        # Imported here because segmented output builds on this module
+        from core.segmented_output import SegmentedEncoder
+        return SegmentedEncoder(**settings)
+    if backend not in ENCODERS:
+        raise ValueError(f"Unknown encoder backend: {backend}. Expected one of {tuple(ENCODERS)}")
+    return ENCODERS[backend](**settings)
@@ -0,0 +1,62 @@
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+BLEND_MODES = ("average", "motion_blur")
+# Largest group a uint16 sum of uint8 frames can hold without overflowing
+UINT16_MAX_FRAMES = 65535 // 255
+
+
+class FrameBlender:
+    """
+    Blends a group of frames into one with a running accumulator, so memory stays at a
+    single frame buffer however many frames are in the group. Buffers are reused
+    across groups.
+    - mode: "average" weighs every frame equally, "motion_blur" is an exponential trail
+      where the latest frames weigh the most
+    - group_size: Largest number of frames per group; small groups of "average" sum
+      into uint16, everything else into float32
+    """
+
+    def __init__(self, mode="average", group_size=None):
+        if mode not in BLEND_MODES:
+            raise ValueError(f"Unknown blend mode: {mode}. Expected one of {BLEND_MODES}")
+        self.mode = mode
+        self.group_size = group_size
+        self.count = 0
+        if mode == "average" and group_size and group_size <= UINT16_MAX_FRAMES:
+            self.dtype = np.uint16
+        else:
+            self.dtype = np.float32
+        # Weight of the newest frame in the motion blur trail
+        self.alpha = 2.0 / ((group_size or 1) + 1)
+        self._accumulator = None
+        self._out = None
+
+    def add(self, frame):
+        if self._accumulator is None or self._accumulator.shape != frame.shape:
+            self._accumulator = np.empty(frame.shape, dtype=self.dtype)
+            self._out = np.empty(frame.shape, dtype=np.uint8)
+            self.count = 0
+        if self.count == 0:
+            np.copyto(self._accumulator, frame, casting='unsafe')
+        elif self.mode == "motion_blur":
+            cv2.accumulateWeighted(frame, self._accumulator, self.alpha)
+        elif self.dtype == np.uint16:
+            np.add(self._accumulator, frame, out=self._accumulator)
+        else:
+            cv2.accumulate(frame, self._accumulator)
+        self.count += 1
+
+    def result(self):
+        """
+        Return the blended frame and start a new group. The returned array is
+        overwritten by the next result, so write it out before blending again.
+        """
+        if self.count == 0:
+            return None
+        scale = 1.0 / self.count if self.mode == "average" else 1.0
+        cv2.convertScaleAbs(self._accumulator, dst=self._out, alpha=scale)
+        self.count = 0
+        return self._out
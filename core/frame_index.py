@@ -0,0 +1,174 @@
+import os
+import struct
+
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+SIDECAR_SUFFIX = ".tlidx"
+MAGIC = b"TLIX"
+VERSION = 1
+# magic, version, flags, nominal fps, keyframe interval (0 = unknown), reserved
+HEADER = struct.Struct("<4sHHdII")
+FLAG_CAPTURE_TIMES = 1  # timestamps are wall-clock capture times, not container PTS
+TIMESTAMP = struct.Struct("<d")
+
+
+def sidecar_path(video_file):
+    return video_file + SIDECAR_SUFFIX
+
+
+class FrameIndex:
+    """
+    Timestamps of every frame in a recording plus its keyframe spacing.
+    Loaded from the binary sidecar a recorder writes next to the video:
+    a fixed header followed by one little-endian float64 per frame.
+    """
+
+    def __init__(self, timestamps, fps, keyframe_interval=0, capture_times=True):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.capture_times = capture_times
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def start_time(self):
+        return float(self.timestamps[0]) if len(self.timestamps) else 0.0
+
+    @property
+    def duration(self):
+        if len(self.timestamps) < 2:
+            return 0.0
+        return float(self.timestamps[-1] - self.timestamps[0])
+
+    def relative_times(self):
+        return self.timestamps - self.start_time
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"Frame index too short: {path}")
+        magic, version, flags, fps, keyframe_interval, _ = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a frame index: {path}")
+        # The frame count comes from the file size, so a sidecar cut short by a crash still loads
+        count = (len(data) - HEADER.size) // TIMESTAMP.size
+        timestamps = np.frombuffer(data, dtype='<f8', count=count, offset=HEADER.size)
+        return cls(timestamps, fps, keyframe_interval, bool(flags & FLAG_CAPTURE_TIMES))
+
+    def save(self, path):
+        flags = FLAG_CAPTURE_TIMES if self.capture_times else 0
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, flags, float(self.fps),
+                                int(self.keyframe_interval or 0), 0))
+            f.write(self.timestamps.astype('<f8').tobytes())
+
+    @classmethod
+    def build(cls, video_file):
+        """Build an index with one pass over the video, using container timestamps"""
+        cap = cv2.VideoCapture(video_file)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            timestamps = []
+            while cap.grab():
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        finally:
+            cap.release()
+        if fps and timestamps and not any(timestamps[1:]):
+            # Backend without PTS support: fall back to nominal spacing
+            timestamps = [i / fps for i in range(len(timestamps))]
+        return cls(timestamps, fps, capture_times=False)
+
+    def frame_range(self, start=None, end=None):
+        """Frame indices [first, last) captured between start and end seconds into the recording"""
+        times = self.relative_times()
+        first = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+        return first, max(first, last)
+
+    def select(self, step, start=None, end=None):
+        """
+        Pick one frame every `step` seconds of capture time between start and end,
+        choosing the frame closest to each target. Returns sorted unique frame indices.
+        """
+        first, last = self.frame_range(start, end)
+        if first >= last:
+            return np.empty(0, dtype=np.int64)
+        times = self.relative_times()[first:last]
+        if len(times) == 1:
+            return np.array([first], dtype=np.int64)
+        targets = np.arange(times[0], times[-1] + step / 2, step)
+        right = np.clip(np.searchsorted(times, targets), 1, len(times) - 1)
+        left = right - 1
+        picks = np.where(targets - times[left] <= times[right] - targets, left, right)
+        return np.unique(picks) + first
+
+    def keyframe_before(self, index):
+        if not self.keyframe_interval:
+            return None
+        return index - index % self.keyframe_interval
+
+
+class FrameIndexWriter:
+    """
+    Appends capture timestamps to a sidecar while a recording is written.
+    Timestamps are buffered and flushed every flush_every frames; whatever reached the
+    disk before a crash is still a valid index.
+    """
+
+    def __init__(self, path, fps, keyframe_interval=0, flush_every=30):
+        self.path = path
+        self.count = 0
+        self.flush_every = flush_every
+        self._pending = []
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, FLAG_CAPTURE_TIMES, float(fps),
+                                     int(keyframe_interval or 0), 0))
+        self._file.flush()
+
+    def append(self, timestamp):
+        self._pending.append(TIMESTAMP.pack(timestamp))
+        self.count += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._file and self._pending:
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+            self._pending = []
+
+    def close(self):
+        if self._file:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def load_index(video_file, build=True, save=True):
+    """
+    Load the sidecar index of video_file. When it is missing (or unreadable) and build is
+    True, build one with a single scan and, if save is True, store it for next time.
+    Returns None when no index is available.
+    """
+    path = sidecar_path(video_file)
+    if os.path.exists(path):
+        try:
+            return FrameIndex.load(path)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Ignoring frame index {path}: {e}")
+    if not build:
+        return None
+    index = FrameIndex.build(video_file)
+    if save and len(index):
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"[WARNING] Could not save frame index {path}: {e}")
+    return index
@@ -0,0 +1,180 @@
+import os
+
+from core.lazy import lazy_import
+from core.metrics import NULL_METRICS
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+
+# Resolved from the package location so recorders also work outside the repo directory
+CURSOR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'resources', 'cursor.png')
+CURSOR_SIZE = (24, 24)
+
+
+def grab_bgra(sct, monitor):
+    """Grab a region with mss and return it as an HxWx4 BGRA array sharing the mss buffer"""
+    sct_img = sct.grab(monitor)
+    return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(
+        sct_img.height, sct_img.width, 4)
+
+
+class CursorSprite:
+    """
+    Cursor image premultiplied by its alpha so it can be blended straight into frames.
+    Blending only touches the pixels under the cursor and works on BGR or BGRA arrays.
+    """
+
+    def __init__(self, path=CURSOR_PATH, size=CURSOR_SIZE):
+        rgba = np.asarray(Image.open(path).convert('RGBA').resize(size),
+                          dtype=np.float32)
+        alpha = rgba[..., 3:4] / 255.0
+        self.width, self.height = size
+        self.premultiplied = rgba[..., 2::-1] * alpha  # BGR * alpha
+        self.inverse_alpha = 1.0 - alpha
+
+    def blend(self, frame, x, y):
+        """Blend the cursor into frame in place with its top-left corner at (x, y)"""
+        x, y = int(x), int(y)
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, frame_w), min(y + self.height, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+        sx0, sy0 = x0 - x, y0 - y
+        sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+        roi = frame[y0:y1, x0:x1, :3]
+        blended = roi * self.inverse_alpha[sy0:sy1, sx0:sx1] + \
+            self.premultiplied[sy0:sy1, sx0:sx1]
+        np.copyto(roi, blended, casting='unsafe')
+        return frame
+
+
+class FrameConverter:
+    """
+    Turns BGRA captures into BGR frames of output_size using reusable buffers.
+    The returned array is overwritten by the next call, so write it out before converting again.
+    Resize and colour conversion are timed as the "resize" and "color" stages of metrics.
+    """
+
+    def __init__(self, output_size=None, metrics=NULL_METRICS):
+        self.output_size = tuple(output_size) if output_size else None
+        self.metrics = metrics
+        self._resized = None
+        self._out = None
+
+    def _buffer(self, current, shape):
+        if current is None or current.shape != shape:
+            return np.empty(shape, dtype=np.uint8)
+        return current
+
+    def convert(self, bgra):
+        src_h, src_w = bgra.shape[:2]
+        out_w, out_h = self.output_size or (src_w, src_h)
+        self._out = self._buffer(self._out, (out_h, out_w, 3))
+        metrics = self.metrics
+        if (out_w, out_h) == (src_w, src_h):
+            started = metrics.start()
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._out)
+            metrics.stop('color', started)
+            return self._out
+
+        if out_w * out_h <= src_w * src_h:
+            # Downscaling: shrink first so the colour conversion touches fewer pixels
+            self._resized = self._buffer(self._resized, (out_h, out_w, 4))
+            started = metrics.start()
+            cv2.resize(bgra, (out_w, out_h), dst=self._resized,
+                       interpolation=cv2.INTER_AREA)
+            metrics.stop('resize', started)
+            started = metrics.start()
+            cv2.cvtColor(self._resized, cv2.COLOR_BGRA2BGR, dst=self._out)
+            metrics.stop('color', started)
+        else:
+            self._resized = self._buffer(self._resized, (src_h, src_w, 3))
+            started = metrics.start()
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._resized)
+            metrics.stop('color', started)
+            started = metrics.start()
+            cv2.resize(self._resized, (out_w, out_h), dst=self._out,
+                       interpolation=cv2.INTER_LINEAR)
+            metrics.stop('resize', started)
+        return self._out
+
+
+def fit_size(size, box):
+    """
+    Largest size with the aspect ratio of size that fits in box, never larger than size.
+    Scaled sizes are rounded down to even dimensions for 4:2:0 encoders; an unscaled size
+    is returned as-is so no resize is needed.
+    """
+    width, height = size
+    scale = min(box[0] / width, box[1] / height)
+    if scale >= 1:
+        return width, height
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+class ResizePyramid:
+    """
+    Turns one BGRA capture into BGR frames of several sizes in one pass, for recordings
+    with several renditions. Each distinct size is computed once and shared; smaller sizes
+    are scaled down from the smallest level already computed rather than from the full
+    capture, and a size equal to the capture is only colour converted.
+    convert() returns one array per entry of sizes (None = capture size), overwritten by
+    the next call like FrameConverter. wanted, one flag per entry, skips the entries that
+    are not needed for this frame (e.g. a rendition keeping 1 frame in 3); they are None.
+    """
+
+    def __init__(self, sizes, metrics=NULL_METRICS):
+        self.sizes = [tuple(size) if size else None for size in sizes]
+        self.metrics = metrics
+        self._buffers = {}
+
+    def _buffer(self, size, channels=3):
+        key = (size, channels)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = np.empty((size[1], size[0], channels), dtype=np.uint8)
+        return buffer
+
+    def convert(self, bgra, wanted=None):
+        src_h, src_w = bgra.shape[:2]
+        source = (src_w, src_h)
+        if wanted is None:
+            wanted = [True] * len(self.sizes)
+        needed = {size or source for size, want in zip(self.sizes, wanted) if want}
+        metrics = self.metrics
+        levels = {}
+        for size in sorted(needed, key=lambda s: s[0] * s[1], reverse=True):
+            out = self._buffer(size)
+            parents = [level for level in levels if level[0] >= size[0] and level[1] >= size[1]]
+            if size == source:
+                started = metrics.start()
+                cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+                metrics.stop('color', started)
+            elif parents:
+                parent = min(parents, key=lambda s: s[0] * s[1])
+                started = metrics.start()
+                cv2.resize(levels[parent], size, dst=out, interpolation=cv2.INTER_AREA)
+                metrics.stop('resize', started)
+            elif size[0] <= src_w and size[1] <= src_h:
+                # Shrink first so the colour conversion touches fewer pixels
+                resized = self._buffer(size, 4)
+                started = metrics.start()
+                cv2.resize(bgra, size, dst=resized, interpolation=cv2.INTER_AREA)
+                metrics.stop('resize', started)
+                started = metrics.start()
+                cv2.cvtColor(resized, cv2.COLOR_BGRA2BGR, dst=out)
+                metrics.stop('color', started)
+            else:
+                # Only explicit sizes larger than the capture get here
+                started = metrics.start()
+                converted = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+                metrics.stop('color', started)
+                started = metrics.start()
+                cv2.resize(converted, size, dst=out, interpolation=cv2.INTER_LINEAR)
+                metrics.stop('resize', started)
+            levels[size] = out
+        return [levels[size or source] if want else None
+                for size, want in zip(self.sizes, wanted)]
@@ -0,0 +1,75 @@
+import collections
+import threading
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class FrameQueue:
+    """
+    Bounded FIFO handing captured frames from the capture stage to the encode workers.
+    - maxsize: Number of frames that may wait for encoding
+    - overflow_policy: What to do when the queue is full
+        "block"       - the producer waits for a free slot
+        "drop_oldest" - the oldest waiting frame is discarded to make room
+        "drop_newest" - the incoming frame is discarded
+    """
+
+    def __init__(self, maxsize=30, overflow_policy="block"):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy: {overflow_policy}. Expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = max(1, int(maxsize))
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """Add a frame. Returns False if the frame was not queued."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.overflow_policy == "block":
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return False
+                elif self.overflow_policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Wait for the next frame. Returns None once the queue is closed and drained,
+        or when timeout seconds pass without a frame.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Stop accepting frames and wake up every waiting producer and consumer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
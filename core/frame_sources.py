@@ -0,0 +1,395 @@
+import glob
+import os
+import re
+import threading
+import time
+
+from core.cursor import X11CursorProvider, get_cursor_pos
+from core.frame_index import load_index
+from core.frame_ops import grab_bgra
+from core.frame_queue import FrameQueue
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+mss = lazy_import('mss')
+np = lazy_import('numpy')
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+SYNTHETIC_PATTERNS = ("static", "noisy", "scrolling", "idle")
+# Distinct frames kept for the noisy pattern, cycled through
+NOISE_FRAMES = 8
+
+
+class FrameSource:
+    """
+    Where a recorder gets its frames from. read() returns (bgra, timestamp, cursor_pos):
+    an HxWx4 BGRA array the caller may draw into, the capture time in seconds since the
+    epoch, and the cursor position in virtual-screen pixels (or None). It returns None
+    once the source has no more frames.
+    - live: Frames come from the present (a screen); False for files and generators,
+      which recorders may drain as fast as they can instead of pacing them
+    - region: left/top/width/height of the frames, known before open()
+    - prefetch: Non-live sources decode this many frames ahead on a background thread,
+      so reading overlaps with encoding (0 = read on the caller's thread). An error on
+      that thread is raised by the read() that would have returned the failed frame.
+    """
+
+    live = False
+
+    def __init__(self, prefetch=0):
+        self.region = None
+        self.prefetch = prefetch
+        self._queue = None
+        self._thread = None
+        self._error = None
+
+    @property
+    def size(self):
+        return self.region['width'], self.region['height']
+
+    def open(self):
+        """Prepare for reading; call from the thread that will read"""
+        self._open()
+        self._error = None
+        if self.prefetch and not self.live:
+            self._queue = FrameQueue(self.prefetch, "block")
+            self._thread = threading.Thread(target=self._prefetch, daemon=True)
+            self._thread.start()
+        return self
+
+    def read(self):
+        if self._queue is None:
+            return self._read()
+        item = self._queue.get()
+        if item is None and self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        return item
+
+    def close(self):
+        if self._queue is not None:
+            self._queue.close()
+            self._thread.join()
+            self._queue = None
+            self._thread = None
+        self._close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _prefetch(self):
+        try:
+            while not self._queue.closed:
+                item = self._read()
+                if item is None or not self._queue.put(item):
+                    break
+        except Exception as e:
+            # Handed to the reader, so a failure does not look like the end of the frames
+            self._error = e
+        finally:
+            self._queue.close()
+
+    def _open(self):
+        pass
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+def monitor_region(monitor=1, display=None):
+    """Geometry of an mss monitor (1 = primary), looked up without keeping a handle open"""
+    with (mss.mss() if display is None else mss.mss(display=display)) as sct:
+        if monitor >= len(sct.monitors):
+            raise ValueError(
+                f"Monitor index {monitor} is out of range. Available monitors: {len(sct.monitors)-1}")
+        region = sct.monitors[monitor]
+    return {key: int(region[key]) for key in ('left', 'top', 'width', 'height')}
+
+
+class MssSource(FrameSource):
+    """
+    Grabs a screen region with mss. display selects another X server (e.g. ":99" for an
+    Xvfb on a render server); its cursor is read from that server too.
+    - region: left/top/width/height to grab (default: the whole monitor)
+    - monitor: mss monitor index used when no region is given (1 = primary)
+    """
+
+    live = True
+
+    def __init__(self, region=None, monitor=1, display=None):
+        super().__init__()
+        self.display = display
+        self.cursor_provider = None
+        if display is not None:
+            try:
+                self.cursor_provider = X11CursorProvider(display)
+            except Exception as e:
+                print(f"[WARNING] Cursor position unavailable on {display}: {e}")
+        if region is None:
+            region = monitor_region(monitor, display)
+        self.region = {key: int(region[key]) for key in ('left', 'top', 'width', 'height')}
+        self._sct = None
+
+    def _mss(self):
+        if self.display is None:
+            return mss.mss()
+        return mss.mss(display=self.display)
+
+    def _open(self):
+        self._sct = self._mss()
+
+    def _read(self):
+        timestamp = time.time()
+        frame = grab_bgra(self._sct, self.region)
+        # Sample the cursor now so the overlay matches the grab
+        if self.display is None:
+            cursor_pos = get_cursor_pos()
+        else:
+            cursor_pos = None
+            if self.cursor_provider is not None:
+                try:
+                    cursor_pos = self.cursor_provider.position()
+                except Exception as e:
+                    print(f"Error reading cursor position: {e}")
+        return frame, timestamp, cursor_pos
+
+    def _close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+def _natural_key(path):
+    return [int(part) if part.isdigit() else part.lower()
+            for part in re.split(r'(\d+)', os.path.basename(path))]
+
+
+def _to_bgra(image, size):
+    if image.dtype == np.uint16:
+        # 16-bit camera dumps
+        image = cv2.convertScaleAbs(image, alpha=1.0 / 257)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    elif image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    if (image.shape[1], image.shape[0]) != size:
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+class ImageSequenceSource(FrameSource):
+    """
+    Reads a sequence of images, e.g. camera dumps, in natural filename order
+    (frame2.png before frame10.png). Every image is scaled to the size of the first.
+    - path: A directory, or a glob pattern such as "dumps/*.jpg"
+    - timestamps: "mtime" uses each file's modification time, "sequence" spaces the
+      frames interval seconds apart from the first file's time
+    """
+
+    def __init__(self, path, timestamps="mtime", interval=1.0, prefetch=4):
+        super().__init__(prefetch)
+        if timestamps not in ("mtime", "sequence"):
+            raise ValueError(f"Unknown timestamp mode: {timestamps}")
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in os.listdir(path)
+                     if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            files = glob.glob(path)
+        self.files = sorted(files, key=_natural_key)
+        if not self.files:
+            raise ValueError(f"No images found at {path}")
+        self.timestamps = timestamps
+        self.interval = interval
+        first = cv2.imread(self.files[0], cv2.IMREAD_UNCHANGED)
+        if first is None:
+            raise IOError(f"Could not read image: {self.files[0]}")
+        self.region = {'left': 0, 'top': 0, 'width': first.shape[1], 'height': first.shape[0]}
+        self._start = os.path.getmtime(self.files[0])
+        self._position = 0
+
+    def __len__(self):
+        return len(self.files)
+
+    def _open(self):
+        self._position = 0
+
+    def _read(self):
+        while self._position < len(self.files):
+            index = self._position
+            self._position += 1
+            path = self.files[index]
+            image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                print(f"[WARNING] Skipping unreadable image: {path}")
+                continue
+            if self.timestamps == "mtime":
+                timestamp = os.path.getmtime(path)
+            else:
+                timestamp = self._start + index * self.interval
+            return _to_bgra(image, self.size), timestamp, None
+        return None
+
+
+class VideoFileSource(FrameSource):
+    """
+    Reads the frames of an existing video. Timestamps come from the recording's sidecar
+    index when there is one (see core.frame_index), otherwise from the container's
+    frame times counted from start_time (default: the file's modification time).
+    - step: Keep 1 frame in step; skipped frames are grabbed but not decoded
+    """
+
+    def __init__(self, path, step=1, start_time=None, prefetch=4):
+        super().__init__(prefetch)
+        self.path = path
+        self.step = max(1, int(step))
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video file: {path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        self.region = {'left': 0, 'top': 0, 'width': width, 'height': height}
+        index = load_index(path, build=False)
+        self._timestamps = index.timestamps if index is not None and len(index) else None
+        self.start_time = os.path.getmtime(path) if start_time is None else start_time
+        self._cap = None
+        self._position = 0
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            raise IOError(f"Could not open video file: {self.path}")
+        self._position = 0
+
+    def _read(self):
+        cap = self._cap
+        while self._position % self.step:
+            if not cap.grab():
+                return None
+            self._position += 1
+        ok, frame = cap.read()
+        if not ok:
+            return None
+        index = self._position
+        self._position += 1
+        if self._timestamps is not None and index < len(self._timestamps):
+            timestamp = float(self._timestamps[index])
+        else:
+            timestamp = self.start_time + index / self.fps
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA), timestamp, None
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+def _desktop(width, height, seed=0):
+    """A flat desktop-like BGRA image with a few windows and some text on it"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 4), (64, 48, 32, 255), dtype=np.uint8)
+    for _ in range(6):
+        x, y = int(rng.integers(0, width * 3 // 4)), int(rng.integers(0, height * 3 // 4))
+        w, h = int(rng.integers(width // 8, width // 3)), int(rng.integers(height // 8, height // 3))
+        color = tuple(int(c) for c in rng.integers(120, 250, 3)) + (255,)
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        for line in range(y + 30, y + h - 10, 24):
+            cv2.putText(image, "lorem ipsum dolor sit amet 0123456789", (x + 10, line),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (20, 20, 20, 255), 1)
+    return image
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generates frames of one pattern, for tests and benchmarks:
+    - static: the same desktop every frame
+    - noisy: random noise, the worst case for change detection and encoders
+    - scrolling: a page of text scrolling a few lines per frame
+    - idle: a static desktop where only a small blinking caret changes
+    frames limits the number of frames (None = endless); timestamps are interval apart.
+    """
+
+    def __init__(self, pattern="static", size=(1920, 1080), frames=None, interval=1.0,
+                 seed=0):
+        super().__init__()
+        if pattern not in SYNTHETIC_PATTERNS:
+            raise ValueError(
+                f"Unknown pattern: {pattern}. Expected one of {SYNTHETIC_PATTERNS}")
+        self.pattern = pattern
+        self.width, self.height = size
+        self.region = {'left': 0, 'top': 0, 'width': self.width, 'height': self.height}
+        self.frames = frames
+        self.interval = interval
+        self.index = 0
+        self._start = time.time()
+        rng = np.random.default_rng(seed)
+        if pattern == "noisy":
+            self._frames = [rng.integers(0, 256, (self.height, self.width, 4), dtype=np.uint8)
+                            for _ in range(NOISE_FRAMES)]
+            return
+        if pattern == "scrolling":
+            page = np.full((self.height * 2, self.width, 4), 250, dtype=np.uint8)
+            for line in range(30, page.shape[0], 22):
+                cv2.putText(page, f"{line:06d} the quick brown fox jumps over the lazy dog",
+                            (20, line), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0, 255), 1)
+            self._page = page
+            return
+        base = _desktop(self.width, self.height, seed)
+        if pattern == "idle":
+            blink = base.copy()
+            cv2.rectangle(blink, (self.width // 2, self.height // 2),
+                          (self.width // 2 + 2, self.height // 2 + 18), (0, 0, 0, 255), -1)
+            self._frames = [base, blink]
+        else:
+            self._frames = [base]
+
+    def next_frame(self):
+        """Return the next frame without copying; callers must not modify it"""
+        index = self.index
+        self.index += 1
+        if self.pattern == "scrolling":
+            offset = (index * 6) % self.height
+            return self._page[offset:offset + self.height]
+        if self.pattern == "idle":
+            # The caret toggles twice a second at 30 fps
+            return self._frames[(index // 15) % 2]
+        return self._frames[index % len(self._frames)]
+
+    def _open(self):
+        self.index = 0
+        self._start = time.time()
+
+    def _read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return None
+        timestamp = self._start + self.index * self.interval
+        return self.next_frame().copy(), timestamp, None
+
+
+def open_source(spec, monitor=1):
+    """
+    Build a frame source from a command-line style spec:
+    None or "screen" (mss), "display:<name>" (another X server such as an Xvfb),
+    "synthetic:<pattern>", a video file, a directory of images or a glob pattern.
+    Objects that are already frame sources are returned unchanged.
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if spec is None or spec == "screen":
+        return MssSource(monitor=monitor)
+    if spec.startswith("display:"):
+        return MssSource(monitor=monitor, display=spec[len("display:"):])
+    if spec.startswith("synthetic:"):
+        return SyntheticSource(spec[len("synthetic:"):])
+    if os.path.isdir(spec) or glob.has_magic(spec) or spec.lower().endswith(IMAGE_EXTENSIONS):
+        return ImageSequenceSource(spec)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec)
+    raise ValueError(f"Unknown frame source: {spec}")
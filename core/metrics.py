@@ -0,0 +1,168 @@
+import bisect
+import json
+import threading
+import time
+
+# Bucket upper bounds in seconds: 32us .. 56s, four buckets per power of ten
+BUCKETS = tuple(round(base * 10 ** exp, 9)
+                for exp in range(-5, 2) for base in (1.0, 1.8, 3.2, 5.6))[2:]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with count, sum, min and max"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Approximate percentile (0-100) as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {str(b): n for b, n in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+
+class RecorderMetrics:
+    """
+    Per-stage timings and counters for a recording session.
+    Stages are timed with start()/stop(); counters with count(). Everything is safe to
+    read from another thread while recording (see snapshot()).
+    """
+
+    enabled = True
+
+    def __init__(self, name="recorder"):
+        self.name = name
+        self.histograms = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def start(self):
+        return time.perf_counter()
+
+    def stop(self, stage, started):
+        self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'started_at': self.started_at,
+                'duration': time.time() - self.started_at,
+                'counters': dict(self.counters),
+                'stages': {stage: h.to_dict() for stage, h in self.histograms.items()},
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="timelapse"):
+        """Render counters and histograms in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        label = f'recorder="{self.name}"'
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{label}}} {value}")
+        metric = f"{prefix}_stage_seconds"
+        if snapshot['stages']:
+            lines.append(f"# TYPE {metric} histogram")
+        for stage, data in sorted(snapshot['stages'].items()):
+            labels = f'{label},stage="{stage}"'
+            cumulative = 0
+            for bound, n in data['buckets'].items():
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{labels}}} {data['sum']}")
+            lines.append(f"{metric}_count{{{labels}}} {data['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the metrics to path; ".prom" and ".txt" get Prometheus text, anything else JSON"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        try:
+            with open(path, 'w') as f:
+                f.write(text)
+        except Exception as e:
+            print(f"Error saving metrics: {e}")
+
+
+class NullMetrics:
+    """Stand-in used when instrumentation is off; every call is a no-op"""
+
+    enabled = False
+
+    def start(self):
+        return 0.0
+
+    def stop(self, stage, started):
+        pass
+
+    def observe(self, stage, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def snapshot(self):
+        return {}
+
+    def dump(self, path):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def create_metrics(metrics, name="recorder"):
+    """Accept True/False/None or a RecorderMetrics instance"""
+    if metrics is None or metrics is False:
+        return NULL_METRICS
+    if metrics is True:
+        return RecorderMetrics(name)
+    return metrics
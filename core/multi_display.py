@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+
+from core.cursor import get_cursor_pos
+from core.encoders import create_encoder
+from core.frame_index import FrameIndexWriter, sidecar_path
+from core.frame_ops import CursorSprite, FrameConverter, grab_bgra
+from core.frame_queue import FrameQueue
+from core.lazy import lazy_import
+from core.scheduler import DeadlineScheduler
+
+cv2 = lazy_import('cv2')
+mss = lazy_import('mss')
+np = lazy_import('numpy')
+
+CAPTURE_MODES = ("auto", "virtual", "staggered")
+# "auto" grabs the virtual screen once when the displays fill at least this much of it
+VIRTUAL_COVERAGE = 0.75
+
+
+def _geometry(display):
+    """Accept DisplayManager entries as well as plain mss-style geometry dicts"""
+    geometry = display.get('geometry', display)
+    return {key: int(geometry[key]) for key in ('left', 'top', 'width', 'height')}
+
+
+def bounding_geometry(displays):
+    """Smallest region containing every display"""
+    left = min(d['left'] for d in displays)
+    top = min(d['top'] for d in displays)
+    right = max(d['left'] + d['width'] for d in displays)
+    bottom = max(d['top'] + d['height'] for d in displays)
+    return {'left': left, 'top': top, 'width': right - left, 'height': bottom - top}
+
+
+def all_displays():
+    """Geometry of every monitor mss reports (without the combined virtual screen)"""
+    with mss.mss() as sct:
+        return [_geometry(monitor) for monitor in sct.monitors[1:]]
+
+
+class _DisplayWriter:
+    """
+    Encodes the frames of one display (or the composite) on its own thread.
+    compose, if given, turns each queued item into the BGRA frame to write.
+    """
+
+    def __init__(self, output_file, size, fps, encoder, queue_size, overflow_policy,
+                 frame_index, compose=None):
+        self.output_file = output_file
+        self.size = size
+        self.compose = compose
+        self.queue = FrameQueue(queue_size, overflow_policy)
+        self.converter = FrameConverter(size)
+        self.out = encoder.open(output_file, fps, size)
+        if not self.out.isOpened():
+            raise IOError(f"Could not open output file for writing: {output_file}")
+        self.index_writer = None
+        if frame_index:
+            self.index_writer = FrameIndexWriter(sidecar_path(output_file), fps,
+                                                 encoder.keyframe_interval)
+        self.written = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                frame, timestamp = item
+                try:
+                    if self.compose is not None:
+                        frame = self.compose(frame)
+                    self.out.write(self.converter.convert(frame))
+                    if self.index_writer is not None:
+                        self.index_writer.append(timestamp)
+                    self.written += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[ERROR] Failed to write frame to {self.output_file}: {e}")
+        finally:
+            self.out.release()
+            if self.index_writer is not None:
+                self.index_writer.close()
+
+    def close(self):
+        """Let the writer drain its queue and finish the file"""
+        self.queue.close()
+        self.thread.join()
+
+
+class MultiDisplaySession:
+    """
+    Records several displays at once from a single capture loop, with one encoder
+    thread per display and an optional composite of all of them.
+    - output_file: Base name; display N is written to <base>_displayN.mp4
+    - displays: Geometries (or DisplayManager entries) to record (default: every monitor)
+    - interval_seconds: Time between captures; use 1/fps for a regular recording
+    - capture_mode: "virtual" grabs the bounding box of all displays once and slices it,
+      "staggered" grabs each display in turn within the same tick, "auto" picks
+      "virtual" unless the displays leave much of their bounding box empty
+    - composite: Also write <base>_composite.mp4 with the displays in their physical
+      arrangement, scaled by composite_scale
+    - capture_bus: Take the virtual-screen grab from a shared CaptureBus
+    """
+
+    def __init__(self, output_file, displays=None, interval_seconds=2, output_fps=30,
+                 capture_mode="auto", composite=False, composite_scale=0.5, encoder=None,
+                 queue_size=4, overflow_policy="block", frame_index=True, capture_bus=None):
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(
+                f"Unknown capture mode: {capture_mode}. Expected one of {CAPTURE_MODES}")
+        self.output_file = output_file
+        self.displays = [_geometry(d) for d in displays] if displays else all_displays()
+        if not self.displays:
+            raise ValueError("No displays to record")
+        self.bounds = bounding_geometry(self.displays)
+        self.interval_seconds = interval_seconds
+        self.output_fps = output_fps
+        self.capture_mode = self._resolve_mode(capture_mode, capture_bus)
+        self.composite = composite
+        self.composite_scale = composite_scale
+        self.encoder = create_encoder(encoder)
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.frame_index = frame_index
+        self.capture_bus = capture_bus
+        self.cursor = CursorSprite()
+        self.scheduler = DeadlineScheduler(interval_seconds)
+        self.writers = []
+        self.composite_writer = None
+        self.stats = {'captured': 0, 'missed': 0, 'errors': 0}
+        self._recording = False
+        self._subscription = None
+        self._thread = None
+        self._canvas = None
+
+    def _resolve_mode(self, capture_mode, capture_bus):
+        if capture_bus is not None:
+            return "virtual"
+        if capture_mode != "auto":
+            return capture_mode
+        covered = sum(d['width'] * d['height'] for d in self.displays)
+        area = self.bounds['width'] * self.bounds['height']
+        return "virtual" if covered >= area * VIRTUAL_COVERAGE else "staggered"
+
+    def output_files(self):
+        root, ext = os.path.splitext(self.output_file)
+        files = [f"{root}_display{i + 1}{ext or '.mp4'}" for i in range(len(self.displays))]
+        if self.composite:
+            files.append(f"{root}_composite{ext or '.mp4'}")
+        return files
+
+    def composite_size(self):
+        scale = self.composite_scale
+        # Even dimensions keep 4:2:0 encoders happy
+        return (max(2, int(self.bounds['width'] * scale) // 2 * 2),
+                max(2, int(self.bounds['height'] * scale) // 2 * 2))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['written'] = [writer.written for writer in self.writers]
+        stats['dropped'] = [writer.queue.dropped for writer in self.writers]
+        if self.composite_writer is not None:
+            stats['composite_written'] = self.composite_writer.written
+        return stats
+
+    def start(self):
+        if self._recording:
+            return
+        files = self.output_files()
+        self.writers = [
+            _DisplayWriter(path, (d['width'], d['height']), self.output_fps, self.encoder,
+                           self.queue_size, self.overflow_policy, self.frame_index)
+            for path, d in zip(files, self.displays)]
+        self.composite_writer = None
+        if self.composite:
+            # A virtual grab only needs resizing, which the writer's converter already does
+            compose = self._compose if self.capture_mode == "staggered" else None
+            self.composite_writer = _DisplayWriter(
+                files[-1], self.composite_size(), self.output_fps, self.encoder,
+                self.queue_size, self.overflow_policy, self.frame_index, compose)
+        self.stats = {'captured': 0, 'missed': 0, 'errors': 0}
+        self.scheduler.reset()
+        self._recording = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._recording:
+            return
+        self._recording = False
+        self.scheduler.stop()
+        if self._subscription is not None:
+            self._subscription.close()
+        self._thread.join()
+        for writer in self.writers:
+            writer.close()
+        if self.composite_writer is not None:
+            self.composite_writer.close()
+
+    def _blend_cursor(self, frame, origin, cursor_pos):
+        if cursor_pos is None:
+            return
+        x = cursor_pos[0] - origin['left']
+        y = cursor_pos[1] - origin['top']
+        if 0 <= x < frame.shape[1] and 0 <= y < frame.shape[0]:
+            self.cursor.blend(frame, x, y)
+
+    def _grab(self, sct):
+        """Return one BGRA array per display, views into a shared grab where possible"""
+        if self._subscription is not None:
+            item = self._subscription.get(timeout=0.5)
+            if item is None:
+                return None
+            frame, virtual = item
+            timestamp = frame.timestamp
+        else:
+            timestamp = time.time()
+            cursor_pos = get_cursor_pos()
+            if self.capture_mode == "staggered":
+                grabs = []
+                for display in self.displays:
+                    data = grab_bgra(sct, display)
+                    self._blend_cursor(data, display, cursor_pos)
+                    grabs.append(data)
+                return grabs, None, timestamp
+            virtual = grab_bgra(sct, self.bounds)
+            self._blend_cursor(virtual, self.bounds, cursor_pos)
+        grabs = []
+        for display in self.displays:
+            x = display['left'] - self.bounds['left']
+            y = display['top'] - self.bounds['top']
+            grabs.append(virtual[y:y + display['height'], x:x + display['width']])
+        return grabs, virtual, timestamp
+
+    def _compose(self, grabs):
+        """
+        Scale separately grabbed displays into a canvas laid out like their physical
+        arrangement. Runs on the composite writer thread, which reuses the canvas.
+        """
+        width, height = self.composite_size()
+        if self._canvas is None:
+            self._canvas = np.zeros((height, width, 4), dtype=np.uint8)
+        canvas = self._canvas
+        scale_x = width / self.bounds['width']
+        scale_y = height / self.bounds['height']
+        for display, data in zip(self.displays, grabs):
+            x0 = int((display['left'] - self.bounds['left']) * scale_x)
+            y0 = int((display['top'] - self.bounds['top']) * scale_y)
+            x1 = min(width, int((display['left'] + display['width'] - self.bounds['left'])
+                                * scale_x))
+            y1 = min(height, int((display['top'] + display['height'] - self.bounds['top'])
+                                 * scale_y))
+            if x1 > x0 and y1 > y0:
+                cv2.resize(data, (x1 - x0, y1 - y0), dst=canvas[y0:y1, x0:x1],
+                           interpolation=cv2.INTER_AREA)
+        return canvas
+
+    def _run(self):
+        sct = None
+        if self.capture_bus is not None:
+            self._subscription = self.capture_bus.subscribe(
+                self.bounds, fps=1.0 / self.interval_seconds)
+        else:
+            sct = mss.mss()
+        missed = 0
+        try:
+            while self._recording:
+                if self._subscription is None:
+                    if not self.scheduler.wait():
+                        break
+                    if self.scheduler.missed != missed:
+                        self.stats['missed'] += self.scheduler.missed - missed
+                        missed = self.scheduler.missed
+                try:
+                    grabbed = self._grab(sct)
+                    if grabbed is None:
+                        continue
+                    grabs, virtual, timestamp = grabbed
+                    self.stats['captured'] += 1
+                    # Every writer gets a view of the same grab; nothing is copied here
+                    for writer, data in zip(self.writers, grabs):
+                        writer.queue.put((data, timestamp))
+                    if self.composite_writer is not None:
+                        composite = grabs if virtual is None else virtual
+                        self.composite_writer.queue.put((composite, timestamp))
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"[ERROR] Failed to capture displays: {e}")
+        finally:
+            if self._subscription is not None:
+                self._subscription.close()
+                self._subscription = None
+            if sct is not None:
+                sct.close()
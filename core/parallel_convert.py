@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
+
+from core.concat import concat_segments
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+def plan_segments(total_frames, stride, segments):
+    """
+    Split [0, total_frames) into at most `segments` ranges whose starts are multiples
+    of stride, so every segment keeps exactly the frames (or blend groups) the sequential
+    path keeps.
+    """
+    kept = -(-total_frames // stride)
+    per_segment = max(1, -(-kept // segments)) * stride
+    return [(start, min(start + per_segment, total_frames))
+            for start in range(0, total_frames, per_segment)]
+
+
+def split_frames(frames, segments):
+    """Split sorted frame indices into at most `segments` consecutive runs"""
+    frames = list(frames)
+    per_segment = max(1, -(-len(frames) // segments))
+    return [frames[i:i + per_segment] for i in range(0, len(frames), per_segment)]
+
+
+def _convert_segment(input_file, segment_file, start, end, speed_factor, strategy,
+                     encoder, frame_mode, blend_samples, progress_queue, frames=None,
+                     keyframe_interval=None):
+    # Imported here so the worker process only needs the converter itself
+    from core.timelapse import TimeLapseConverter
+
+    converter = TimeLapseConverter(speed_factor, decode_strategy=strategy, encoder=encoder,
+                                   frame_mode=frame_mode, blend_samples=blend_samples)
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out = converter.encoder.open(segment_file, fps, (width, height))
+    written = 0
+    try:
+        if frames is not None:
+            output_frames = converter._frames_at(cap, frames, strategy, keyframe_interval)
+        else:
+            output_frames = converter._output_frames(cap, strategy, start, end)
+        for _, frame in output_frames:
+            out.write(frame)
+            written += 1
+            if progress_queue is not None:
+                progress_queue.put(1)
+    finally:
+        cap.release()
+        out.release()
+    return written
+
+
+def convert_parallel(converter, input_file, output_file, strategy, workers,
+                     progress_callback=None, frames=None, keyframe_interval=None):
+    """
+    Convert input_file with a pool of worker processes, one frame range each, and join
+    the resulting segments into output_file. The kept frames and their order are the
+    same as in the sequential path. The join is an ffmpeg stream copy, so call this only
+    when ffmpeg is available (TimeLapseConverter.convert checks).
+    - frames: Sorted indices of the frames to keep when they were picked up front (from
+      a sidecar index); each worker then gets a run of them instead of a frame range
+    - keyframe_interval: Of the input, for seeking between the picked frames
+    """
+    if frames is not None:
+        segments = [(0, 0, run) for run in split_frames(frames, workers)]
+        expected = len(frames)
+    else:
+        cap = cv2.VideoCapture(input_file)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        stride = converter.stride
+        # Without a reliable frame count the input cannot be split up front
+        if total <= stride * workers:
+            return converter.convert(input_file, output_file, workers=1,
+                                     progress_callback=progress_callback)
+
+        segments = [(start, end, None) for start, end in plan_segments(total, stride, workers)]
+        expected = -(-total // stride)
+    segment_dir = tempfile.mkdtemp(
+        prefix="timelapse_segments_", dir=os.path.dirname(os.path.abspath(output_file)))
+    # Segments use the output's container so the encoder writes them the same way
+    extension = os.path.splitext(output_file)[1] or ".mp4"
+    segment_files = [os.path.join(segment_dir, f"segment_{i:04d}{extension}")
+                     for i in range(len(segments))]
+
+    manager = multiprocessing.Manager() if progress_callback else None
+    progress_queue = manager.Queue() if manager else None
+    frame_count = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(_convert_segment, input_file, segment_file, start, end,
+                                   converter.speed_factor, strategy, converter.encoder,
+                                   converter.frame_mode, converter.blend_samples,
+                                   progress_queue, run, keyframe_interval)
+                       for segment_file, (start, end, run) in zip(segment_files, segments)}
+            done_frames = 0
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    frame_count += future.result()
+                if progress_queue is not None:
+                    try:
+                        while True:
+                            done_frames += progress_queue.get_nowait()
+                    except Empty:
+                        pass
+                    progress_callback(done_frames, expected)
+
+        if frame_count == 0:
+            raise RuntimeError("No frames were read from the input file")
+        if not concat_segments(segment_files, output_file, converter.encoder):
+            print("[WARNING] ffmpeg could not join the segments by stream copy; they were "
+                  "re-encoded, so the output differs slightly from a sequential conversion")
+    finally:
+        if manager is not None:
+            manager.shutdown()
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    return output_file
@@ -0,0 +1,225 @@
+import multiprocessing
+import time
+
+from core.shared_ring import SharedFrameRing
+
+STAT_KEYS = ('captured', 'dropped', 'late', 'missed', 'written', 'capture_errors',
+             'encode_errors')
+OVERFLOW_POLICIES = ("block", "drop_newest")
+# How long either process waits for the other after stop before giving up on it
+DRAIN_TIMEOUT = 5.0
+
+
+def _count(stats, key, amount=1):
+    # Every counter has a single writing process (errors are counted per process),
+    # so no lock is needed
+    stats[STAT_KEYS.index(key)] += amount
+
+
+def _capture_main(ring, region, fps, overflow_policy, stop_event, stats):
+    """Capture process: grab on schedule straight into ring slots"""
+    from core.cursor import get_cursor_pos
+    from core.frame_ops import grab_bgra
+    from core.scheduler import DeadlineScheduler
+    import mss
+
+    scheduler = DeadlineScheduler(1.0 / fps, stop_event=stop_event)
+    timeout = 0 if overflow_policy == "drop_newest" else None
+    missed = 0
+    try:
+        with mss.mss() as sct:
+            while scheduler.wait():
+                if scheduler.missed != missed:
+                    _count(stats, 'late')
+                    _count(stats, 'missed', scheduler.missed - missed)
+                    missed = scheduler.missed
+                timestamp = time.time()
+                try:
+                    frame = grab_bgra(sct, region)
+                except Exception as e:
+                    _count(stats, 'capture_errors')
+                    print(f"Error capturing frame: {e}")
+                    continue
+                cursor_pos = get_cursor_pos()
+                _count(stats, 'captured')
+                index = ring.acquire(timeout)
+                while index is None and timeout is None and not scheduler.stopped:
+                    index = ring.acquire(0.1)
+                if index is None:
+                    _count(stats, 'dropped')
+                    continue
+                ring.slot(index)[:] = frame
+                ring.publish(index, timestamp, cursor_pos)
+    finally:
+        # Bounded, as a full ring means the encode process is no longer taking frames
+        if not ring.close_stream(DRAIN_TIMEOUT):
+            print("[WARNING] Encode process is not taking frames; could not end the stream")
+        ring.close()
+
+
+def _encode_main(ring, region, output_file, fps, output_size, encoder, frame_index,
+                 stop_event, stats, errors):
+    """
+    Encode process: drain ring slots in order into the writer. A failure that ends the
+    recording (e.g. the writer cannot be opened) stops the capture process and is sent
+    to the parent through errors.
+    """
+    from core.frame_index import FrameIndexWriter, sidecar_path
+    from core.frame_ops import CursorSprite, FrameConverter
+
+    converter = FrameConverter(output_size)
+    cursor = CursorSprite()
+    out = None
+    index_writer = None
+    idle = 0.0
+    frame = None
+    try:
+        out = encoder.open(output_file, fps, output_size)
+        if not out.isOpened():
+            raise IOError(f"Could not open output file for writing: {output_file}")
+        if frame_index:
+            index_writer = FrameIndexWriter(sidecar_path(output_file), fps,
+                                            encoder.keyframe_interval)
+        while True:
+            item = ring.get(timeout=0.5)
+            if item is None:
+                # Normally the capture process ends the stream; give up if it died instead
+                if stop_event.is_set():
+                    idle += 0.5
+                    if idle >= DRAIN_TIMEOUT:
+                        print("[WARNING] Capture process ended without closing the stream")
+                        break
+                continue
+            index, timestamp, cursor_pos = item
+            if index is None:
+                break
+            try:
+                frame = ring.slot(index)
+                if cursor_pos is not None:
+                    cursor.blend(frame, cursor_pos[0] - region['left'],
+                                 cursor_pos[1] - region['top'])
+                out.write(converter.convert(frame))
+                if index_writer is not None:
+                    index_writer.append(timestamp)
+                _count(stats, 'written')
+            except Exception as e:
+                _count(stats, 'encode_errors')
+                print(f"Error encoding frame: {e}")
+            finally:
+                frame = None
+                ring.release(index)
+    except Exception as e:
+        _count(stats, 'encode_errors')
+        print(f"[ERROR] Encode process failed: {e}")
+        stop_event.set()
+        errors.send(str(e))
+    finally:
+        if out is not None:
+            out.release()
+        if index_writer is not None:
+            index_writer.close()
+        converter = None
+        ring.close()
+
+
+class ProcessScreenRecorder:
+    """
+    ScreenRecorder variant that captures and encodes in two child processes, so neither
+    competes with the UI for the GIL and each can run on its own core. Frames move from
+    the capture process to the encode process through a SharedFrameRing; the parent only
+    holds a stop event and shared counters. If the encode process fails, capture stops
+    and stop() raises the error.
+    - slots: Frames that can wait between capture and encode
+    - overflow_policy: "block" waits for a free slot, "drop_newest" drops the new frame
+    - encoder: Encoder backend, see core.encoders.create_encoder (must be picklable)
+    - frame_index: Write a sidecar with the capture time of every frame (see core.frame_index)
+    """
+
+    def __init__(self, output_file="screen_record_raw.mp4", fps=10, capture_region=None,
+                 slots=8, overflow_policy="drop_newest", encoder=None, frame_index=True):
+        from core.encoders import create_encoder
+        from core.frame_ops import fit_size
+        from core.recorder import MAX_OUTPUT_SIZE, primary_monitor_region
+
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy: {overflow_policy}. Expected one of {OVERFLOW_POLICIES}")
+        self.capture_region = dict(capture_region or primary_monitor_region())
+        self.output_file = output_file
+        self.fps = fps
+        self.output_size = fit_size((self.capture_region['width'], self.capture_region['height']),
+                                    MAX_OUTPUT_SIZE)
+        self.slots = slots
+        self.overflow_policy = overflow_policy
+        self.encoder = create_encoder(encoder)
+        self.frame_index = frame_index
+        self.recording = False
+        self._ring = None
+        self._processes = []
+        self._stop_event = multiprocessing.Event()
+        self._stats = multiprocessing.Array('q', len(STAT_KEYS), lock=False)
+        self._errors = None
+
+    def get_stats(self):
+        """Return a snapshot of the frame counters of the current recording"""
+        stats = dict(zip(STAT_KEYS, self._stats[:]))
+        stats['errors'] = stats['capture_errors'] + stats['encode_errors']
+        return stats
+
+    @property
+    def encode_process(self):
+        """The encode process while recording; it ends early if encoding fails"""
+        return self._processes[0] if self._processes else None
+
+    def start(self):
+        if self.recording:
+            return
+        region = {key: self.capture_region[key] for key in ('left', 'top', 'width', 'height')}
+        self._ring = SharedFrameRing((region['height'], region['width'], 4), self.slots)
+        self._stop_event.clear()
+        self._stats[:] = [0] * len(STAT_KEYS)
+        self._errors, errors = multiprocessing.Pipe(duplex=False)
+        self._processes = [
+            multiprocessing.Process(
+                target=_encode_main, name="recorder-encode", daemon=True,
+                args=(self._ring, region, self.output_file, self.fps, self.output_size,
+                      self.encoder, self.frame_index, self._stop_event, self._stats, errors)),
+            multiprocessing.Process(
+                target=_capture_main, name="recorder-capture", daemon=True,
+                args=(self._ring, region, self.fps, self.overflow_policy,
+                      self._stop_event, self._stats)),
+        ]
+        for process in self._processes:
+            process.start()
+        # Only the encode process writes errors
+        errors.close()
+        self.recording = True
+
+    def stop(self, timeout=None):
+        """
+        Stop capturing, wait for the queued frames to be encoded and the file closed.
+        Raises RuntimeError if the encode process failed.
+        """
+        if not self.recording:
+            return
+        self.recording = False
+        self._stop_event.set()
+        for process in reversed(self._processes):
+            process.join(timeout)
+            if process.is_alive():
+                print(f"[WARNING] {process.name} did not exit in time, terminating it")
+                process.terminate()
+                process.join()
+        self._processes = []
+        self._ring.close()
+        self._ring = None
+        error = None
+        try:
+            if self._errors.poll():
+                error = self._errors.recv()
+        except EOFError:
+            pass  # The encode process ended without reporting an error
+        self._errors.close()
+        self._errors = None
+        if error is not None:
+            raise RuntimeError(f"Encoding failed: {error}")
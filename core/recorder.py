@@ -1,21 +1,73 @@
-import cv2
-import numpy as np
-import pyautogui
-from PIL import Image
+import itertools
 import threading
 import time
-import win32gui
-import win32api
+from core.cursor import get_cursor_pos
+from core.display_topology import TopologyBinding
+from core.encoders import create_encoder
+from core.frame_index import FrameIndexWriter, sidecar_path
+from core.frame_ops import CursorSprite, FrameConverter, ResizePyramid, fit_size
+from core.frame_queue import FrameQueue
+from core.frame_sources import MssSource
+from core.lazy import lazy_import
+from core.metrics import create_metrics
+from core.renditions import open_renditions
+from core.scheduler import DeadlineScheduler
+
+mss = lazy_import('mss')
+
+# Captures larger than this are scaled down to fit it unless output_size is given
+MAX_OUTPUT_SIZE = (1920, 1080)
+
+
+def primary_monitor_region():
+    """Geometry of the primary monitor as reported by mss"""
+    with mss.mss() as sct:
+        monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+    return {key: monitor[key] for key in ('left', 'top', 'width', 'height')}
+
+
 
 class ScreenRecorder:
-    def __init__(self, output_file="screen_record_raw.mp4", fps=10, capture_region=None):
+    """
+    Records the screen to a video file at a fixed frame rate.
+    - pipelined: Capture on one thread and encode on separate worker threads
+    - queue_size: Frames that may wait between capture and encode (pipelined mode)
+    - overflow_policy: "block", "drop_oldest" or "drop_newest" when the queue is full
+    - encode_workers: Number of threads preparing frames for the writer (pipelined mode)
+    - capture_bus: Take frames from a shared CaptureBus instead of grabbing directly
+    - encoder: Encoder backend, see core.encoders.create_encoder (default cv2 "mp4v")
+    - metrics: True (or a RecorderMetrics) to time every stage of every frame
+    - metrics_file: Where to dump the metrics when recording stops (.json or .prom)
+    - frame_index: Write a sidecar with the capture time of every frame (see core.frame_index)
+    - source: Where frames come from (see core.frame_sources; default: capture_region via mss)
+    - drain: Read a non-live source as fast as it decodes and encodes instead of at fps;
+      the capture loop ends when the source runs out (see wait())
+    - output_size: (width, height) of the main output (default: the capture scaled down
+      to fit 1920x1080, keeping its aspect ratio; smaller captures are not scaled)
+    - renditions: Extra outputs written from the same frames, e.g. a full-size archive
+      or a small proxy (see core.renditions); all sizes come from one shared resize pass
+    - topology: A DisplayTopology to follow; when the captured monitor moves or changes
+      resolution the region follows it (scaled to the output size), and capture pauses
+      while the monitor is disconnected
+    """
+
+    def __init__(self, output_file="screen_record_raw.mp4", fps=10, capture_region=None,
+                 pipelined=False, queue_size=30, overflow_policy="block", encode_workers=1,
+                 capture_bus=None, encoder=None, metrics=False, metrics_file=None,
+                 frame_index=True, source=None, drain=False, output_size=None,
+                 renditions=None, topology=None):
+        if source is not None and capture_bus is not None:
+            raise ValueError("A frame source cannot be combined with a capture bus")
+        if drain and (capture_bus is not None or source is None or source.live):
+            raise ValueError("Only non-live frame sources can be drained")
+        self.source = source
+        self.drain = drain
+
         # Store capture region
-        self.capture_region = capture_region or {
-            'left': 0,
-            'top': 0,
-            'width': win32api.GetSystemMetrics(0),  # screen width
-            'height': win32api.GetSystemMetrics(1)  # screen height
-        }
+        if source is not None:
+            self.capture_region = source.region
+        else:
+            self.capture_region = capture_region or primary_monitor_region()
 
         self.output_file = output_file
         self.fps = fps
@@ -23,20 +75,68 @@ class ScreenRecorder:
         self.thread = None
 
         # Load the custom cursor image
-        self.cursor_img = Image.open('resources/cursor.png')
         self.cursor_size = (24, 24)  # Standard cursor size
-        self.cursor_img = self.cursor_img.resize(self.cursor_size)
+        self.cursor = CursorSprite(size=self.cursor_size)
 
-        # Standard HD output size
-        self.output_size = (1920, 1080)
-        self.fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        capture_size = (self.capture_region['width'], self.capture_region['height'])
+        if output_size:
+            self.output_size = tuple(output_size)
+        else:
+            self.output_size = fit_size(capture_size, MAX_OUTPUT_SIZE)
+        self.encoder = create_encoder(encoder)
         self.out = None
+        self.renditions = list(renditions or ())
+        self.rendition_writers = []
+        self.topology = topology
+        self._binding = None
+        self.frame_index = frame_index
+        self.index_writer = None
+
+        # Pipeline settings
+        self.pipelined = pipelined
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.encode_workers = max(1, int(encode_workers))
+        self.frame_queue = None
+        self.capture_bus = capture_bus
+        self._subscription = None
+        self.scheduler = DeadlineScheduler(1.0 / self.fps)
+        self._stats_lock = threading.Lock()
+        self.stats = self._new_stats()
+
+        # Instrumentation; a no-op object unless enabled
+        self.metrics = create_metrics(metrics, "screen_recorder")
+        self.metrics_file = metrics_file
 
-    def draw_cursor(self, img):
-        """Draw cursor on the image with proper position calculation"""
+    @staticmethod
+    def _new_stats():
+        return {'captured': 0, 'queued': 0, 'dropped': 0, 'late': 0, 'missed': 0, 'written': 0}
+
+    def get_stats(self):
+        """Return a snapshot of the frame counters for the current recording"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = 0
+        if self.frame_queue is not None:
+            stats['dropped'] += self.frame_queue.dropped
+            stats['queue_depth'] = len(self.frame_queue)
+        if self._subscription is not None:
+            stats['dropped'] += self._subscription.queue.dropped
+        return stats
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+        self.metrics.count(key, amount)
+
+    def draw_cursor(self, frame, cursor_pos=None):
+        """Draw cursor into the BGRA frame in place with proper position calculation"""
         try:
             # Get current cursor position as tuple (x, y)
-            cursor_pos = win32gui.GetCursorPos()
+            if cursor_pos is None:
+                cursor_pos = get_cursor_pos()
+                if cursor_pos is None:
+                    return frame  # No cursor information on this platform
 
             # Calculate cursor position relative to capture region
             cursor_x = cursor_pos[0] - self.capture_region['left']
@@ -46,82 +146,293 @@ class ScreenRecorder:
             if (0 <= cursor_x < self.capture_region['width'] and
                     0 <= cursor_y < self.capture_region['height']):
 
-                # Create a copy of the image
-                result = img.copy()
-                # Paste cursor at the adjusted position
-                result.paste(self.cursor_img, (int(cursor_x),
-                             int(cursor_y)), self.cursor_img)
-                return result
+                # Blend cursor at the adjusted position
+                self.cursor.blend(frame, cursor_x, cursor_y)
 
-            return img  # Return original image if cursor is outside
+            return frame
 
         except Exception as e:
             print(f"Error drawing cursor: {e}")
-            return img  # Return original image if there's an error
+            return frame  # Return original frame if there's an error
+
+    def _make_converter(self):
+        """FrameConverter for the main output, or a ResizePyramid when there are renditions"""
+        if not self.rendition_writers:
+            return FrameConverter(self.output_size, self.metrics)
+        sizes = [self.output_size] + [writer.size for writer in self.rendition_writers]
+        return ResizePyramid(sizes, self.metrics)
+
+    def _process_frame(self, frame, converter, cursor_pos=None, number=0):
+        """
+        Draw the cursor, then resize and convert a BGRA capture into a BGR frame
+        (a list of frames, main output first, when there are renditions; a rendition
+        that skips frame number gets None instead of a resized copy).
+        cursor_pos is the position sampled at grab time; None leaves the frame as captured.
+        """
+        # Draw custom cursor (adjusted for region)
+        if cursor_pos is not None:
+            started = self.metrics.start()
+            self.draw_cursor(frame, cursor_pos)
+            self.metrics.stop('cursor', started)
+
+        # Resize and drop the alpha channel into reusable buffers
+        if self.rendition_writers:
+            return converter.convert(
+                frame, [True] + [writer.wants(number) for writer in self.rendition_writers])
+        return converter.convert(frame)
+
+    def _capture_loop(self, source, handle_frame):
+        """Read frames on schedule (or as fast as possible when draining) into handle_frame"""
+        if self.capture_bus is not None:
+            return self._bus_capture_loop(handle_frame)
+
+        scheduler = self.scheduler
+        metrics = self.metrics
+        missed = 0
+        while self.recording and (self.drain or scheduler.wait()):
+            if not self._follow_topology(source):
+                continue
+            if scheduler.missed != missed:
+                # Processing overran whole frame slots; those frames are skipped, not made up
+                self._count('late')
+                self._count('missed', scheduler.missed - missed)
+                missed = scheduler.missed
+            started = metrics.start()
+            if metrics.enabled:
+                metrics.observe('schedule_jitter', scheduler.lateness)
+            # The source samples the cursor with the grab so the overlay matches it
+            item = source.read()
+            metrics.stop('grab', started)
+            if item is None:
+                return  # A file or generator source ran out of frames
+            frame, timestamp, cursor_pos = item
+            self._count('captured')
+            handle_frame(frame, cursor_pos, timestamp)
+
+    def _bus_capture_loop(self, handle_frame):
+        """
+        Receive frames from the capture bus, already paced and scaled to output_size.
+        The bus draws the cursor itself, so no cursor position is passed on.
+        """
+        self._subscription = self._bus_subscribe()
+        frame_duration = 1.0 / self.fps
+        last_frame_time = None
+        try:
+            while self.recording:
+                if not self._follow_topology():
+                    # Nothing to subscribe to until the display returns
+                    self.scheduler.wait()
+                    continue
+                item = self._subscription.get(timeout=0.5)
+                if item is None:
+                    continue
+                frame, data = item
+                self._count('captured')
+                if last_frame_time is not None:
+                    gap = frame.monotonic - last_frame_time
+                    if self.metrics.enabled:
+                        self.metrics.observe('schedule_jitter', abs(gap - frame_duration))
+                    # A gap of more than one and a half frames means the bus fell behind
+                    if gap > frame_duration * 1.5:
+                        self._count('late')
+                last_frame_time = frame.monotonic
+                handle_frame(data, None, frame.timestamp)
+        finally:
+            if self._subscription is not None:
+                self._subscription.close()
+                self.metrics.count('dropped', self._subscription.queue.dropped)
+
+    def _bus_subscribe(self):
+        # Renditions are resized here from the native frame, so only ask the bus for it then
+        size = None if self.rendition_writers else self.output_size
+        return self.capture_bus.subscribe(self.capture_region, fps=self.fps, size=size)
+
+    def _follow_topology(self, source=None):
+        """
+        Apply a pending display change to the capture region and the source or bus
+        subscription. Returns False while the captured display is disconnected.
+        """
+        binding = self._binding
+        if binding is None:
+            return True
+        if binding.check():
+            if binding.region is not None:
+                self.capture_region = binding.region
+                if source is not None:
+                    source.region = binding.region
+            if self.capture_bus is not None:
+                if self._subscription is not None:
+                    self._subscription.close()
+                    self._subscription = None
+                if binding.region is not None:
+                    self._subscription = self._bus_subscribe()
+        return binding.region is not None
 
     def record_loop(self):
-        import mss  # Ensure mss is imported in the thread context
-        sct = mss.mss()  # Create a new mss instance for this thread
-        self.out = cv2.VideoWriter(
-            self.output_file, self.fourcc, self.fps, self.output_size)
-
-        frame_duration = 1.0 / self.fps  # Time per frame in seconds
-        next_frame_time = time.time()
-
-        while self.recording:
-            current_time = time.time()
-            # Use mss for screenshot
-            monitor = {
-                "left": self.capture_region['left'],
-                "top": self.capture_region['top'],
-                "width": self.capture_region['width'],
-                "height": self.capture_region['height']
-            }
-            sct_img = sct.grab(monitor)
-            img = Image.frombytes('RGB', sct_img.size, sct_img.rgb)
-
-            # Draw custom cursor (adjusted for region)
-            img = self.draw_cursor(img)
-
-            # Resize to 1920x1080
-            img = img.resize(self.output_size, Image.Resampling.LANCZOS)
-
-            # Convert to numpy array and change color space for OpenCV
-            frame = np.array(img)
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-
-            # Write frame to video
-            self.out.write(frame)
-
-            # Calculate sleep time for next frame
-            next_frame_time += frame_duration
-            sleep_time = next_frame_time - time.time()
-
-            # Only sleep if we're ahead of schedule
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            else:
-                # We're behind schedule, update next_frame_time
-                next_frame_time = time.time()
+        source = None
+        if self.capture_bus is None:
+            # Opened on this thread; mss handles must not cross threads
+            source = (self.source or MssSource(region=self.capture_region)).open()
+        self._subscription = None
+        self._open_output()
+        self.frame_queue = None
+        with self._stats_lock:
+            self.stats = self._new_stats()
+        if self.topology is not None and self.source is None:
+            self._binding = TopologyBinding(self.topology, self.capture_region)
+
+        try:
+            if self.pipelined:
+                self._record_pipelined(source)
+                return
+
+            converter = self._make_converter()
+            numbers = itertools.count()
+
+            def write_frame(frame, cursor_pos, timestamp):
+                processed = self._process_frame(frame, converter, cursor_pos, next(numbers))
+                self._write_outputs(processed, timestamp)
+
+            self._capture_loop(source, write_frame)
+        finally:
+            if source is not None:
+                source.close()
+            if self._binding is not None:
+                self._binding.close()
+                self._binding = None
+
+    def _record_pipelined(self, source):
+        # A drained source must not lose frames, so it always waits for queue space
+        policy = "block" if self.drain else self.overflow_policy
+        self.frame_queue = FrameQueue(self.queue_size, policy)
+        self._dequeue_lock = threading.Lock()
+        self._write_cond = threading.Condition()
+        self._next_seq = 0
+        self._next_write_seq = 0
+
+        workers = [threading.Thread(target=self._encode_worker, daemon=True)
+                   for _ in range(self.encode_workers)]
+        for worker in workers:
+            worker.start()
+
+        def enqueue_frame(frame, cursor_pos, timestamp):
+            dropped = self.frame_queue.dropped
+            if self.frame_queue.put((frame, cursor_pos, timestamp)):
+                self._count('queued')
+            if self.frame_queue.dropped != dropped:
+                self.metrics.count('dropped', self.frame_queue.dropped - dropped)
+
+        try:
+            self._capture_loop(source, enqueue_frame)
+        finally:
+            # Let the workers drain what is already queued
+            self.frame_queue.close()
+            for worker in workers:
+                worker.join()
+
+    def _encode_worker(self):
+        # Each worker owns its buffers; they are reused once its frame is written
+        converter = self._make_converter()
+        while True:
+            # Sequence numbers are taken on dequeue so dropped frames leave no gaps
+            with self._dequeue_lock:
+                item = self.frame_queue.get()
+                if item is None:
+                    return
+                seq = self._next_seq
+                self._next_seq += 1
+
+            captured, cursor_pos, timestamp = item
+            frame = None
+            try:
+                frame = self._process_frame(captured, converter, cursor_pos, seq)
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+
+            # Frames may finish out of order with several workers; write them in order
+            with self._write_cond:
+                while seq != self._next_write_seq:
+                    self._write_cond.wait()
+                try:
+                    if frame is not None:
+                        self._write_outputs(frame, timestamp)
+                finally:
+                    self._next_write_seq += 1
+                    self._write_cond.notify_all()
+
+    def _open_output(self):
+        """Open the video writer and the sidecar frame index for a new recording"""
+        self.out = self.encoder.open(self.output_file, self.fps, self.output_size)
+        self.index_writer = None
+        if self.frame_index:
+            self.index_writer = FrameIndexWriter(sidecar_path(self.output_file), self.fps,
+                                                 self.encoder.keyframe_interval)
+        capture_size = (self.capture_region['width'], self.capture_region['height'])
+        self.rendition_writers = open_renditions(self.renditions, self.output_file, self.fps,
+                                                 capture_size, self.encoder, self.frame_index)
+
+    def _write(self, frame, timestamp):
+        """Encode one frame and record its capture time in the sidecar index"""
+        started = self.metrics.start()
+        self.out.write(frame)
+        self.metrics.stop('encode', started)
+        if self.index_writer is not None:
+            self.index_writer.append(timestamp)
+        self._count('written')
+
+    def _write_outputs(self, processed, timestamp):
+        """Write a converted frame, or the main frame and the renditions from a pyramid"""
+        if not self.rendition_writers:
+            self._write(processed, timestamp)
+            return
+        self._write(processed[0], timestamp)
+        for writer, frame in zip(self.rendition_writers, processed[1:]):
+            if frame is None:
+                continue
+            started = self.metrics.start()
+            writer.write(frame, timestamp)
+            self.metrics.stop('encode', started)
 
     def start(self):
         if not self.recording:
             self.recording = True
+            self.scheduler.reset()
             self.thread = threading.Thread(target=self.record_loop)
             self.thread.start()
 
+    def wait(self, timeout=None):
+        """
+        Wait for the capture loop to end, which a drained source does on its own once it
+        runs out of frames. Returns True if it ended; call stop() afterwards to finish the file.
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+            return not self.thread.is_alive()
+        return True
+
     def stop(self):
         if self.recording:
             self.recording = False
+            # Wake the capture loop now instead of after its current wait
+            self.scheduler.stop()
+            if self._subscription is not None:
+                self._subscription.close()
             if self.thread:
                 self.thread.join()
             if self.out:
                 self.out.release()
+            if self.index_writer:
+                self.index_writer.close()
+            for writer in self.rendition_writers:
+                writer.release()
+            if self.metrics_file:
+                self.metrics.dump(self.metrics_file)
 
 
 # Example of using the ScreenRecorder class
 if __name__ == "__main__":
-    recorder = ScreenRecorder(output_file="my_recording.mp4", fps=15)
+    recorder = ScreenRecorder(output_file="my_recording.mp4", fps=15,
+                              pipelined=True, overflow_policy="drop_oldest")
     try:
         recorder.start()
         print("Recording... Press Ctrl+C to stop.")
@@ -130,3 +441,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         recorder.stop()
         print("Recording stopped.")
+        print(recorder.get_stats())
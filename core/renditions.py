@@ -0,0 +1,116 @@
+import os
+
+from core.encoders import create_encoder
+from core.frame_index import FrameIndexWriter, sidecar_path
+from core.frame_ops import fit_size
+
+
+class Rendition:
+    """
+    An extra output written from the same captured frames as the main recording,
+    e.g. a small proxy next to a full-quality master.
+    - name: Added to the output file name: <base>_<name>.mp4
+    - size: (width, height) box the frames are fitted into, keeping the aspect ratio
+    - scale: Alternatively a factor of the capture size, e.g. 0.25
+    - every: Keep 1 frame in every; the rendition plays at fps / every
+    - encoder: Encoder spec for this rendition (default: the recording's encoder)
+    Renditions are never larger than the capture, and match it exactly when the box
+    is at least as big, in which case no resizing is done for them.
+    """
+
+    def __init__(self, name, size=None, scale=None, every=1, encoder=None):
+        if size is not None and scale is not None:
+            raise ValueError("A rendition takes either a size or a scale, not both")
+        self.name = name
+        self.size = tuple(size) if size else None
+        self.scale = scale
+        self.every = max(1, int(every))
+        self.encoder = encoder
+
+    def output_size(self, source_size):
+        if self.size is not None:
+            return fit_size(source_size, self.size)
+        if self.scale is not None:
+            return fit_size(source_size, (source_size[0] * self.scale,
+                                          source_size[1] * self.scale))
+        return tuple(source_size)
+
+    def output_file(self, base_file):
+        root, ext = os.path.splitext(base_file)
+        return f"{root}_{self.name}{ext or '.mp4'}"
+
+
+def parse_rendition(spec):
+    """
+    Parse a command-line rendition "name:size[:every[:crf]]" where size is WIDTHxHEIGHT,
+    a height such as 360p or a scale such as 0.25, e.g. "proxy:640x360:3:32".
+    crf only applies with the ffmpeg encoder and is returned separately.
+    """
+    parts = spec.split(":")
+    if len(parts) < 2 or len(parts) > 4 or not parts[0]:
+        raise ValueError(f"Invalid rendition: {spec}. Expected name:size[:every[:crf]]")
+    name, size = parts[0], parts[1].lower()
+    every = int(parts[2]) if len(parts) > 2 and parts[2] else 1
+    crf = int(parts[3]) if len(parts) > 3 else None
+    if "x" in size:
+        width, height = size.split("x")
+        return Rendition(name, size=(int(width), int(height)), every=every), crf
+    if size.endswith("p"):
+        # A height alone; the width is left unconstrained
+        return Rendition(name, size=(1 << 30, int(size[:-1])), every=every), crf
+    return Rendition(name, scale=float(size), every=every), crf
+
+
+class RenditionWriter:
+    """Writes one rendition: its own encoder, sidecar index and frame decimation"""
+
+    def __init__(self, rendition, base_file, fps, source_size, default_encoder=None,
+                 frame_index=True):
+        self.rendition = rendition
+        self.output_file = rendition.output_file(base_file)
+        self.size = rendition.output_size(source_size)
+        self.fps = fps / rendition.every
+        encoder = create_encoder(rendition.encoder if rendition.encoder is not None
+                                 else default_encoder)
+        self.out = encoder.open(self.output_file, self.fps, self.size)
+        if not self.out.isOpened():
+            raise IOError(f"Could not open output file for writing: {self.output_file}")
+        self.index_writer = None
+        if frame_index:
+            self.index_writer = FrameIndexWriter(sidecar_path(self.output_file), self.fps,
+                                                 encoder.keyframe_interval)
+        self.written = 0
+
+    def wants(self, number):
+        """Whether captured frame number (counting from 0) is encoded; 1 in every"""
+        return number % self.rendition.every == 0
+
+    def write(self, frame, timestamp):
+        """Encode a frame picked with wants(); resize only the frames that are kept"""
+        self.out.write(frame)
+        if self.index_writer is not None:
+            self.index_writer.append(timestamp)
+        self.written += 1
+
+    def release(self):
+        if self.out is not None:
+            self.out.release()
+            self.out = None
+        if self.index_writer is not None:
+            self.index_writer.close()
+            self.index_writer = None
+
+
+def open_renditions(renditions, base_file, fps, source_size, default_encoder=None,
+                    frame_index=True):
+    """Open a RenditionWriter per rendition, closing the ones already open on failure"""
+    writers = []
+    try:
+        for rendition in renditions or ():
+            writers.append(RenditionWriter(rendition, base_file, fps, source_size,
+                                           default_encoder, frame_index))
+    except Exception:
+        for writer in writers:
+            writer.release()
+        raise
+    return writers
@@ -0,0 +1,149 @@
+import collections
+import threading
+import time
+
+from core.encoders import create_encoder
+from core.frame_index import FrameIndexWriter, sidecar_path
+from core.lazy import lazy_import
+from core.recorder import ScreenRecorder
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+CODECS = {
+    "jpeg": (".jpg", lambda quality: [cv2.IMWRITE_JPEG_QUALITY, int(quality)]),
+    "png": (".png", lambda quality: [cv2.IMWRITE_PNG_COMPRESSION, 1]),
+}
+
+
+class ReplayBuffer:
+    """
+    Memory-bounded ring of individually compressed frames. Frames older than max_seconds
+    are evicted, and the oldest frames go as well whenever the compressed total would
+    exceed max_bytes, so memory use never grows past the budget. The newest frame is
+    always kept, even when it alone is larger than max_bytes.
+    - codec: "jpeg" (lossy, small) or "png" (lossless, larger)
+    - quality: JPEG quality 1-100
+    """
+
+    def __init__(self, max_seconds=300, max_bytes=256 * 1024 * 1024, codec="jpeg",
+                 quality=80):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown replay codec: {codec}. Expected one of {tuple(CODECS)}")
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.quality = quality
+        self._extension, params = CODECS[codec]
+        self._params = params(quality)
+        self._frames = collections.deque()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evicted = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+    def add(self, frame, timestamp=None):
+        """Compress a BGR frame and append it, evicting by age and byte budget"""
+        timestamp = time.time() if timestamp is None else timestamp
+        ok, encoded = cv2.imencode(self._extension, frame, self._params)
+        if not ok:
+            raise ValueError("Could not compress frame for the replay buffer")
+        data = encoded.tobytes()
+        with self._lock:
+            self._frames.append((timestamp, data))
+            self.total_bytes += len(data)
+            self._evict(timestamp)
+
+    def _evict(self, now):
+        frames = self._frames
+        while len(frames) > 1 and (self.total_bytes > self.max_bytes
+                          or (self.max_seconds and now - frames[0][0] > self.max_seconds)):
+            _, data = frames.popleft()
+            self.total_bytes -= len(data)
+            self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.total_bytes = 0
+
+    def snapshot(self, seconds=None):
+        """(timestamp, compressed bytes) pairs of the last `seconds` (None = everything)"""
+        with self._lock:
+            frames = list(self._frames)
+        if seconds is not None and frames:
+            cutoff = frames[-1][0] - seconds
+            frames = [item for item in frames if item[0] >= cutoff]
+        return frames
+
+    @property
+    def duration(self):
+        with self._lock:
+            if len(self._frames) < 2:
+                return 0.0
+            return self._frames[-1][0] - self._frames[0][0]
+
+    def dump(self, output_file, fps, encoder=None, seconds=None, frame_index=True):
+        """
+        Decode the buffered window and write it to output_file. Works on a snapshot, so
+        frames keep being added while the dump runs. Returns the number of frames written.
+        """
+        frames = self.snapshot(seconds)
+        if not frames:
+            raise RuntimeError("The replay buffer is empty")
+        encoder = create_encoder(encoder)
+        first = cv2.imdecode(np.frombuffer(frames[0][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        out = encoder.open(output_file, fps, (width, height))
+        index_writer = None
+        if frame_index:
+            index_writer = FrameIndexWriter(sidecar_path(output_file), fps,
+                                            encoder.keyframe_interval)
+        try:
+            frame = first
+            for i, (timestamp, data) in enumerate(frames):
+                if i:
+                    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                out.write(frame)
+                if index_writer is not None:
+                    index_writer.append(timestamp)
+        finally:
+            out.release()
+            if index_writer is not None:
+                index_writer.close()
+        return len(frames)
+
+
+class ReplayRecorder(ScreenRecorder):
+    """
+    ScreenRecorder that keeps the last max_seconds of capture in a ReplayBuffer instead of
+    writing a file. Nothing touches the disk until dump() is called, which saves the
+    buffered window while capture carries on. Takes the ScreenRecorder arguments as well,
+    except renditions.
+    - max_seconds, max_bytes, codec, quality: See ReplayBuffer
+    """
+
+    def __init__(self, max_seconds=300, max_bytes=256 * 1024 * 1024, codec="jpeg",
+                 quality=80, **kwargs):
+        if kwargs.get("renditions"):
+            raise ValueError("ReplayRecorder does not support renditions")
+        kwargs.setdefault("output_file", None)
+        super().__init__(**kwargs)
+        self.buffer = ReplayBuffer(max_seconds, max_bytes, codec, quality)
+
+    def _open_output(self):
+        self.out = None
+        self.index_writer = None
+
+    def _write(self, frame, timestamp):
+        started = self.metrics.start()
+        self.buffer.add(frame, timestamp)
+        self.metrics.stop('encode', started)
+        self._count('written')
+
+    def dump(self, output_file, seconds=None):
+        """Write the buffered window (or its last `seconds`) to output_file"""
+        return self.buffer.dump(output_file, self.fps, self.encoder, seconds, self.frame_index)
@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """
+    Paces a capture loop on a fixed grid of time.monotonic() deadlines, so the time spent
+    capturing and encoding does not add to the interval and the cadence never drifts.
+    Deadlines that pass while a tick is still being processed are skipped, not caught
+    up, and counted in missed. stop() wakes a waiting loop at once.
+
+        scheduler = DeadlineScheduler(2.0)
+        while scheduler.wait():
+            capture()
+    """
+
+    def __init__(self, interval, stop_event=None):
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        self.interval = interval
+        self._stop_event = stop_event or threading.Event()
+        self._next_deadline = None
+        self.ticks = 0
+        self.missed = 0
+        # Seconds the last tick started after its deadline
+        self.lateness = 0.0
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def reset(self):
+        """Start a new grid; the next wait() returns immediately"""
+        self._stop_event.clear()
+        self._next_deadline = None
+        self.ticks = 0
+        self.missed = 0
+        self.lateness = 0.0
+
+    def set_interval(self, interval):
+        """Change the interval from the next deadline on, keeping the grid anchored to the last tick"""
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        if self._next_deadline is not None:
+            self._next_deadline += interval - self.interval
+        self.interval = interval
+
+    def wait(self):
+        """
+        Block until the next deadline. Returns False as soon as stop() is called,
+        True when it is time for the next tick.
+        """
+        now = time.monotonic()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        remaining = self._next_deadline - now
+        if remaining > 0 and self._stop_event.wait(remaining):
+            return False
+        if self.stopped:
+            return False
+
+        now = time.monotonic()
+        self.lateness = max(0.0, now - self._next_deadline)
+        # Skip every deadline that has already passed instead of firing them back to back
+        missed = int(self.lateness // self.interval)
+        if missed:
+            self.missed += missed
+            self._next_deadline += missed * self.interval
+            self.lateness -= missed * self.interval
+        self._next_deadline += self.interval
+        self.ticks += 1
+        return True
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,207 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from core.concat import concat_segments, ffmpeg_available
+from core.encoders import VideoEncoder, create_encoder
+
+MANIFEST_NAME = "manifest.json"
+PLAYLIST_NAME = "playlist.m3u"
+# How often (in frames) the size of the open segment is checked
+SIZE_CHECK_FRAMES = 30
+
+
+def segment_dir(output_file):
+    root, _ = os.path.splitext(output_file)
+    return root + ".segments"
+
+
+class SegmentedWriter:
+    """
+    Writer with the cv2.VideoWriter interface that rotates to a new segment file every
+    segment_seconds of wall-clock time or segment_megabytes of output. Closed segments
+    are released on a background thread, so a rotation never stalls the capture loop,
+    and each finished segment is added to a JSON manifest and an m3u playlist.
+    A crash only loses the segment that was open.
+    """
+
+    def __init__(self, encoder, output_file, fps, size, segment_seconds=None,
+                 segment_megabytes=None, concat=True, keep_segments=False):
+        self.encoder = encoder
+        self.output_file = output_file
+        self.fps = fps
+        self.size = tuple(size)
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_megabytes * 1024 * 1024 if segment_megabytes else None
+        self.concat = concat
+        self.keep_segments = keep_segments
+        self.directory = segment_dir(output_file)
+        os.makedirs(self.directory, exist_ok=True)
+        _, self.extension = os.path.splitext(output_file)
+        self.manifest = {
+            "version": 1, "output": os.path.abspath(output_file), "fps": fps,
+            "size": list(self.size), "complete": False, "segments": [],
+        }
+        self._manifest_lock = threading.Lock()
+        self._finalize_queue = queue.Queue()
+        self._finalizer = threading.Thread(target=self._finalize_loop, daemon=True)
+        self._finalizer.start()
+        self.frame_count = 0
+        self._writer = None
+        self._segment = None
+        self._open_segment()
+
+    def isOpened(self):
+        return self._writer is not None and self._writer.isOpened()
+
+    def _open_segment(self):
+        number = 0 if self._segment is None else self._segment["number"] + 1
+        path = os.path.join(self.directory, f"segment_{number:04d}{self.extension}")
+        self._writer = self.encoder.open(path, self.fps, self.size)
+        self._segment = {
+            "number": number, "file": os.path.basename(path), "path": path,
+            "first_frame": self.frame_count, "frames": 0,
+            "started": time.time(), "_opened": time.monotonic(),
+        }
+
+    def _should_rotate(self):
+        segment = self._segment
+        if not segment["frames"]:
+            return False
+        if self.segment_seconds and \
+                time.monotonic() - segment["_opened"] >= self.segment_seconds:
+            return True
+        if self.segment_bytes and segment["frames"] % SIZE_CHECK_FRAMES == 0:
+            try:
+                return os.path.getsize(segment["path"]) >= self.segment_bytes
+            except OSError:
+                return False
+        return False
+
+    def rotate(self):
+        """Close the current segment (finalized in the background) and start the next one"""
+        self._close_segment()
+        self._open_segment()
+
+    def _close_segment(self):
+        segment = self._segment
+        segment["ended"] = time.time()
+        self._finalize_queue.put((self._writer, segment))
+        self._writer = None
+
+    def write(self, frame):
+        if self._should_rotate():
+            self.rotate()
+        self._writer.write(frame)
+        self._segment["frames"] += 1
+        self.frame_count += 1
+
+    def _finalize_loop(self):
+        while True:
+            item = self._finalize_queue.get()
+            if item is None:
+                return
+            writer, segment = item
+            try:
+                writer.release()
+                if segment["frames"]:
+                    segment["bytes"] = os.path.getsize(segment["path"])
+                    self._add_to_manifest(segment)
+                elif os.path.exists(segment["path"]):
+                    os.remove(segment["path"])
+            except Exception as e:
+                print(f"[ERROR] Failed to finalize segment {segment['path']}: {e}")
+
+    def _add_to_manifest(self, segment):
+        entry = {key: value for key, value in segment.items()
+                 if not key.startswith("_") and key != "path"}
+        with self._manifest_lock:
+            self.manifest["segments"].append(entry)
+            self._save_manifest()
+
+    def _save_manifest(self):
+        # Written to temporary files first so a crash never leaves a half-written manifest
+        manifest_file = os.path.join(self.directory, MANIFEST_NAME)
+        playlist_file = os.path.join(self.directory, PLAYLIST_NAME)
+        try:
+            with open(manifest_file + ".tmp", 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(manifest_file + ".tmp", manifest_file)
+            with open(playlist_file + ".tmp", 'w') as f:
+                f.write("#EXTM3U\n")
+                for segment in self.manifest["segments"]:
+                    f.write(f"#EXTINF:{segment['frames'] / self.fps:.3f},\n{segment['file']}\n")
+            os.replace(playlist_file + ".tmp", playlist_file)
+        except Exception as e:
+            print(f"Error saving segment manifest: {e}")
+
+    def segment_files(self):
+        with self._manifest_lock:
+            return [os.path.join(self.directory, segment["file"])
+                    for segment in self.manifest["segments"]]
+
+    def release(self):
+        if self._writer is None:
+            return
+        self._close_segment()
+        self._finalize_queue.put(None)
+        self._finalizer.join()
+        with self._manifest_lock:
+            self.manifest["complete"] = True
+            self._save_manifest()
+        if self.concat and self.manifest["segments"]:
+            if len(self.manifest["segments"]) > 1 and not ffmpeg_available():
+                # Joining without ffmpeg means a slow, lossy re-encode of the whole recording
+                print(f"[WARNING] ffmpeg is not installed, so the segments were not joined; "
+                      f"they are kept in {self.directory}")
+                return
+            try:
+                lossless = concat_segments(self.segment_files(), self.output_file, self.encoder)
+            except Exception as e:
+                print(f"[ERROR] Failed to join segments into {self.output_file}: {e}")
+                return
+            if not lossless:
+                print(f"[WARNING] The segments could not be joined by stream copy and were "
+                      f"re-encoded; the originals are kept in {self.directory}")
+            elif not self.keep_segments:
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SegmentedEncoder(VideoEncoder):
+    """
+    Wraps another encoder so recordings are written as rolling segments
+    (see SegmentedWriter) in <output>.segments next to the output file.
+    - encoder: The encoder each segment is written with (spec for create_encoder)
+    - segment_seconds: Start a new segment after this much wall-clock time
+    - segment_megabytes: Start a new segment once the open one reaches this size
+    - concat: Join the segments into the output file by ffmpeg stream copy when
+      recording stops; without ffmpeg the segments are kept unjoined
+    - keep_segments: Keep the segment directory after a lossless join
+    """
+
+    name = "segmented"
+
+    def __init__(self, encoder=None, segment_seconds=600, segment_megabytes=None,
+                 concat=True, keep_segments=False):
+        self.encoder = create_encoder(encoder)
+        self.segment_seconds = segment_seconds
+        self.segment_megabytes = segment_megabytes
+        self.concat = concat
+        self.keep_segments = keep_segments
+
+    @property
+    def keyframe_interval(self):
+        return self.encoder.keyframe_interval
+
+    def settings(self):
+        return {"backend": self.name, "encoder": self.encoder.settings(),
+                "segment_seconds": self.segment_seconds,
+                "segment_megabytes": self.segment_megabytes, "concat": self.concat,
+                "keep_segments": self.keep_segments}
+
+    def open(self, output_file, fps, size):
+        return SegmentedWriter(self.encoder, output_file, fps, size, self.segment_seconds,
+                               self.segment_megabytes, self.concat, self.keep_segments)
@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+from core.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Per-slot metadata: capture time, cursor x, cursor y, flags
+META_FIELDS = 4
+FLAG_CURSOR = 1
+FLAG_EOF = 2
+
+
+class SharedFrameRing:
+    """
+    Single-producer, single-consumer ring of preallocated frame slots in shared memory.
+    Pixels are written straight into a slot and read back as a NumPy view, so frames
+    cross the process boundary without pickling. Two semaphores count free and filled
+    slots; each side keeps its own position, so slots are handed over strictly in order.
+
+    Create it in the parent and pass it to the child processes as a Process argument
+    (forked or spawned); only the creating process unlinks the memory.
+    """
+
+    def __init__(self, shape, slots=8, dtype='uint8'):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        self._owner_pid = os.getpid()
+        self._free = multiprocessing.Semaphore(slots)
+        self._filled = multiprocessing.Semaphore(0)
+        self._meta = multiprocessing.Array('d', slots * META_FIELDS, lock=False)
+        self._setup()
+
+    def _setup(self):
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype,
+                                  buffer=self._shm.buf)
+        self._write_index = 0
+        self._read_index = 0
+
+    def __getstate__(self):
+        return {
+            'shape': self.shape, 'slots': self.slots, 'dtype': self.dtype.str,
+            'slot_bytes': self.slot_bytes, 'name': self._shm.name, 'owner_pid': self._owner_pid,
+            'free': self._free, 'filled': self._filled, 'meta': self._meta,
+        }
+
+    def __setstate__(self, state):
+        self.shape = state['shape']
+        self.slots = state['slots']
+        self.dtype = np.dtype(state['dtype'])
+        self.slot_bytes = state['slot_bytes']
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner_pid = state['owner_pid']
+        self._free = state['free']
+        self._filled = state['filled']
+        self._meta = state['meta']
+        self._setup()
+
+    def slot(self, index):
+        """Writable view of a slot's pixels"""
+        return self._frames[index]
+
+    # Producer side
+
+    def acquire(self, timeout=None):
+        """Claim the next free slot. Returns its index, or None if none frees up in time."""
+        if not self._free.acquire(timeout=timeout):
+            return None
+        index = self._write_index
+        self._write_index = (index + 1) % self.slots
+        return index
+
+    def publish(self, index, timestamp=0.0, cursor_pos=None, eof=False):
+        """Hand a filled slot to the consumer"""
+        base = index * META_FIELDS
+        flags = FLAG_EOF if eof else 0
+        if cursor_pos is not None:
+            self._meta[base + 1], self._meta[base + 2] = cursor_pos
+            flags |= FLAG_CURSOR
+        self._meta[base] = timestamp
+        self._meta[base + 3] = flags
+        self._filled.release()
+
+    def close_stream(self, timeout=None):
+        """
+        Tell the consumer no more frames follow; waits for a free slot to carry the marker.
+        Returns False if none frees up within timeout, e.g. because the consumer is gone.
+        """
+        index = self.acquire(timeout)
+        if index is None:
+            return False
+        self.publish(index, eof=True)
+        return True
+
+    # Consumer side
+
+    def get(self, timeout=None):
+        """
+        Wait for the next filled slot. Returns (index, timestamp, cursor_pos),
+        None on timeout, or (None, None, None) once the producer closed the stream.
+        The slot stays reserved until release(index).
+        """
+        if not self._filled.acquire(timeout=timeout):
+            return None
+        index = self._read_index
+        self._read_index = (index + 1) % self.slots
+        base = index * META_FIELDS
+        flags = int(self._meta[base + 3])
+        if flags & FLAG_EOF:
+            self._free.release()
+            return None, None, None
+        cursor_pos = None
+        if flags & FLAG_CURSOR:
+            cursor_pos = (int(self._meta[base + 1]), int(self._meta[base + 2]))
+        return index, self._meta[base], cursor_pos
+
+    def release(self, index):
+        """Give a slot back to the producer once its frame has been used"""
+        self._free.release()
+
+    def close(self):
+        self._frames = None
+        self._shm.close()
+        # A forked child inherits this object as-is, so ownership goes by process id
+        if os.getpid() == self._owner_pid:
+            self._shm.unlink()
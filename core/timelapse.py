@@ -1,42 +1,412 @@
-import cv2
 import os
-import mss
-import numpy as np
 import time
-import win32gui
-from PIL import Image
+from core.adaptive_scheduler import AdaptiveScheduler
+from core.change_detector import ChangeDetector
+from core.concat import ffmpeg_available
+from core.content_selection import FrameScorer, select_by_activity
+from core.cursor import get_input_idle
+from core.display_topology import TopologyBinding
+from core.encoders import create_encoder
+from core.frame_blender import FrameBlender
+from core.frame_index import FrameIndex, FrameIndexWriter, load_index, sidecar_path
+from core.frame_ops import CursorSprite, FrameConverter, ResizePyramid
+from core.frame_sources import MssSource, monitor_region
+from core.lazy import lazy_import
+from core.metrics import create_metrics
+from core.renditions import open_renditions
+from core.scheduler import DeadlineScheduler
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+DECODE_STRATEGIES = ("auto", "read", "grab", "seek")
+FRAME_MODES = ("drop", "average", "motion_blur")
+SELECTIONS = ("uniform", "content")
+# Without a known keyframe interval, gaps longer than this are seeked instead of grabbed
+SEEK_DISTANCE = 250
 
 
 class TimeLapseConverter:
-    def __init__(self, speed_factor=10):
+    """
+    Converts a recorded video into a timelapse by keeping 1 frame out of every speed_factor.
+    - decode_strategy: How to get past the frames that are dropped
+        "read" - decode and convert every frame (original behaviour)
+        "grab" - advance with grab() and only retrieve the frames that are kept
+        "seek" - jump straight to each kept frame by index
+        "auto" - time "grab" and "seek" on the input and use the faster one
+    - encoder: Encoder backend, see core.encoders.create_encoder (default cv2 "mp4v")
+    - frame_mode: What becomes of each group of speed_factor frames
+        "drop" - keep the first frame (original behaviour)
+        "average" - average the group into one frame (see core.frame_blender)
+        "motion_blur" - blend the group with a trail towards its last frame
+    - blend_samples: Blend at most this many evenly spaced frames per group
+      (None = every frame); fewer samples decode less and let grab/seek skip the rest
+    - selection: Which frames are kept
+        "uniform" - every speed_factor-th frame (original behaviour)
+        "content" - score every frame's change first (see core.content_selection) and
+          keep the same number of frames, dense where the screen changes and sparse
+          where it is idle
+    - target_duration: Content selection: output length in seconds instead of speed_factor
+    - change_metric: Content selection: "mad" or "histogram"
+    - idle_weight: Content selection: how much of the output idle stretches keep
+      (0 cuts them almost entirely, larger values approach uniform selection)
+    - scan_step: Content selection: score 1 frame in scan_step (default: a quarter of
+      the speed factor, so bursts shorter than one output frame still show)
+    """
+
+    def __init__(self, speed_factor=10, decode_strategy="auto", encoder=None,
+                 frame_mode="drop", blend_samples=None, selection="uniform",
+                 target_duration=None, change_metric="mad", idle_weight=0.05, scan_step=None):
+        if decode_strategy not in DECODE_STRATEGIES:
+            raise ValueError(
+                f"Unknown decode strategy: {decode_strategy}. Expected one of {DECODE_STRATEGIES}")
+        if frame_mode not in FRAME_MODES:
+            raise ValueError(f"Unknown frame mode: {frame_mode}. Expected one of {FRAME_MODES}")
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown selection: {selection}. Expected one of {SELECTIONS}")
+        if selection == "content" and frame_mode != "drop":
+            raise ValueError("Content selection keeps whole frames; use frame_mode \"drop\"")
+        if target_duration is not None and selection != "content":
+            raise ValueError("target_duration needs content selection")
         self.speed_factor = speed_factor
+        self.decode_strategy = decode_strategy
+        self.encoder = create_encoder(encoder)
+        self.frame_mode = frame_mode
+        self.blend_samples = blend_samples
+        self.selection = selection
+        self.target_duration = target_duration
+        self.change_metric = change_metric
+        self.idle_weight = idle_weight
+        self.scan_step = scan_step
+        self.last_strategy = None
+
+    @property
+    def stride(self):
+        return max(1, int(round(self.speed_factor)))
+
+    @property
+    def sample_step(self):
+        """Distance between the decoded frames: the stride, or the blend sample spacing"""
+        if self.frame_mode == "drop":
+            return self.stride
+        if not self.blend_samples:
+            return 1
+        return max(1, self.stride // self.blend_samples)
+
+    def choose_strategy(self, input_file):
+        """
+        Probe the input and return the cheaper of "grab" and "seek" for the current sample_step.
+        Seeking wins when keyframes are closer together than the step, since each seek
+        only decodes from the nearest keyframe instead of every frame in between.
+        """
+        stride = self.sample_step
+        if stride == 1:
+            return "read"
+        cap = cv2.VideoCapture(input_file)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            samples = 3
+            # Unknown length or too short to be worth probing
+            if total < stride * (samples + 2):
+                return "grab"
+
+            start = time.perf_counter()
+            for _ in range(stride * samples):
+                if not cap.grab():
+                    return "grab"
+            grab_cost = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(1, samples + 1):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, i * total // (samples + 1))
+                if not cap.grab():
+                    return "grab"
+            seek_cost = time.perf_counter() - start
+        finally:
+            cap.release()
+        # Seeking has to clearly win, grab() is the safer sequential path
+        return "seek" if seek_cost < grab_cost * 0.8 else "grab"
+
+    def _kept_frames(self, cap, strategy, start=0, end=None, stride=None):
+        """
+        Yield (frame_index, frame) for every stride-th frame from start; end is exclusive
+        (None = end of file). The stride defaults to the speed_factor stride.
+        """
+        stride = stride or self.stride
+        index = start
+        if start and strategy != "seek":
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if strategy == "seek":
+            while end is None or index < end:
+                if index and not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield index, frame
+                index += stride
+        elif strategy == "grab":
+            while (end is None or index < end) and cap.grab():
+                if (index - start) % stride == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    yield index, frame
+                index += 1
+        else:
+            while end is None or index < end:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if (index - start) % stride == 0:
+                    yield index, frame
+                index += 1
+
+    def _output_frames(self, cap, strategy, start=0, end=None):
+        """
+        Yield (frame_index, frame) for every output frame of [start, end) according to
+        frame_mode. Blended frames are reused buffers, write them out before the next one.
+        """
+        if self.frame_mode == "drop":
+            yield from self._kept_frames(cap, strategy, start, end)
+            return
+        stride = self.stride
+        step = self.sample_step
+        blender = FrameBlender(self.frame_mode, group_size=-(-stride // step))
+        group = None
+        for index, frame in self._kept_frames(cap, strategy, start, end, stride=step):
+            current = start + (index - start) // stride * stride
+            if group is not None and current != group:
+                yield group, blender.result()
+            group = current
+            blender.add(frame)
+        if group is not None:
+            yield group, blender.result()
+
+    def _frames_at(self, cap, indices, strategy, keyframe_interval=0):
+        """
+        Yield (frame_index, frame) for the given sorted frame indices. Short gaps are
+        skipped with grab(); a gap that crosses a keyframe (or SEEK_DISTANCE frames when
+        the keyframe interval is unknown) is seeked so its frames are never decoded.
+        """
+        position = 0
+        for index in indices:
+            index = int(index)
+            gap = index - position
+            if keyframe_interval:
+                seek = index - index % keyframe_interval > position
+            else:
+                seek = gap > SEEK_DISTANCE or (strategy == "seek" and gap > 0)
+            if seek:
+                if not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                    break
+            else:
+                for _ in range(gap):
+                    if not cap.grab():
+                        return
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position = index + 1
+            yield index, frame
+
+    def select_frames(self, index, start_time=None, end_time=None):
+        """
+        Frame indices to keep according to a FrameIndex. With capture times the frames are
+        picked by timestamp, one every speed_factor capture intervals, so stretches where
+        the recorder fell behind still play back at the right pace.
+        """
+        if index.capture_times and len(index) > 1:
+            interval = float(np.median(np.diff(index.timestamps)))
+            if interval > 0:
+                return index.select(interval * self.stride, start_time, end_time)
+        first, last = index.frame_range(start_time, end_time)
+        return range(first, last, self.stride)
+
+    def score_frames(self, input_file, start=0, end=None, step=1):
+        """
+        Change scores of every step-th frame of [start, end) in one sequential pass.
+        Returns (frame_indices, scores) arrays; see core.content_selection.FrameScorer.
+        """
+        scorer = FrameScorer(self.change_metric)
+        indices = []
+        scores = []
+        cap = cv2.VideoCapture(input_file)
+        try:
+            for index, frame in self._kept_frames(cap, "grab", start, end, stride=step):
+                indices.append(index)
+                scores.append(scorer.score(frame))
+        finally:
+            cap.release()
+        return np.array(indices, dtype=np.int64), np.array(scores, dtype=np.float64)
 
-    def convert(self, input_file, output_file):
+    def convert(self, input_file, output_file, workers=1, progress_callback=None,
+                start_time=None, end_time=None, use_index=True):
         """
         Convert a video to timelapse by keeping 1 frame out of every N frames
         where N is the speed_factor.
+        - workers: Split the input into segments converted by this many processes; needs
+          ffmpeg to join them by stream copy, otherwise the input is converted sequentially
+        - progress_callback: Called as progress_callback(frames_written, frames_expected)
+        - start_time, end_time: Only convert this range, in seconds from the first frame
+        - use_index: Pick and seek frames with the sidecar frame index (see core.frame_index);
+          when False, trimming scans the input for frame times and leaves the sidecar alone
         """
         if not os.path.exists(input_file):
             raise FileNotFoundError(f"Input file not found: {input_file}")
+        if workers and workers > 1 and not ffmpeg_available():
+            # The segments would have to be decoded and re-encoded to join them, which is
+            # lossy and gives back much of the speedup
+            print("[WARNING] ffmpeg is not installed, so segments cannot be joined "
+                  "losslessly; converting sequentially")
+            workers = 1
+
+        trim = start_time is not None or end_time is not None
+        index = None
+        if use_index:
+            # Trimming needs an index, so build one with a single scan if there is no sidecar
+            index = load_index(input_file, build=trim)
+        elif trim:
+            index = FrameIndex.build(input_file)
+
+        if self.selection == "content":
+            self.last_strategy = "content"
+            return self._convert_content(input_file, output_file, index, start_time, end_time,
+                                         progress_callback)
+
+        indexed = index is not None and (trim or (index.capture_times
+                                                  and self.frame_mode == "drop"))
+        strategy = self.decode_strategy
+        if strategy == "auto":
+            # The indexed path seeks across long gaps itself, so it only needs grab()
+            strategy = "grab" if indexed else self.choose_strategy(input_file)
+        self.last_strategy = strategy
+
+        if indexed:
+            self.last_strategy = "index"
+            return self._convert_indexed(input_file, output_file, index, strategy,
+                                         start_time, end_time, progress_callback, workers)
+
+        if workers and workers > 1:
+            from core.parallel_convert import convert_parallel
+            return convert_parallel(self, input_file, output_file, strategy,
+                                    workers, progress_callback)
 
         cap = cv2.VideoCapture(input_file)
         fps = cap.get(cv2.CAP_PROP_FPS)
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(output_file, fourcc, fps, (width, height))
+        out = self.encoder.open(output_file, fps, (width, height))
+
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        expected = -(-total // self.stride) if total > 0 else None
 
         frame_count = 0
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                # Keep only 1 out of every N frames
-                if frame_count % self.speed_factor == 0:
-                    out.write(frame)
+            for _, frame in self._output_frames(cap, strategy):
+                out.write(frame)
+                frame_count += 1
+                if progress_callback:
+                    progress_callback(frame_count, expected)
+        finally:
+            cap.release()
+            out.release()
+
+        if frame_count == 0:
+            raise RuntimeError("No frames were read from the input file")
+
+        return output_file
+
+    def _convert_content(self, input_file, output_file, index, start_time, end_time,
+                         progress_callback):
+        cap = cv2.VideoCapture(input_file)
+        fps = cap.get(cv2.CAP_PROP_FPS) or (index.fps if index is not None else 30)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        first, last = 0, (total if total > 0 else None)
+        if index is not None and (start_time is not None or end_time is not None):
+            first, last = index.frame_range(start_time, end_time)
+        count = None
+        speed = self.speed_factor
+        if self.target_duration:
+            count = max(1, int(round(self.target_duration * fps)))
+            if last is not None:
+                speed = max(1.0, (last - first) / count)
+        step = self.scan_step or max(1, int(speed) // 4)
+
+        # Pass 1: score the input; pass 2: decode only the chosen frames
+        indices, scores = self.score_frames(input_file, first, last, step)
+        if not len(indices):
+            raise RuntimeError("No frames were read from the input file")
+        if count is None:
+            count = -(-(int(indices[-1]) + 1 - first) // self.stride)
+        selected = select_by_activity(indices, scores, count, self.idle_weight)
+
+        strategy = "seek" if self.decode_strategy == "seek" else "grab"
+        keyframe_interval = index.keyframe_interval if index is not None else 0
+        out = self.encoder.open(output_file, fps, (width, height))
+        cap = cv2.VideoCapture(input_file)
+        frame_count = 0
+        try:
+            for _, frame in self._frames_at(cap, selected, strategy, keyframe_interval):
+                out.write(frame)
+                frame_count += 1
+                if progress_callback:
+                    progress_callback(frame_count, len(selected))
+        finally:
+            cap.release()
+            out.release()
+
+        if frame_count == 0:
+            raise RuntimeError("No frames were read from the input file")
+
+        return output_file
+
+    def _convert_indexed(self, input_file, output_file, index, strategy, start_time, end_time,
+                         progress_callback, workers=1):
+        if self.frame_mode == "drop":
+            indices = self.select_frames(index, start_time, end_time)
+            expected = len(indices)
+        else:
+            # Blending needs every frame of each group, so only the trim comes from the index
+            first, last = index.frame_range(start_time, end_time)
+            indices = range(first, last)
+            expected = -(-len(indices) // self.stride)
+        if not len(indices):
+            raise RuntimeError(f"No frames between {start_time} and {end_time} seconds")
+
+        # The picked frames are split between the workers, so the output is the same as
+        # the sequential one; a trimmed blend is converted sequentially
+        if workers and workers > 1 and self.frame_mode == "drop" and len(indices) > workers:
+            from core.parallel_convert import convert_parallel
+            return convert_parallel(self, input_file, output_file, strategy, workers,
+                                    progress_callback, frames=indices,
+                                    keyframe_interval=index.keyframe_interval)
+
+        cap = cv2.VideoCapture(input_file)
+        fps = cap.get(cv2.CAP_PROP_FPS) or index.fps
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        out = self.encoder.open(output_file, fps, (width, height))
+
+        if self.frame_mode == "drop":
+            frames = self._frames_at(cap, indices, strategy, index.keyframe_interval)
+        else:
+            frames = self._output_frames(cap, strategy, indices.start, indices.stop)
+
+        frame_count = 0
+        try:
+            for _, frame in frames:
+                out.write(frame)
                 frame_count += 1
+                if progress_callback:
+                    progress_callback(frame_count, expected)
         finally:
             cap.release()
             out.release()
@@ -53,64 +423,294 @@ class TimeLapseScreenRecorder:
     - interval_seconds: Time between each frame capture (higher = faster timelapse effect)
     - output_fps: Playback speed of the output video (e.g., 30 for smooth playback)
     - monitor: Which monitor to record (1 = primary)
+    - change_detection: Skip encoding frames that look the same as the last written one
+    - change_threshold: Difference (0-255) of any small screen area that counts as a change
+      (see ChangeDetector)
+    - unchanged_policy: "skip" drops unchanged frames, "hold" counts them against the
+      last written frame (see frame_holds) without encoding them again
+    - capture_bus: Take frames from a shared CaptureBus instead of grabbing directly
+    - encoder: Encoder backend, see core.encoders.create_encoder (default cv2 "mp4v")
+    - metrics: True (or a RecorderMetrics) to time every stage of every frame
+    - metrics_file: Where to dump the metrics when recording ends (.json or .prom)
+    - frame_index: Write a sidecar with the capture time of every frame (see core.frame_index)
+    - adaptive: Vary the interval between min_interval and max_interval with screen and
+      input activity (see core.adaptive_scheduler); interval_seconds is the starting point.
+      frame_durations then tells how much wall-clock time each written frame stands for.
+    - source: Where frames come from (see core.frame_sources; default: the monitor via mss)
+    - drain: Read a non-live source (images, video, synthetic) as fast as it decodes
+      and encodes, ignoring interval_seconds; recording ends when the source runs out
+    - renditions: Extra outputs next to the native-resolution one, e.g. a small proxy
+      (see core.renditions); all sizes come from one shared resize pass per frame
+    - topology: A DisplayTopology to follow; when the monitor moves or changes resolution
+      the recording carries on with the new geometry, scaled to the size it started at,
+      and pauses while the monitor is disconnected
     """
 
-    def __init__(self, interval_seconds=2, output_fps=30, monitor=1):
+    def __init__(self, interval_seconds=2, output_fps=30, monitor=1,
+                 change_detection=False, change_threshold=4.0, unchanged_policy="hold",
+                 capture_bus=None, encoder=None, metrics=False, metrics_file=None,
+                 frame_index=True, adaptive=False, min_interval=0.5, max_interval=10.0,
+                 source=None, drain=False, renditions=None, topology=None):
+        if unchanged_policy not in ("skip", "hold"):
+            raise ValueError(f"Unknown unchanged policy: {unchanged_policy}")
+        if source is not None and capture_bus is not None:
+            raise ValueError("A frame source cannot be combined with a capture bus")
+        if drain and (capture_bus is not None or source is None or source.live):
+            raise ValueError("Only non-live frame sources can be drained")
+        self.source = source
+        self.drain = drain
+        self.renditions = list(renditions or ())
+        self.topology = topology
         self.interval_seconds = interval_seconds
+        self.current_interval = interval_seconds
+        # Captures follow monotonic deadlines so encode time does not stretch the interval
+        self.scheduler = DeadlineScheduler(interval_seconds)
+        self._subscription = None
+        self.adaptive_scheduler = None
+        if adaptive:
+            self.adaptive_scheduler = AdaptiveScheduler(min_interval, max_interval)
+        # Activity is measured on tile changes even when unchanged frames are still written
+        self.activity_detector = None
+        if adaptive and not change_detection:
+            self.activity_detector = ChangeDetector(threshold=change_threshold)
         self.output_fps = output_fps
         self.monitor = monitor  # 1 for primary monitor
         self._recording = False
+        self.change_detector = ChangeDetector(
+            threshold=change_threshold) if change_detection else None
+        self.unchanged_policy = unchanged_policy
+        self.capture_bus = capture_bus
+        self.encoder = create_encoder(encoder)
+        # Number of extra intervals each written frame stood for (hold policy)
+        self.frame_holds = []
+        # Wall-clock seconds each written frame stands for, up to the next written frame
+        self.frame_durations = []
+        self.stats = {'captured': 0, 'written': 0, 'skipped': 0, 'held': 0, 'missed': 0,
+                      'errors': 0}
+        # Instrumentation; a no-op object unless enabled
+        self.metrics = create_metrics(metrics, "timelapse_recorder")
+        self.metrics_file = metrics_file
+        self.frame_index = frame_index
+
+    def _count(self, key, amount=1):
+        self.stats[key] += amount
+        self.metrics.count(key, amount)
+
+    @property
+    def dirty_tiles(self):
+        """Tile mask of the last change check, or None without change detection"""
+        if self.change_detector is None:
+            return None
+        return self.change_detector.dirty_tiles
 
     def record(self, output_file):
-        with mss.mss() as sct:
-            if self.monitor >= len(sct.monitors):
-                raise ValueError(
-                    f"Monitor index {self.monitor} is out of range. Available monitors: {len(sct.monitors)-1}")
-            monitor = sct.monitors[self.monitor]
-            width = monitor['width']
-            height = monitor['height']
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            out = cv2.VideoWriter(output_file, fourcc,
-                                  self.output_fps, (width, height))
-            if not out.isOpened():
-                raise IOError(
-                    f"Could not open output file for writing: {output_file}")
-
-            self._recording = True
-            frame_count = 0
-            # Load cursor image
-            cursor_img = Image.open('resources/cursor.png').resize((24, 24))
-            try:
-                while self._recording:
-                    try:
-                        img = np.array(sct.grab(monitor))
-                        # Convert to PIL Image for cursor drawing
-                        pil_img = Image.fromarray(
-                            cv2.cvtColor(img, cv2.COLOR_BGRA2RGB))
-                        # Get cursor position
-                        cursor_pos = win32gui.GetCursorPos()
-                        cursor_x = cursor_pos[0] - monitor['left']
-                        cursor_y = cursor_pos[1] - monitor['top']
-                        # Draw cursor if within bounds
-                        if (0 <= cursor_x < width and 0 <= cursor_y < height):
-                            pil_img.paste(
-                                cursor_img, (int(cursor_x), int(cursor_y)), cursor_img)
-                        # Convert back to OpenCV BGR
-                        frame = cv2.cvtColor(
-                            np.array(pil_img), cv2.COLOR_RGB2BGR)
+        if self.capture_bus is not None:
+            # The bus grabs the display itself; only its geometry is needed here
+            self._record(output_file, None, monitor_region(self.monitor))
+            return
+        source = self.source or MssSource(monitor=self.monitor)
+        with source:
+            self._record(output_file, source, source.region)
+
+    def _record(self, output_file, source, monitor):
+        # source is None when frames come from the capture bus
+        width = monitor['width']
+        height = monitor['height']
+        out = self.encoder.open(output_file, self.output_fps, (width, height))
+        if not out.isOpened():
+            raise IOError(
+                f"Could not open output file for writing: {output_file}")
+
+        index_writer = None
+        if self.frame_index:
+            index_writer = FrameIndexWriter(sidecar_path(output_file), self.output_fps,
+                                            self.encoder.keyframe_interval)
+        try:
+            rendition_writers = open_renditions(
+                self.renditions, output_file, self.output_fps, (width, height),
+                self.encoder, self.frame_index)
+        except Exception:
+            out.release()
+            if index_writer is not None:
+                index_writer.close()
+            raise
+
+        self._recording = True
+        frame_count = 0
+        # Load cursor image
+        cursor = CursorSprite()
+        metrics = self.metrics
+        # Sizes stay fixed, so captures after a display change are scaled to fit
+        if rendition_writers:
+            converter = ResizePyramid(
+                [(width, height)] + [writer.size for writer in rendition_writers], metrics)
+        else:
+            converter = FrameConverter((width, height), metrics)
+        self.frame_holds = []
+        self.frame_durations = []
+        self.stats = {'captured': 0, 'written': 0, 'skipped': 0, 'held': 0, 'missed': 0,
+                      'errors': 0}
+        last_capture = None
+        previous_capture_time = None
+        detector = self.change_detector or self.activity_detector
+        if detector is not None:
+            detector.reset()
+        self.current_interval = self.interval_seconds
+        if self.adaptive_scheduler is not None:
+            self.adaptive_scheduler.reset(self.interval_seconds)
+            self.current_interval = self.adaptive_scheduler.interval
+        scheduler = self.scheduler
+        scheduler.reset()
+        scheduler.set_interval(self.current_interval)
+        missed = 0
+        # The bus paces frames to the interval and has already drawn the cursor
+        subscription = None
+        if self.capture_bus is not None:
+            subscription = self._subscription = self.capture_bus.subscribe(
+                monitor, fps=1.0 / self.current_interval)
+        binding = None
+        if self.topology is not None and self.source is None:
+            binding = TopologyBinding(self.topology, monitor)
+        try:
+            while self._recording:
+                if binding is not None and binding.check():
+                    monitor = binding.region
+                    if monitor is not None:
+                        if source is not None:
+                            source.region = monitor
+                        if detector is not None:
+                            detector.reset()
+                    if self.capture_bus is not None:
+                        if subscription is not None:
+                            subscription.close()
+                        subscription = self._subscription = None
+                        if monitor is not None:
+                            subscription = self._subscription = self.capture_bus.subscribe(
+                                monitor, fps=1.0 / self.current_interval)
+                if monitor is None:
+                    # The display is disconnected; keep the schedule until it returns
+                    if not scheduler.wait():
+                        break
+                    continue
+                if subscription is None and not self.drain:
+                    if not scheduler.wait():
+                        break
+                    if scheduler.missed != missed:
+                        self._count('missed', scheduler.missed - missed)
+                        missed = scheduler.missed
+                try:
+                    started = metrics.start()
+                    if subscription is not None:
+                        item = subscription.get(timeout=0.5)
+                        if item is None:
+                            continue
+                        captured_at = item[0].timestamp
+                        cursor_pos = item[0].cursor_pos
+                        img = item[1]
+                    else:
+                        item = source.read()
+                        metrics.stop('grab', started)
+                        if item is None:
+                            break  # A file or generator source ran out of frames
+                        img, captured_at, cursor_pos = item
+                    self._count('captured')
+                    if metrics.enabled:
+                        now = time.monotonic()
+                        if subscription is None:
+                            metrics.observe('schedule_jitter', scheduler.lateness)
+                        elif last_capture is not None:
+                            metrics.observe('schedule_jitter',
+                                            abs(now - last_capture - self.current_interval))
+                        last_capture = now
+                    # The last written frame stood for the screen until this capture
+                    if previous_capture_time is not None and self.frame_durations:
+                        self.frame_durations[-1] += captured_at - previous_capture_time
+                    previous_capture_time = captured_at
+                    # Direct grabs are checked before the cursor is drawn on top; bus frames
+                    # already carry it, so there a moving cursor also counts as a change
+                    changed = True
+                    if detector is not None:
+                        started = metrics.start()
+                        changed = detector.update(img) or self.change_detector is None
+                        metrics.stop('change_detection', started)
+                    if self.adaptive_scheduler is not None:
+                        interval = self.adaptive_scheduler.update(
+                            float(detector.dirty_tiles.mean()), cursor_pos, get_input_idle())
+                        if interval != self.current_interval:
+                            self.current_interval = interval
+                            if subscription is not None:
+                                subscription.set_fps(1.0 / interval)
+                            else:
+                                scheduler.set_interval(interval)
+                    if not changed:
+                        if self.unchanged_policy == "hold" and self.frame_holds:
+                            self.frame_holds[-1] += 1
+                            self._count('held')
+                        else:
+                            self._count('skipped')
+                    else:
+                        if subscription is None:
+                            started = metrics.start()
+                            if cursor_pos is not None:
+                                cursor_x = cursor_pos[0] - monitor['left']
+                                cursor_y = cursor_pos[1] - monitor['top']
+                                # Draw cursor if within bounds
+                                if (0 <= cursor_x < monitor['width'] and
+                                        0 <= cursor_y < monitor['height']):
+                                    cursor.blend(img, cursor_x, cursor_y)
+                            metrics.stop('cursor', started)
+                        # Drop the alpha channel into a reusable BGR buffer
+                        renditions = ()
+                        if rendition_writers:
+                            # Only the renditions keeping this frame are resized
+                            frame = converter.convert(img, [True] + [
+                                writer.wants(frame_count) for writer in rendition_writers])
+                            frame, renditions = frame[0], frame[1:]
+                        else:
+                            frame = converter.convert(img)
+                        started = metrics.start()
                         out.write(frame)
+                        for writer, rendition in zip(rendition_writers, renditions):
+                            if rendition is not None:
+                                writer.write(rendition, captured_at)
+                        metrics.stop('encode', started)
+                        if index_writer is not None:
+                            index_writer.append(captured_at)
                         frame_count += 1
-                    except Exception as e:
-                        print(f"[ERROR] Failed to capture or write frame: {e}")
-                    time.sleep(self.interval_seconds)
-            finally:
-                out.release()
+                        self.frame_holds.append(0)
+                        self.frame_durations.append(0.0)
+                        self._count('written')
+                except Exception as e:
+                    self._count('errors')
+                    print(f"[ERROR] Failed to capture or write frame: {e}")
+        finally:
+            if binding is not None:
+                binding.close()
+            # Non-live sources end at their last frame, not when the loop returns
+            if previous_capture_time is not None and self.frame_durations and (
+                    source is None or source.live):
+                self.frame_durations[-1] += max(0.0, time.time() - previous_capture_time)
+            if subscription is not None:
+                subscription.close()
+                self._subscription = None
+            out.release()
+            if index_writer is not None:
+                index_writer.close()
+            for writer in rendition_writers:
+                writer.release()
+            if self.metrics_file:
+                self.metrics.dump(self.metrics_file)
         video_length = frame_count / self.output_fps if self.output_fps else 0
         if frame_count == 0:
             print("[WARNING] No frames were captured. Output video may be empty.")
 
     def stop(self):
+        """Stop recording; a capture loop waiting for its next deadline wakes up at once"""
         self._recording = False
+        self.scheduler.stop()
+        subscription = self._subscription
+        if subscription is not None:
+            subscription.close()
 
 
 # Example usage
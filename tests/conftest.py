@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Run from anywhere: the packages live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    """Write a small test video whose frame i is filled with i (mod 256)"""
+    import cv2
+    import numpy as np
+
+    def make(frames=95, size=(64, 48), fps=30, name="input.mp4"):
+        path = str(tmp_path / name)
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        for i in range(frames):
+            frame = np.full((size[1], size[0], 3), i % 256, dtype=np.uint8)
+            # A moving bar so neighbouring frames differ in more than brightness
+            frame[:, (i * 3) % size[0]] = 255 - frame[0, 0]
+            out.write(frame)
+        out.release()
+        return path
+
+    return make
@@ -0,0 +1,60 @@
+import sys
+import time
+import types
+
+import numpy as np
+
+from core.capture_bus import CaptureBus, Frame, Subscription
+
+GEOMETRY = {'left': 0, 'top': 0, 'width': 4, 'height': 2}
+
+
+class QuietBus:
+    def __init__(self):
+        self.wakes = 0
+
+    def _wake(self, sub):
+        self.wakes += 1
+
+
+def frame_at(t):
+    return Frame(np.zeros((2, 4, 4), np.uint8), GEOMETRY, monotonic=t)
+
+
+def test_set_fps_keeps_the_last_frame_as_reference():
+    sub = Subscription(QuietBus(), GEOMETRY, fps=1)
+    sub._offer(frame_at(10.0), 0.01)
+    sub.set_fps(1)
+    assert sub.bus.wakes == 0  # Same rate: nothing to reschedule
+    sub.set_fps(0.5)
+    # The next frame is due two seconds after the last one, not right away
+    sub._offer(frame_at(10.5), 0.01)
+    sub._offer(frame_at(11.5), 0.01)
+    sub._offer(frame_at(12.0), 0.01)
+    assert [sub.get(0)[0].monotonic for _ in range(2)] == [10.0, 12.0]
+
+
+def test_changing_rate_does_not_grab_in_a_tight_loop(monkeypatch):
+    class FakeMss:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setitem(sys.modules, "mss", types.SimpleNamespace(mss=FakeMss))
+    grabs = []
+    bus = CaptureBus(max_fps=100, draw_cursor=False)
+    monkeypatch.setattr(bus, "_grab", lambda sct, geometry: grabs.append(1) or frame_at(None))
+    sub = bus.subscribe(GEOMETRY, fps=10)
+    try:
+        deadline = time.monotonic() + 0.5
+        rate = 10
+        while time.monotonic() < deadline:
+            if sub.get(0.2) is not None:
+                # Like the adaptive timelapse, retune the rate after every frame
+                rate = 11 if rate == 10 else 10
+                sub.set_fps(rate)
+    finally:
+        bus.close()
+    assert len(grabs) <= 8
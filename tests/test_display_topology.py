@@ -0,0 +1,36 @@
+from core.display_topology import DisplayTopology, TopologyBinding
+
+LEFT = (0, 0, 1920, 1080, True)
+RIGHT = (1920, 0, 1920, 1080, False)
+
+
+def topology(*monitors):
+    layout = list(monitors)
+    return DisplayTopology(probe=lambda: tuple(layout)), layout
+
+
+def test_identical_monitor_is_not_substituted():
+    topo, layout = topology(LEFT, RIGHT)
+    right = topo.get(1)
+    layout[:] = [LEFT]
+    topo.refresh()
+    assert topo.rebind(right) is None
+
+
+def test_resolution_change_keeps_the_display():
+    topo, layout = topology(LEFT, RIGHT)
+    right = topo.get(1)
+    layout[1] = (1920, 0, 2560, 1440, False)
+    topo.refresh()
+    assert topo.rebind(right)['geometry']['width'] == 2560
+
+
+def test_binding_pauses_while_the_display_is_gone():
+    topo, layout = topology(LEFT, RIGHT)
+    binding = TopologyBinding(topo, topo.get(1)['geometry'])
+    layout[:] = [LEFT]
+    topo.refresh()
+    assert binding.check() and binding.region is None
+    layout[:] = [LEFT, RIGHT]
+    topo.refresh()
+    assert binding.check() and binding.region == topo.get(1)['geometry']
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+import core.parallel_convert
+import core.timelapse
+from core.frame_index import FrameIndex, FrameIndexWriter, load_index, sidecar_path
+from core.parallel_convert import split_frames
+from core.timelapse import TimeLapseConverter
+
+# One capture a second, then the recorder stalled for ten seconds
+STALLED = [float(t) for t in range(10)] + [float(t) for t in range(20, 30)]
+
+
+def test_select_frames_follows_capture_time():
+    converter = TimeLapseConverter(speed_factor=2)
+    picks = converter.select_frames(FrameIndex(STALLED, fps=1))
+    # Uniform picking would keep 0, 2, ... 18 and play the stall back as if it was not there
+    assert list(picks) == [0, 2, 4, 6, 8, 9, 10, 12, 14, 16, 18]
+
+
+def test_select_frames_without_capture_times_is_uniform():
+    converter = TimeLapseConverter(speed_factor=2)
+    index = FrameIndex(STALLED, fps=1, capture_times=False)
+    assert list(converter.select_frames(index)) == list(range(0, 20, 2))
+
+
+def test_trim_range():
+    index = FrameIndex(STALLED, fps=1)
+    assert index.frame_range(5, 22) == (5, 13)
+    assert list(index.select(2, 20, 24)) == [10, 12, 14]
+
+
+def test_sidecar_round_trip_and_truncation(tmp_path):
+    video = str(tmp_path / "rec.mp4")
+    writer = FrameIndexWriter(sidecar_path(video), fps=1, keyframe_interval=30, flush_every=4)
+    for t in STALLED:
+        writer.append(t)
+    writer.close()
+    index = load_index(video, build=False)
+    assert np.array_equal(index.timestamps, STALLED)
+    assert index.capture_times and index.keyframe_interval == 30
+
+    # A sidecar cut off mid-timestamp still loads the complete entries
+    with open(sidecar_path(video), 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert len(load_index(video, build=False)) == len(STALLED) - 1
+
+
+def read_frames(converter, path, frames, keyframe_interval=0):
+    cap = cv2.VideoCapture(path)
+    try:
+        return [(i, frame.copy()) for i, frame in
+                converter._frames_at(cap, frames, "grab", keyframe_interval)]
+    finally:
+        cap.release()
+
+
+def test_parallel_runs_read_the_selected_frames(make_video):
+    path = make_video(frames=95)
+    timestamps = np.cumsum(np.where(np.arange(95) % 10 == 0, 0.5, 1 / 30))
+    converter = TimeLapseConverter(speed_factor=4)
+    picks = converter.select_frames(FrameIndex(timestamps, fps=30))
+    sequential = read_frames(converter, path, picks)
+    parallel = []
+    for run in split_frames(picks, 3):
+        parallel += read_frames(converter, path, run)
+    assert [i for i, _ in parallel] == [i for i, _ in sequential] == list(picks)
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(parallel, sequential))
+
+
+def test_parallel_conversion_uses_the_index_selection(make_video, tmp_path, monkeypatch):
+    path = make_video(frames=95)
+    timestamps = np.cumsum(np.where(np.arange(95) % 10 == 0, 0.5, 1 / 30))
+    FrameIndex(timestamps, fps=30).save(sidecar_path(path))
+    calls = []
+    monkeypatch.setattr(core.timelapse, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(core.parallel_convert, "convert_parallel",
+                        lambda *args, **kwargs: calls.append(kwargs))
+    converter = TimeLapseConverter(speed_factor=4)
+    converter.convert(path, str(tmp_path / "out.mp4"), workers=3)
+    assert converter.last_strategy == "index"
+    expected = converter.select_frames(FrameIndex(timestamps, fps=30))
+    assert list(calls[0]["frames"]) == list(expected)
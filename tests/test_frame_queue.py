@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from core.frame_queue import FrameQueue
+
+
+def drain(queue):
+    items = []
+    while len(queue):
+        items.append(queue.get(timeout=0))
+    return items
+
+
+def test_drop_oldest_keeps_the_newest_frames():
+    queue = FrameQueue(3, "drop_oldest")
+    assert all(queue.put(i) for i in range(5))
+    assert queue.dropped == 2
+    assert drain(queue) == [2, 3, 4]
+
+
+def test_drop_newest_rejects_incoming_frames():
+    queue = FrameQueue(3, "drop_newest")
+    assert [queue.put(i) for i in range(5)] == [True, True, True, False, False]
+    assert queue.dropped == 2
+    assert drain(queue) == [0, 1, 2]
+
+
+def test_block_waits_for_a_free_slot():
+    queue = FrameQueue(2, "block")
+    queue.put(0)
+    queue.put(1)
+    done = threading.Event()
+
+    def producer():
+        queue.put(2)
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(0.1)
+    assert queue.get() == 0
+    assert done.wait(1.0)
+    thread.join()
+    assert queue.dropped == 0
+    assert drain(queue) == [1, 2]
+
+
+def test_close_wakes_a_blocked_producer_and_drains():
+    queue = FrameQueue(1, "block")
+    queue.put(0)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(queue.put(1)))
+    thread.start()
+    time.sleep(0.05)
+    queue.close()
+    thread.join(1.0)
+    assert result == [False]
+    assert queue.get() == 0
+    assert queue.get() is None
+    assert not queue.put(2)
+
+
+def test_get_times_out():
+    assert FrameQueue(1).get(timeout=0.01) is None
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameQueue(1, "drop_random")
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+import pytest
+
+import core.parallel_convert
+import core.timelapse
+from core.concat import ffmpeg_available
+from core.encoders import Cv2Encoder
+from core.parallel_convert import plan_segments
+from core.timelapse import TimeLapseConverter
+
+
+def read_all(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def output_frames(converter, path, strategy, start=0, end=None):
+    cap = cv2.VideoCapture(path)
+    try:
+        # Blended frames are reused buffers, so keep copies
+        return [(index, frame.copy())
+                for index, frame in converter._output_frames(cap, strategy, start, end)]
+    finally:
+        cap.release()
+
+
+@pytest.mark.parametrize("frame_mode", ["drop", "average"])
+@pytest.mark.parametrize("strategy", ["read", "grab", "seek"])
+def test_segments_keep_the_sequential_frames(make_video, frame_mode, strategy):
+    path = make_video(frames=95)
+    converter = TimeLapseConverter(speed_factor=4, frame_mode=frame_mode)
+    sequential = output_frames(converter, path, strategy)
+    segmented = []
+    for start, end in plan_segments(95, converter.stride, 3):
+        segmented += output_frames(converter, path, strategy, start, end)
+    assert [index for index, _ in segmented] == [index for index, _ in sequential]
+    for (_, a), (_, b) in zip(segmented, sequential):
+        assert np.array_equal(a, b)
+
+
+def test_plan_segments_starts_on_kept_frames():
+    ranges = plan_segments(100, 7, 4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 100
+    assert all(start % 7 == 0 for start, _ in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_without_ffmpeg_parallel_falls_back_to_sequential(make_video, tmp_path, monkeypatch):
+    path = make_video(frames=95)
+    monkeypatch.setattr(core.timelapse, "ffmpeg_available", lambda: False)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("segments would be re-encoded to join them")
+
+    monkeypatch.setattr(core.parallel_convert, "convert_parallel", fail)
+    output = str(tmp_path / "out.mp4")
+    TimeLapseConverter(speed_factor=4).convert(path, output, workers=3, use_index=False)
+    assert len(read_all(output)) == 24
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="the lossless join needs ffmpeg")
+def test_parallel_output_matches_sequential(make_video, tmp_path):
+    path = make_video(frames=95)
+    outputs = []
+    for workers in (1, 3):
+        output = str(tmp_path / f"out_{workers}.avi")
+        # A lossless codec, so any difference comes from the frames that were picked
+        converter = TimeLapseConverter(speed_factor=4, encoder=Cv2Encoder("FFV1"))
+        converter.convert(path, output, workers=workers, use_index=False)
+        outputs.append(read_all(output))
+    assert len(outputs[0]) == len(outputs[1]) == 24
+    assert all(np.array_equal(a, b) for a, b in zip(*outputs))
@@ -0,0 +1,74 @@
+import random
+import time
+
+import numpy as np
+
+from core.encoders import VideoEncoder
+from core.frame_sources import FrameSource
+from core.recorder import ScreenRecorder
+
+FRAMES = 60
+SIZE = (32, 16)
+
+
+class NumberedSource(FrameSource):
+    """Frames whose pixels hold their capture number"""
+
+    def __init__(self, frames):
+        super().__init__()
+        self.region = {'left': 0, 'top': 0, 'width': SIZE[0], 'height': SIZE[1]}
+        self.frames = frames
+        self.number = 0
+
+    def _read(self):
+        if self.number >= self.frames:
+            return None
+        frame = np.full((SIZE[1], SIZE[0], 4), self.number % 256, dtype=np.uint8)
+        self.number += 1
+        return frame, 1000.0 + self.number, None
+
+
+class ListWriter:
+    def __init__(self, frames):
+        self.frames = frames
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        pass
+
+
+class ListEncoder(VideoEncoder):
+    name = "list"
+
+    def __init__(self):
+        self.frames = []
+
+    def open(self, output_file, fps, size):
+        return ListWriter(self.frames)
+
+
+class JitteryRecorder(ScreenRecorder):
+    """Processing takes a random time, so workers finish out of capture order"""
+
+    def _process_frame(self, frame, converter, cursor_pos=None, number=0):
+        time.sleep(random.uniform(0, 0.005))
+        return super()._process_frame(frame, converter, cursor_pos, number)
+
+
+def test_workers_write_frames_in_capture_order(tmp_path):
+    encoder = ListEncoder()
+    recorder = JitteryRecorder(str(tmp_path / "out.mp4"), fps=30, pipelined=True,
+                               encode_workers=4, encoder=encoder, frame_index=False,
+                               source=NumberedSource(FRAMES), drain=True, output_size=SIZE)
+    recorder.start()
+    assert recorder.wait(10)
+    recorder.stop()
+    assert encoder.frames == list(range(FRAMES))
+    stats = recorder.get_stats()
+    assert stats['captured'] == stats['written'] == FRAMES
+    assert stats['dropped'] == 0
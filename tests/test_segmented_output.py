@@ -0,0 +1,67 @@
+import json
+import os
+
+import numpy as np
+
+import core.concat
+import core.segmented_output
+from core.segmented_output import MANIFEST_NAME, SegmentedWriter, segment_dir
+
+
+class FileWriter:
+    """Writes each frame's first byte, enough to tell segments apart"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.file.write(bytes([frame[0, 0, 0]]))
+
+    def release(self):
+        self.file.close()
+
+
+class FileEncoder:
+    def open(self, output_file, fps, size):
+        return FileWriter(output_file)
+
+
+def record(output_file, segments):
+    writer = SegmentedWriter(FileEncoder(), output_file, 10, (4, 2), segment_seconds=None)
+    for number in range(segments):
+        if number:
+            writer.rotate()
+        writer.write(np.full((2, 4, 3), number, np.uint8))
+    writer.release()
+
+
+def test_segments_are_kept_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.segmented_output, "ffmpeg_available", lambda: False)
+    reencoded = []
+    monkeypatch.setattr(core.concat, "_concat_by_reencoding", lambda *args: reencoded.append(1))
+    output_file = str(tmp_path / "rec.mp4")
+    record(output_file, 3)
+    assert not reencoded and not os.path.exists(output_file)
+    with open(os.path.join(segment_dir(output_file), MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    assert manifest["complete"] and len(manifest["segments"]) == 3
+
+
+def test_lossy_join_keeps_the_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.segmented_output, "concat_segments", lambda *args: False)
+    monkeypatch.setattr(core.segmented_output, "ffmpeg_available", lambda: True)
+    output_file = str(tmp_path / "rec.mp4")
+    record(output_file, 2)
+    assert len(os.listdir(segment_dir(output_file))) == 4  # Two segments, manifest, playlist
+
+
+def test_single_segment_is_copied(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.segmented_output, "ffmpeg_available", lambda: False)
+    output_file = str(tmp_path / "rec.mp4")
+    record(output_file, 1)
+    with open(output_file, 'rb') as f:
+        assert f.read() == b"\x00"
+    assert not os.path.exists(segment_dir(output_file))
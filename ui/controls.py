@@ -2,11 +2,19 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 import time
-from PIL import Image, ImageTk
-import win32gui
+from core.capture_bus import CaptureBus
+from core.multi_display import MultiDisplaySession, bounding_geometry
 from core.timelapse import TimeLapseScreenRecorder
+from ui.preview_worker import PreviewWorker
 import threading
 
+DEFAULT_CAPTURE = {
+    'interval_seconds': 2,
+    'adaptive': True,
+    'min_interval': 1,
+    'max_interval': 10,
+}
+
 
 class ControlsFrame:
     def __init__(self, parent, config_manager, display_manager, preview):
@@ -21,9 +29,16 @@ class ControlsFrame:
         self.current_recording_path = None
         self.preview_running = True
         self.recorder = None
+        self.recording_thread = None
+        # "All displays" records every display at once with a MultiDisplaySession
+        self.record_all_displays = False
 
-        # Load the custom cursor image for preview
-        self.cursor_img = Image.open('resources/cursor.png').resize((24, 24))
+        # One grabber per display, shared by the preview and the recorder
+        self.capture_bus = CaptureBus()
+        # Preview frames are captured and scaled off the Tk thread
+        self.preview_worker = PreviewWorker(
+            (int(self.preview.canvas['width']), int(self.preview.canvas['height'])),
+            capture_bus=self.capture_bus)
 
         # Display selection dropdown
         self.display_var = tk.StringVar()
@@ -33,8 +48,7 @@ class ControlsFrame:
             state="readonly",
             width=50
         )
-        self.display_combobox['values'] = [f"{d['name']} ({d['width']}x{d['height']})" + (
-            " (Primary)" if d['is_primary'] else "") for d in self.available_displays]
+        self.display_combobox['values'] = self._display_labels()
         self.display_combobox.set(
             self.display_combobox['values'][0] if self.display_combobox['values'] else '')
         self.display_combobox.grid(
@@ -75,10 +89,33 @@ class ControlsFrame:
         self.frame.columnconfigure(0, weight=1)
         self.frame.columnconfigure(1, weight=0)
         self.start_preview_loop()
+
+    def _display_labels(self):
+        return [f"{d['name']} ({d['width']}x{d['height']})" + (
+            " (Primary)" if d['is_primary'] else "") for d in self.available_displays] + (
+            ["All displays"] if len(self.available_displays) > 1 else [])
+
+    def refresh_displays(self):
+        """Pick up a monitor being connected, disconnected or changing resolution"""
+        self.available_displays = self.display_manager.get_available_displays()
+        self.current_display = self.display_manager.get_current_display()
+        labels = self._display_labels()
+        self.display_combobox['values'] = labels
+        if self.record_all_displays and len(self.available_displays) > 1:
+            self.display_combobox.set(labels[-1])
+        else:
+            self.record_all_displays = False
+            index = next((i for i, d in enumerate(self.available_displays)
+                          if d is self.current_display), 0)
+            self.display_combobox.set(labels[index] if labels else '')
         self.capture_and_show_preview()
 
     def on_display_change(self, event):
         selected_index = self.display_combobox.current()
+        self.record_all_displays = selected_index == len(self.available_displays)
+        if self.record_all_displays:
+            self.capture_and_show_preview()
+            return
         if selected_index >= 0 and selected_index < len(self.available_displays):
             selected_display = self.available_displays[selected_index]
             self.current_display = selected_display
@@ -124,8 +161,26 @@ class ControlsFrame:
         output_file = os.path.join(output_dir, f'timelapse_{current_time}.mp4')
         # mss uses 1-based index
         monitor_index = self.current_display['id'] + 1
+        # Capture pacing; the interval adapts to activity between min and max unless disabled
+        capture = {**DEFAULT_CAPTURE, **self.config_manager.load_config().get('capture', {})}
+        if self.record_all_displays:
+            # One capture loop for every display, each with its own encoder and a composite
+            self.recorder = MultiDisplaySession(
+                output_file, displays=self.available_displays,
+                interval_seconds=capture['interval_seconds'], output_fps=30, composite=True,
+                capture_bus=self.capture_bus)
+            self.recorder.start()
+            self.recording_thread = None
+            self.current_recording_path = output_file
+            self.start_button['text'] = "Stop"
+            self.start_button['bg'] = '#f44336'
+            self.start_button['activebackground'] = '#d32f2f'
+            return
         self.recorder = TimeLapseScreenRecorder(
-            interval_seconds=2, output_fps=30, monitor=monitor_index)
+            interval_seconds=capture['interval_seconds'], output_fps=30, monitor=monitor_index,
+            change_detection=True, capture_bus=self.capture_bus,
+            adaptive=capture['adaptive'], min_interval=capture['min_interval'],
+            max_interval=capture['max_interval'], topology=self.display_manager.topology)
         self.recording_thread = threading.Thread(
             target=self.recorder.record, args=(output_file,))
         self.recording_thread.start()
@@ -137,8 +192,9 @@ class ControlsFrame:
     def stop_recording(self):
         if self.recorder:
             self.recorder.stop()
-            if hasattr(self, 'recording_thread'):
+            if self.recording_thread is not None:
                 self.recording_thread.join()
+                self.recording_thread = None
         self.recorder = None
         self.current_recording_path = None
         self.start_button['text'] = "Start"
@@ -155,49 +211,45 @@ class ControlsFrame:
                 'height': self.current_display['height'],
                 'x': self.current_display['x'],
                 'y': self.current_display['y']
-            } if self.current_display else None
+            } if self.current_display else None,
+            'capture': {**DEFAULT_CAPTURE,
+                        **self.config_manager.load_config().get('capture', {})}
         }
         self.config_manager.save_config(config)
 
     def capture_and_show_preview(self):
-        try:
-            import mss
-            screen_capture = mss.mss()
-            screenshot = screen_capture.grab(self.current_display['geometry'])
-            img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-            # Draw cursor on preview
-            img = self.draw_cursor_on_preview(img)
-            self.preview.show_image(img)
-        except Exception as e:
-            print(f"Error updating preview: {e}")
-
-    def draw_cursor_on_preview(self, img):
-        try:
-            cursor_pos = win32gui.GetCursorPos()
-            cursor_x = cursor_pos[0] - self.current_display['x']
-            cursor_y = cursor_pos[1] - self.current_display['y']
-            if (0 <= cursor_x < self.current_display['width'] and
-                    0 <= cursor_y < self.current_display['height']):
-                result = img.copy()
-                result.paste(self.cursor_img, (int(cursor_x),
-                             int(cursor_y)), self.cursor_img)
-                return result
-            return img
-        except Exception as e:
-            print(f"Error drawing cursor on preview: {e}")
-            return img
+        if self.record_all_displays:
+            self.preview_worker.set_geometry(bounding_geometry(
+                [d['geometry'] for d in self.available_displays]))
+        elif self.current_display:
+            self.preview_worker.set_geometry(self.current_display['geometry'])
 
     def start_preview_loop(self):
         # Always start the preview loop
+        self.preview_running = True
+        self.preview_worker.start()
+        self.capture_and_show_preview()
         self.update_preview()
 
     def stop_preview_loop(self):
         self.preview_running = False
+        self.preview_worker.stop()
 
     def update_preview(self):
         if self.preview_running:
-            if not getattr(self.recorder, 'is_recording', False):
-                self.capture_and_show_preview()
+            # The topology watcher only flags changes; the widgets are updated here on Tk's thread
+            if self.display_manager.refresh():
+                self.refresh_displays()
+            # Let the worker back off while unfocused or recording
+            try:
+                self.preview_worker.focused = self.frame.focus_displayof() is not None
+            except KeyError:
+                # Tk can report focus on a widget it no longer knows (e.g. a closed menu)
+                self.preview_worker.focused = True
+            self.preview_worker.recording = self.recorder is not None
+            img = self.preview_worker.take_frame()
+            if img is not None:
+                self.preview.show_image(img)
             self.frame.after(33, self.update_preview)
 
     def add_speed_slider(self, initial_value=10, min_value=1, max_value=60, callback=None, slider_length=380):
@@ -6,22 +6,56 @@ class PreviewCanvas:
     def __init__(self, parent):
         self.canvas = tk.Canvas(parent, bg='#000', width=780, height=450)
         self.current_preview = None
+        self._image_item = None
+        self._photo_size = None
+        self._fit_cache = {}
 
-    def show_image(self, pil_image):
-        # Calculate scaling to fit canvas while maintaining aspect ratio
+    def fit_geometry(self, img_size):
+        """Return (width, height, x, y) that fits img_size into the canvas, cached per size"""
         canvas_width = int(self.canvas['width'])
         canvas_height = int(self.canvas['height'])
-        img_width, img_height = pil_image.size
-        scale_width = canvas_width / img_width if img_width > 0 else 1
-        scale_height = canvas_height / img_height if img_height > 0 else 1
-        scale = min(scale_width, scale_height)
-        new_width = int(img_width * scale)
-        new_height = int(img_height * scale)
-        img = pil_image.resize((new_width, new_height),
-                               Image.Resampling.LANCZOS)
-        photo = ImageTk.PhotoImage(img)
-        self.canvas.delete("all")
-        x = (canvas_width - new_width) // 2
-        y = (canvas_height - new_height) // 2
-        self.current_preview = photo
-        self.canvas.create_image(x, y, image=photo, anchor="nw")
+        key = (img_size, canvas_width, canvas_height)
+        geometry = self._fit_cache.get(key)
+        if geometry is None:
+            # Calculate scaling to fit canvas while maintaining aspect ratio
+            img_width, img_height = img_size
+            scale_width = canvas_width / img_width if img_width > 0 else 1
+            scale_height = canvas_height / img_height if img_height > 0 else 1
+            scale = min(scale_width, scale_height)
+            new_width = max(1, int(img_width * scale))
+            new_height = max(1, int(img_height * scale))
+            x = (canvas_width - new_width) // 2
+            y = (canvas_height - new_height) // 2
+            geometry = self._fit_cache[key] = (new_width, new_height, x, y)
+        return geometry
+
+    def _scale(self, pil_image, size):
+        """Preview-quality scaling: integer box reduce first, then a cheap bilinear fix-up"""
+        if pil_image.size == size:
+            return pil_image
+        factor = min(pil_image.width // size[0], pil_image.height // size[1])
+        if factor >= 2:
+            pil_image = pil_image.reduce(factor)
+        if pil_image.size != size:
+            pil_image = pil_image.resize(size, Image.Resampling.BILINEAR)
+        return pil_image
+
+    def show_image(self, pil_image):
+        new_width, new_height, x, y = self.fit_geometry(pil_image.size)
+        img = self._scale(pil_image, (new_width, new_height))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        if self.current_preview is not None and self._photo_size == img.size:
+            # Same size as last frame: update the existing image in place
+            self.current_preview.paste(img)
+            return
+
+        self.current_preview = ImageTk.PhotoImage(img)
+        self._photo_size = img.size
+        if self._image_item is None:
+            self._image_item = self.canvas.create_image(
+                x, y, image=self.current_preview, anchor="nw")
+        else:
+            self.canvas.coords(self._image_item, x, y)
+            self.canvas.itemconfigure(self._image_item, image=self.current_preview)
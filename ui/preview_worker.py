@@ -0,0 +1,154 @@
+import threading
+import time
+
+from core.cursor import get_cursor_pos
+from core.frame_ops import CursorSprite, grab_bgra
+from core.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+mss = lazy_import('mss')
+Image = lazy_import('PIL.Image')
+
+
+class PreviewWorker:
+    """
+    Captures and downscales preview frames on a background thread so the Tk loop only
+    has to display them. One mss handle is reused for the lifetime of the worker.
+    - target_size: (width, height) box the preview is fitted into
+    - fps: Preview rate while the window is focused and idle
+    - unfocused_fps: Rate while the window does not have focus
+    - recording_fps: Rate while a recording is running
+    - capture_bus: Subscribe to a shared CaptureBus instead of grabbing with mss
+    """
+
+    def __init__(self, target_size, fps=30, unfocused_fps=5, recording_fps=2,
+                 capture_bus=None):
+        self.target_size = target_size
+        self.fps = fps
+        self.unfocused_fps = unfocused_fps
+        self.recording_fps = recording_fps
+        self.focused = True
+        self.recording = False
+        self.geometry = None
+        self.capture_bus = capture_bus
+        self.cursor = CursorSprite()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def set_geometry(self, geometry):
+        """Switch to another display region and capture it right away"""
+        self.geometry = dict(geometry)
+        self.request_refresh()
+
+    def request_refresh(self):
+        self._wake.set()
+
+    def take_frame(self):
+        """Return the newest ready-to-display PIL image, or None if nothing new arrived"""
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def current_interval(self):
+        if self.recording:
+            fps = self.recording_fps
+        elif not self.focused:
+            fps = self.unfocused_fps
+        else:
+            fps = self.fps
+        return 1.0 / max(fps, 0.1)
+
+    def _fit_size(self, width, height):
+        box_w, box_h = self.target_size
+        scale = min(box_w / width, box_h / height, 1.0)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def _capture(self, sct, geometry):
+        frame = grab_bgra(sct, geometry)
+        cursor_pos = get_cursor_pos()
+        if cursor_pos is not None:
+            cursor_x = cursor_pos[0] - geometry['left']
+            cursor_y = cursor_pos[1] - geometry['top']
+            if (0 <= cursor_x < geometry['width'] and
+                    0 <= cursor_y < geometry['height']):
+                self.cursor.blend(frame, cursor_x, cursor_y)
+
+        height, width = frame.shape[:2]
+        size = self._fit_size(width, height)
+        # Strided view first so the area filter does not read every source pixel
+        step = max(1, min(width // (size[0] * 2), height // (size[1] * 2)))
+        if step > 1:
+            frame = frame[::step, ::step]
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGRA2RGB))
+
+    def _run(self):
+        if self.capture_bus is not None:
+            self._run_on_bus()
+            return
+        with mss.mss() as sct:
+            while self._running:
+                started = time.monotonic()
+                geometry = self.geometry
+                if geometry:
+                    try:
+                        image = self._capture(sct, geometry)
+                        with self._lock:
+                            self._latest = image
+                    except Exception as e:
+                        print(f"Error updating preview: {e}")
+                delay = self.current_interval() - (time.monotonic() - started)
+                self._wake.wait(max(delay, 0))
+                self._wake.clear()
+
+    def _run_on_bus(self):
+        subscription = None
+        geometry = None
+        try:
+            while self._running:
+                if self.geometry is not geometry:
+                    # Display switched: subscribe to the new region at its preview size
+                    if subscription is not None:
+                        subscription.close()
+                    geometry = self.geometry
+                    self._wake.clear()
+                    subscription = None
+                    if geometry:
+                        size = self._fit_size(geometry['width'], geometry['height'])
+                        subscription = self.capture_bus.subscribe(
+                            geometry, fps=1.0 / self.current_interval(), size=size, queue_size=1)
+                if subscription is None:
+                    self._wake.wait(0.2)
+                    self._wake.clear()
+                    continue
+                fps = 1.0 / self.current_interval()
+                if subscription.fps != fps:
+                    subscription.set_fps(fps)
+                item = subscription.get(timeout=0.2)
+                if item is None:
+                    continue
+                try:
+                    image = Image.fromarray(cv2.cvtColor(item[1], cv2.COLOR_BGRA2RGB))
+                    with self._lock:
+                        self._latest = image
+                except Exception as e:
+                    print(f"Error updating preview: {e}")
+        finally:
+            if subscription is not None:
+                subscription.close()